@@ -0,0 +1,252 @@
+""" Licensed under the same terms as described in the main 
+licensing script of this repository. """
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from asr_inject.utils import log_handler
+
+
+def main() -> int:
+    """
+    Benchmark entry point.
+    """
+    args = parse_args()
+    logger = log_handler.create("benchmark")
+
+    from asr_inject.operations import benchmark
+
+    if args.command == "run":
+        results = benchmark.run(
+            [Path(config) for config in args.config],
+            n_steps=args.n_steps, scales=tuple(args.scales),
+            repeat=args.repeat, logger=logger
+        )
+
+        output = Path(
+            args.output if args.output
+            else (
+                "benchmark_" +
+                datetime.now().strftime("%Y-%m-%d_%H-%M-%S") +
+                ".json"
+            )
+        )
+
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+        for case in results["cases"]:
+            logger.info(
+                f"{case['config']} ({case['n_steps']} steps, "
+                f"{case['rhs_evaluations']} RHS evaluations): " +
+                ", ".join(
+                    f"{stage} {stats['wall_time']:.4f} s"
+                    for stage, stats in case["stages"].items()
+                )
+            )
+
+        logger.info(f"Results written to {output}")
+
+        return 0
+
+    if args.command == "kernels":
+        cases = benchmark.evaluation_costs(
+            Path(args.config), n_calls=args.n_calls,
+            repeat=args.repeat, n_cells=tuple(args.n_cells)
+        )
+
+        for case in cases:
+            for backend, costs in case["wall_time"].items():
+                logger.info(
+                    f"{case['config']} ({case['n_cells']} cells) "
+                    f"{backend}: " +
+                    ", ".join(
+                        f"{key} {seconds * 1.e6:.1f} us "
+                        f"(x{case['speedup'][backend][key]:.2f})"
+                        for key, seconds in costs.items()
+                    )
+                )
+
+        if args.output:
+            with open(args.output, 'w') as file:
+                json.dump(cases, file, indent=2)
+
+            logger.info(f"Results written to {args.output}")
+
+        return 0
+
+    with open(args.baseline, 'r') as file:
+        baseline = json.load(file)
+
+    with open(args.candidate, 'r') as file:
+        candidate = json.load(file)
+
+    regressions = benchmark.compare(
+        baseline, candidate, threshold=args.threshold
+    )
+
+    for regression in regressions:
+        logger.warning(
+            f"{regression['config']} ({regression['n_steps']} "
+            f"steps) {regression['stage'] or 'solver'} "
+            f"{regression['metric']}: {regression['baseline']:.6g}"
+            f" -> {regression['candidate']:.6g} "
+            f"(x{regression['ratio']:.2f})"
+        )
+
+    logger.info(
+        f"{len(regressions)} regression(s) beyond "
+        f"{args.threshold:.0%}"
+    )
+
+    return 1 if regressions else 0
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    """
+    from asr_inject.operations import benchmark
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark the fitting, integration, "
+            "post-processing and plotting stages"
+        ),
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+
+    subparsers = parser.add_subparsers(
+        dest="command", required=True
+    )
+
+    run_parser = subparsers.add_parser(
+        "run",
+        help="benchmark configurations and save JSON results",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+
+    run_parser.add_argument(
+        "--config",
+        type=str,
+        nargs='+',
+        default=[
+            str(
+                Path(__file__).parents[3] / "config" / name
+            )
+            for name in ["default.yml", "operational.yml"]
+        ],
+        help="paths to the `.yml` configurations to benchmark"
+    )
+
+    run_parser.add_argument(
+        "--n-steps",
+        type=int,
+        default=benchmark.N_STEPS,
+        help="base number of steps, replacing the configurations'"
+    )
+
+    run_parser.add_argument(
+        "--scales",
+        type=float,
+        nargs='+',
+        default=list(benchmark.SCALES),
+        help="factors applied to `--n-steps`, one case each"
+    )
+
+    run_parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="timed repetitions per stage (the best is kept)"
+    )
+
+    run_parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help=(
+            "path to the `.json` results (defaults to a "
+            "timestamped file in the working directory)"
+        )
+    )
+
+    kernels_parser = subparsers.add_parser(
+        "kernels",
+        help=(
+            "time single right-hand side, Jacobian and "
+            "metric evaluations on every kernel backend"
+        ),
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+
+    kernels_parser.add_argument(
+        "--config",
+        type=str,
+        default=str(
+            Path(__file__).parents[3] / "config" / "default.yml"
+        ),
+        help="path to the `.yml` configuration to evaluate"
+    )
+
+    kernels_parser.add_argument(
+        "--n-cells",
+        type=int,
+        nargs='+',
+        default=[3, 30, 300],
+        help="column sizes, one case each"
+    )
+
+    kernels_parser.add_argument(
+        "--n-calls",
+        type=int,
+        default=10000,
+        help="evaluations per timing (a hundredth for metrics)"
+    )
+
+    kernels_parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="timed repetitions (the best is kept)"
+    )
+
+    kernels_parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="optional path to the `.json` results"
+    )
+
+    compare_parser = subparsers.add_parser(
+        "compare",
+        help="flag regressions between two results files",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+
+    compare_parser.add_argument(
+        "baseline",
+        type=str,
+        help="path to the reference `.json` results"
+    )
+
+    compare_parser.add_argument(
+        "candidate",
+        type=str,
+        help="path to the `.json` results to check"
+    )
+
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative increase flagged as a regression"
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,12 +2,12 @@
 licensing script of this repository. """
 
 import argparse
+import contextlib
 import sys
 import time
 from pathlib import Path
 
-from asr_inject.operations import pipeline
-from asr_inject.utils import log_handler, outtree
+from asr_inject.utils import log_handler, outtree, profiling
 
 
 def main() -> int:
@@ -46,21 +46,69 @@ def main() -> int:
         # ----------------------------------------
         main_logger.info("Entering pipeline")
 
+        # heavy (numerical) imports only once arguments parse
+        import_start = time.time()
+
+        from asr_inject.operations import pipeline, sweep
+
+        main_logger.info(
+            f"Import time ="
+            f" {round(time.time() - import_start, 3)} s"
+        )
+
         # make outputs' directory
         main_logger.info(
             "Generating outputs' directory"
         )
 
-        outdir = outtree.make_global_outdir(
-            Path(args.config).parent, return_name=True
-        )
+        if args.resume:
+            # continue in place from the run's checkpoint
+            run_dir = Path(args.resume)
+            input_file = run_dir / pipeline.RESUME_CONFIG
 
-        # run pipeline
-        pipeline.run(
-            Path(args.config), 
-            outdir=Path(args.config).parent / outdir
+            if not input_file.exists():
+                raise FileNotFoundError(
+                    f"{run_dir} holds no checkpointed run"
+                )
+
+        else:
+            input_file = Path(
+                args.sweep if args.sweep else args.config
+            )
+
+            run_dir = input_file.parent / outtree.make_global_outdir(
+                input_file.parent, return_name=True
+            )
+
+        profiler = (
+            profiling.profile(
+                outdir=run_dir,
+                memory=args.profile_memory,
+                top=args.profile_top, logger=main_logger
+            )
+            if args.profile or args.profile_memory
+            else contextlib.nullcontext()
         )
 
+        with profiler:
+            if args.sweep and not args.resume:
+                # run parameter sweep
+                sweep.run(
+                    input_file,
+                    outdir=run_dir,
+                    workers=args.workers, logger=main_logger,
+                    plots=(False if args.no_plots else None)
+                )
+
+            else:
+                # run pipeline
+                pipeline.run(
+                    input_file,
+                    outdir=run_dir,
+                    logger=main_logger,
+                    plots=(False if args.no_plots else None)
+                )
+
         # ----------------------------------------
         # 3. SUCCESSFUL EXIT
         # ----------------------------------------
@@ -104,6 +152,74 @@ def parse_args() -> argparse.Namespace:
         help="path to your `.yml` configuration file"
     )
 
+    parser.add_argument(
+        "--sweep",
+        type=str,
+        default=None,
+        help=(
+            "path to a `.yml` sweep specification; runs "
+            "every case in parallel instead of `--config`"
+        )
+    )
+
+    parser.add_argument(
+        "--resume",
+        type=str,
+        default=None,
+        help=(
+            "path to the outputs' directory of an interrupted "
+            "run with `checkpoint_every` set; continues it from "
+            "its last checkpoint instead of `--config`"
+        )
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help=(
+            "number of sweep worker processes (defaults "
+            "to the specification's `workers`, else all "
+            "cores)"
+        )
+    )
+
+    parser.add_argument(
+        "--no-plots",
+        action="store_true",
+        help=(
+            "skip the fitting and results figures "
+            "(overrides the configuration's `plots`)"
+        )
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "profile the run with `cProfile`, writing "
+            "`profile.pstats` and a `profile.txt` summary to "
+            "the outputs' directory and logging per-stage "
+            "timings (sweep workers are not profiled)"
+        )
+    )
+
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help=(
+            "also trace memory allocations with "
+            "`tracemalloc` (implies `--profile`; slower)"
+        )
+    )
+
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=30,
+        help="number of entries in the profile summary"
+    )
+
     return parser.parse_args()
 
 
@@ -0,0 +1,206 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from asr_inject.utils import log_handler
+
+
+def main() -> int:
+    """
+    Job server and client entry point.
+    """
+    args = parse_args()
+    logger = log_handler.create("server")
+
+    from asr_inject.operations import server
+
+    if args.command == "serve":
+        base_config = None
+        if args.config:
+            from asr_inject.operations import pipeline
+
+            base_config = pipeline.read_yaml(Path(args.config))
+
+        server.serve(
+            outdir=Path(args.outdir), host=args.host,
+            port=args.port,
+            socket_path=Path(args.socket) if args.socket else None,
+            workers=args.workers, base_config=base_config,
+            logger=logger
+        )
+
+        return 0
+
+    client = server.JobClient(args.url)
+
+    if args.command == "submit":
+        config = None
+        if args.config:
+            from asr_inject.operations import pipeline
+
+            config = pipeline.read_yaml(Path(args.config))
+
+        job_id = client.submit(
+            config=config,
+            overrides=(
+                json.loads(args.overrides) if args.overrides
+                else None
+            ),
+            plots=False if args.no_plots else None
+        )
+
+        logger.info(f"Job {job_id} queued")
+
+        if not args.wait:
+            print(job_id)
+            return 0
+
+        print(json.dumps(client.wait(job_id), indent=2))
+        return 0
+
+    if args.command == "status":
+        print(
+            json.dumps(
+                client.status(args.job) if args.job
+                else client.jobs(),
+                indent=2
+            )
+        )
+        return 0
+
+    print(json.dumps(client.result(args.job), indent=2))
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Serve queued simulation requests from long-lived "
+            "workers, or submit and query them"
+        ),
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+
+    subparsers = parser.add_subparsers(
+        dest="command", required=True
+    )
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="run the job server until interrupted",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+
+    serve_parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="address to listen on"
+    )
+
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="port to listen on"
+    )
+
+    serve_parser.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help="listen on this Unix socket instead of a port"
+    )
+
+    serve_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="concurrent jobs (defaults to all cores)"
+    )
+
+    serve_parser.add_argument(
+        "--outdir",
+        type=str,
+        default="jobs",
+        help="directory receiving one sub-directory per job"
+    )
+
+    serve_parser.add_argument(
+        "--config",
+        type=str,
+        default=None,
+        help=(
+            "optional base `.yml` configuration, used by "
+            "requests without one and warmed up on workers"
+        )
+    )
+
+    for name, help in [
+        ("submit", "queue a configuration"),
+        ("status", "show a job's status (or all jobs')"),
+        ("result", "show a finished job's result summary")
+    ]:
+        client_parser = subparsers.add_parser(
+            name,
+            help=help,
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        )
+
+        client_parser.add_argument(
+            "--url",
+            type=str,
+            default="http://127.0.0.1:8765",
+            help="server address (`http://host:port` or `unix:path`)"
+        )
+
+        if name == "submit":
+            client_parser.add_argument(
+                "--config",
+                type=str,
+                default=None,
+                help=(
+                    "path to the `.yml` configuration (defaults "
+                    "to the server's base configuration)"
+                )
+            )
+
+            client_parser.add_argument(
+                "--overrides",
+                type=str,
+                default=None,
+                help="JSON object of dotted parameter overrides"
+            )
+
+            client_parser.add_argument(
+                "--no-plots",
+                action="store_true",
+                help="skip figure generation"
+            )
+
+            client_parser.add_argument(
+                "--wait",
+                action="store_true",
+                help="poll until the job finishes, then show its result"
+            )
+
+        else:
+            client_parser.add_argument(
+                "job",
+                type=str,
+                nargs='?' if name == "status" else None,
+                default=None,
+                help="job id"
+            )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,527 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+try:
+    import numba
+
+except ImportError:
+    numba = None
+
+
+k_TO_SI = 1000.
+BACKENDS = ("numpy", "numba")
+
+
+class NumpyBackend:
+    """
+    Reference backend: every evaluation is a handful of
+    array operations over all members, species and cells.
+
+    The kernel methods take the `ReservoirKernel` whose
+    constants they use and member-by-species-by-cell
+    `(M, 2, N)` views of the state; the reductions scan
+    the first (time) axis of a series, vectorised over
+    any trailing axes.
+    """
+
+    name = "numpy"
+
+    def rhs(
+            self, kernel: Any, moles: NDArray, out: NDArray
+    ) -> None:
+        """
+        Writes the rate of change of `moles` into `out`.
+        """
+        # mole -> mass fractions
+        mass = moles * kernel.molar_mass
+        total_mass = mass[:, 0] + mass[:, 1]
+        mass_fraction = mass / total_mass[:, None]
+
+        # density and concentrations
+        density = (
+            kernel.density_pure +
+            kernel.salinity_slope * mass[:, 1] / mass[:, 0]
+        )
+
+        concentration = (
+            density[:, None] * mass_fraction *
+            kernel.concentration_scale
+        )
+
+        # interface-averaged concentrations
+        flux = kernel.flux
+        np.add(
+            concentration[..., :-1], concentration[..., 1:],
+            out=flux
+        )
+        flux *= kernel.half_conductance
+
+        # ideal chemical potentials (up to R.T)
+        log_fraction = np.log(
+            moles / (moles[:, 0] + moles[:, 1])[:, None]
+        )
+
+        flux *= log_fraction[..., 1:] - log_fraction[..., :-1]
+
+        # conservation across interfaces
+        out[..., :-1] = flux
+        out[..., -1] = 0.
+        out[..., 1:] -= flux
+
+
+    def local_jacobian(
+            self, kernel: Any, moles: NDArray
+    ) -> NDArray:
+        """
+        Non-zero entries of the Jacobian, in blocks
+        `(d_left F, d_right F, -d_left F, -d_right F)` of
+        shape `(M, 2, 2, N - 1)` (member, flux species,
+        state species, interface).
+
+        Chain rule through mole fractions -> mass fractions
+        -> density -> concentrations -> ideal chemical
+        potentials -> interface fluxes.
+        """
+        eye = np.eye(2)[None, :, :, None]
+        slope = kernel.salinity_slope
+
+        # mass and density, shape (M, N)
+        mass = moles * kernel.molar_mass
+        total_mass = mass[:, 0] + mass[:, 1]
+        mass_ratio = mass[:, 1] / mass[:, 0]
+
+        density = kernel.density_pure + slope * mass_ratio
+
+        # d(rho)/dn_j, shape (M, 2, N)
+        d_density = np.stack(
+            [
+                -slope * mass_ratio / moles[:, 0],
+                slope * kernel.molar_mass[:, 1] / mass[:, 0]
+            ],
+            axis=1
+        )
+
+        # c_k = 1000.rho.n_k / m_tot
+        concentration = (
+            k_TO_SI * density[:, None] * moles /
+            total_mass[:, None]
+        )
+
+        # dc_k/dn_j, shape (M, 2, 2, N)
+        density = density[:, None, None]
+        total_mass = total_mass[:, None, None]
+
+        d_concentration = (
+            k_TO_SI / total_mass * (
+                d_density[:, None] * moles[:, :, None] +
+                density * eye -
+                (
+                    density * moles[:, :, None] *
+                    kernel.molar_mass[:, None] / total_mass
+                )
+            )
+        )
+
+        # d(ln x_k)/dn_j, shape (M, 2, 2, N)
+        total_moles = moles[:, 0] + moles[:, 1]
+        log_fraction = np.log(moles / total_moles[:, None])
+        d_log_fraction = (
+            eye / moles[:, :, None] -
+            1. / total_moles[:, None, None]
+        )
+
+        # F_k = G_k . c_mean_k . (ln x_k,right - ln x_k,left)
+        conductance = kernel.conductance[:, :, None]
+        concentration_mean = 0.5 * (
+            concentration[..., :-1] + concentration[..., 1:]
+        )[:, :, None]
+        log_difference = (
+            log_fraction[..., 1:] - log_fraction[..., :-1]
+        )[:, :, None]
+
+        d_flux_left = conductance * (
+            0.5 * d_concentration[..., :-1] * log_difference -
+            concentration_mean * d_log_fraction[..., :-1]
+        )
+
+        d_flux_right = conductance * (
+            0.5 * d_concentration[..., 1:] * log_difference +
+            concentration_mean * d_log_fraction[..., 1:]
+        )
+
+        # dn_left/dt = +F, dn_right/dt = -F
+        return np.concatenate([
+            d_flux_left.ravel(), d_flux_right.ravel(),
+            -d_flux_left.ravel(), -d_flux_right.ravel()
+        ])
+
+
+    def first_crossing(
+            self, time: NDArray, series: NDArray, *,
+            threshold: float | NDArray
+    ) -> NDArray:
+        """
+        First time at which `series` reaches `threshold`,
+        linearly interpolated, or NaN if it never does.
+        """
+        crossed = series >= threshold
+        has_crossed = crossed.any(axis=0)
+        idx = np.argmax(crossed, axis=0)
+        before = np.maximum(idx - 1, 0)
+
+        value_before = _pick(series, before)
+        value_after = _pick(series, idx)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = np.where(
+                idx > 0,
+                (threshold - value_before) /
+                (value_after - value_before),
+                0.
+            )
+
+        return np.where(
+            has_crossed,
+            time[before] + weight * (time[idx] - time[before]),
+            np.nan
+        )
+
+
+    def first_converged(
+            self, time: NDArray, series: NDArray, *,
+            tolerance: float
+    ) -> NDArray:
+        """
+        First time at which `series` is within `tolerance`
+        below its final value, or NaN if that is undefined.
+        """
+        converged = series[-1] - series < tolerance
+
+        return np.where(
+            converged.any(axis=0),
+            time[np.argmax(converged, axis=0)],
+            np.nan
+        )
+
+
+    def peak(self, series: NDArray) -> NDArray:
+        """
+        Index of the (first) maximum of `series`.
+        """
+        return np.argmax(series, axis=0)
+
+
+class NumbaBackend(NumpyBackend):
+    """
+    Compiled backend: the fused loops below, without
+    temporaries and with early-exiting scans, compiled on
+    construction (lazily, on first call; cached on disk).
+
+    Only available if `numba` is installed.
+    """
+
+    name = "numba"
+
+    def __init__(self) -> None:
+        """
+        """
+        jit = numba.njit(cache=True)
+
+        self._rhs = jit(_rhs_loops)
+        self._local_jacobian = jit(_local_jacobian_loops)
+        self._first_crossing = jit(_first_crossing_loops)
+        self._first_converged = jit(_first_converged_loops)
+
+
+    def rhs(
+            self, kernel: Any, moles: NDArray, out: NDArray
+    ) -> None:
+        """
+        """
+        self._rhs(
+            moles, kernel.molar_mass, kernel.density_pure,
+            kernel.salinity_slope, kernel.half_conductance, out
+        )
+
+
+    def local_jacobian(
+            self, kernel: Any, moles: NDArray
+    ) -> NDArray:
+        """
+        """
+        entries = np.empty(
+            (4,) + kernel.conductance.shape[:2] +
+            (2, kernel.n_cells - 1)
+        )
+
+        self._local_jacobian(
+            moles, kernel.molar_mass, kernel.density_pure,
+            kernel.salinity_slope, kernel.conductance, entries
+        )
+
+        return entries.ravel()
+
+
+    def first_crossing(
+            self, time: NDArray, series: NDArray, *,
+            threshold: float | NDArray
+    ) -> NDArray:
+        """
+        """
+        shape = series.shape[1:]
+
+        return self._first_crossing(
+            time, series.reshape(len(series), -1),
+            np.broadcast_to(
+                np.asarray(threshold, dtype=np.float64), shape
+            ).ravel()
+        ).reshape(shape)
+
+
+    def first_converged(
+            self, time: NDArray, series: NDArray, *,
+            tolerance: float
+    ) -> NDArray:
+        """
+        """
+        shape = series.shape[1:]
+
+        return self._first_converged(
+            time, series.reshape(len(series), -1), tolerance
+        ).reshape(shape)
+
+
+def _pick(series: NDArray, idx: NDArray) -> NDArray:
+    """
+    `series[idx]` along the first axis, per trailing index.
+    """
+    return np.take_along_axis(
+        series, np.expand_dims(idx, 0), axis=0
+    )[0]
+
+def _rhs_loops(
+        moles: NDArray, molar_mass: NDArray,
+        density_pure: NDArray, salinity_slope: NDArray,
+        half_conductance: NDArray, out: NDArray
+) -> None:
+    """
+    `NumpyBackend.rhs`, one cell at a time.
+    """
+    n_members, _, n_cells = moles.shape
+
+    for m in range(n_members):
+        scale_water = k_TO_SI / molar_mass[m, 0, 0]
+        scale_solute = k_TO_SI / molar_mass[m, 1, 0]
+
+        previous_water = 0.
+        previous_solute = 0.
+        previous_log_water = 0.
+        previous_log_solute = 0.
+
+        for i in range(n_cells):
+            mass_water = moles[m, 0, i] * molar_mass[m, 0, 0]
+            mass_solute = moles[m, 1, i] * molar_mass[m, 1, 0]
+            total_mass = mass_water + mass_solute
+
+            density = (
+                density_pure[m, 0] +
+                salinity_slope[m, 0] * mass_solute / mass_water
+            )
+
+            concentration_water = (
+                density * (mass_water / total_mass) * scale_water
+            )
+            concentration_solute = (
+                density * (mass_solute / total_mass) * scale_solute
+            )
+
+            total_moles = moles[m, 0, i] + moles[m, 1, i]
+            log_water = np.log(moles[m, 0, i] / total_moles)
+            log_solute = np.log(moles[m, 1, i] / total_moles)
+
+            if i == 0:
+                out[m, 0, 0] = 0.
+                out[m, 1, 0] = 0.
+
+            else:
+                flux_water = (
+                    (previous_water + concentration_water) *
+                    half_conductance[m, 0, i - 1] *
+                    (log_water - previous_log_water)
+                )
+                flux_solute = (
+                    (previous_solute + concentration_solute) *
+                    half_conductance[m, 1, i - 1] *
+                    (log_solute - previous_log_solute)
+                )
+
+                out[m, 0, i - 1] += flux_water
+                out[m, 1, i - 1] += flux_solute
+                out[m, 0, i] = -flux_water
+                out[m, 1, i] = -flux_solute
+
+            previous_water = concentration_water
+            previous_solute = concentration_solute
+            previous_log_water = log_water
+            previous_log_solute = log_solute
+
+def _local_jacobian_loops(
+        moles: NDArray, molar_mass: NDArray,
+        density_pure: NDArray, salinity_slope: NDArray,
+        conductance: NDArray, entries: NDArray
+) -> None:
+    """
+    `NumpyBackend.local_jacobian`, one cell at a time,
+    into `entries` of shape `(4, M, 2, 2, N - 1)`.
+    """
+    n_members, _, n_cells = moles.shape
+
+    concentration = np.empty((2, n_cells))
+    log_fraction = np.empty((2, n_cells))
+    d_concentration = np.empty((2, 2, n_cells))
+    d_log_fraction = np.empty((2, 2, n_cells))
+
+    for m in range(n_members):
+        slope = salinity_slope[m, 0]
+
+        for i in range(n_cells):
+            mass_water = moles[m, 0, i] * molar_mass[m, 0, 0]
+            mass_solute = moles[m, 1, i] * molar_mass[m, 1, 0]
+            total_mass = mass_water + mass_solute
+            mass_ratio = mass_solute / mass_water
+
+            density = density_pure[m, 0] + slope * mass_ratio
+            total_moles = moles[m, 0, i] + moles[m, 1, i]
+
+            for k in range(2):
+                concentration[k, i] = (
+                    k_TO_SI * density * moles[m, k, i] / total_mass
+                )
+                log_fraction[k, i] = np.log(
+                    moles[m, k, i] / total_moles
+                )
+
+                for j in range(2):
+                    d_density = (
+                        -slope * mass_ratio / moles[m, 0, i]
+                        if j == 0
+                        else slope * molar_mass[m, 1, 0] / mass_water
+                    )
+                    delta = 1. if k == j else 0.
+
+                    d_concentration[k, j, i] = (
+                        k_TO_SI / total_mass * (
+                            d_density * moles[m, k, i] +
+                            density * delta -
+                            density * moles[m, k, i] *
+                            molar_mass[m, j, 0] / total_mass
+                        )
+                    )
+                    d_log_fraction[k, j, i] = (
+                        delta / moles[m, k, i] - 1. / total_moles
+                    )
+
+        for k in range(2):
+            for i in range(n_cells - 1):
+                concentration_mean = 0.5 * (
+                    concentration[k, i] + concentration[k, i + 1]
+                )
+                log_difference = (
+                    log_fraction[k, i + 1] - log_fraction[k, i]
+                )
+
+                for j in range(2):
+                    left = conductance[m, k, i] * (
+                        0.5 * d_concentration[k, j, i] *
+                        log_difference -
+                        concentration_mean * d_log_fraction[k, j, i]
+                    )
+                    right = conductance[m, k, i] * (
+                        0.5 * d_concentration[k, j, i + 1] *
+                        log_difference +
+                        concentration_mean *
+                        d_log_fraction[k, j, i + 1]
+                    )
+
+                    entries[0, m, k, j, i] = left
+                    entries[1, m, k, j, i] = right
+                    entries[2, m, k, j, i] = -left
+                    entries[3, m, k, j, i] = -right
+
+def _first_crossing_loops(
+        time: NDArray, series: NDArray, threshold: NDArray
+) -> NDArray:
+    """
+    `NumpyBackend.first_crossing` of every column of a
+    `(T, K)` series, stopping at the crossing.
+    """
+    crossings = np.full(series.shape[1], np.nan)
+
+    for k in range(series.shape[1]):
+        for idx in range(series.shape[0]):
+            if series[idx, k] >= threshold[k]:
+                if idx == 0:
+                    crossings[k] = time[0]
+
+                else:
+                    weight = (
+                        (threshold[k] - series[idx - 1, k]) /
+                        (series[idx, k] - series[idx - 1, k])
+                    )
+                    crossings[k] = time[idx - 1] + weight * (
+                        time[idx] - time[idx - 1]
+                    )
+
+                break
+
+    return crossings
+
+def _first_converged_loops(
+        time: NDArray, series: NDArray, tolerance: float
+) -> NDArray:
+    """
+    `NumpyBackend.first_converged` of every column of a
+    `(T, K)` series, stopping at convergence.
+    """
+    converged = np.full(series.shape[1], np.nan)
+
+    for k in range(series.shape[1]):
+        for idx in range(series.shape[0]):
+            if series[-1, k] - series[idx, k] < tolerance:
+                converged[k] = time[idx]
+                break
+
+    return converged
+
+def get_backend(name: str | None=None) -> NumpyBackend:
+    """
+    Kernel backend `name` (one of `BACKENDS`), `"numpy"`
+    if `None`: the compiled `"numba"` backend is an
+    explicit opt-in.
+    """
+    if name is None:
+        name = "numpy"
+
+    if name not in BACKENDS:
+        raise ValueError(f"unknown kernel backend '{name}'")
+
+    if name == "numba" and numba is None:
+        raise ValueError(
+            "the 'numba' kernel backend requires numba to be "
+            "installed"
+        )
+
+    if name not in _backends.keys():
+        _backends[name] = (
+            NumpyBackend() if name == "numpy" else NumbaBackend()
+        )
+
+    return _backends[name]
+
+
+_backends: dict[str, NumpyBackend] = {}
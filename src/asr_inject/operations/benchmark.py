@@ -0,0 +1,435 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import contextlib
+import logging
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import scipy
+
+from asr_inject.operations import pipeline
+from asr_inject.operations.backends import BACKENDS, get_backend
+from asr_inject.operations.kernel import ReservoirKernel
+from asr_inject.operations.metrics import derived_metrics
+from asr_inject.operations.reservoir import Reservoir
+from asr_inject.operations.visualise import plot_2d
+from asr_inject.utils import figures
+from asr_inject.utils.fitting import arrhenius_fit, density_fit
+
+
+N_STEPS = 1000000
+SCALES = (0.1, 1., 10.)
+REGRESSION_THRESHOLD = 0.1
+MIN_WALL_TIME = 0.01 # s; shorter stages are too noisy to compare
+N_CALLS = 10000
+
+@contextlib.contextmanager
+def counting(cls: type, name: str) -> Iterator[list[int]]:
+    """
+    Counts the calls to method `name` of `cls` while
+    active.
+    """
+    original = getattr(cls, name)
+    count = [0]
+
+    def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        """
+        count[0] += 1
+        return original(self, *args, **kwargs)
+
+    setattr(cls, name, wrapper)
+
+    try:
+        yield count
+
+    finally:
+        setattr(cls, name, original)
+
+def measure(
+        stage: Callable[[], Any], *, repeat: int
+) -> tuple[Any, dict[str, float]]:
+    """
+    Best-of-`repeat` wall time of `stage`, plus its peak
+    traced memory over one further (slower) traced call.
+    """
+    wall_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = stage()
+        wall_times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak_memory = tracemalloc.get_traced_memory()
+
+    finally:
+        tracemalloc.stop()
+
+    return result, {
+        "wall_time": min(wall_times),
+        "peak_memory": peak_memory
+    }
+
+def benchmark_case(
+        config: Path, *, n_steps: int, repeat: int=3
+) -> dict[str, Any]:
+    """
+    Times the pipeline stages on one configuration, with
+    its `n_steps` replaced.
+
+    Fits bypass their memoisation and figures are always
+    redrawn; figures rendered on worker processes are not
+    included in the peak memory.
+    """
+    config_dict = pipeline.read_yaml(config)
+    config_dict["n_steps"] = n_steps
+
+    density_data = config_dict.pop("density")
+    water_diffusivity_data = config_dict.pop("water_diffusivity")
+    solute_diffusivity_data = config_dict.pop("solute_diffusivity")
+
+    stages = {}
+
+    # fits
+    density_coefficients, stages["density_fit"] = measure(
+        lambda: density_fit.__wrapped__(density_data),
+        repeat=repeat
+    )
+
+    datasets = [
+        np.asarray(data[segment], dtype=np.float64)
+        for data in [water_diffusivity_data, solute_diffusivity_data]
+        for segment in ["fresh_segment", "saline_segment"]
+    ]
+
+    arrhenius_coefficients, stages["arrhenius_fit"] = measure(
+        lambda: [
+            arrhenius_fit.__wrapped__(data) for data in datasets
+        ],
+        repeat=repeat
+    )
+
+    res = Reservoir(
+        config=config_dict,
+        fitting={
+            "density": {
+                "temperature": density_coefficients,
+                "salinity": density_data["salinity_fitting"]
+            },
+            "water_diff_fresh_segment": arrhenius_coefficients[0],
+            "water_diff_saline_segment": arrhenius_coefficients[1],
+            "solute_diff_fresh_segment": arrhenius_coefficients[2],
+            "solute_diff_saline_segment": arrhenius_coefficients[3],
+        }
+    )
+
+    with tempfile.TemporaryDirectory() as outdir:
+        outdir = Path(outdir)
+
+        # integration (including its post-processing)
+        with (
+            counting(ReservoirKernel, "rhs") as rhs_calls,
+            counting(ReservoirKernel, "jacobian") as dense_calls,
+            counting(
+                ReservoirKernel, "jacobian_banded"
+            ) as banded_calls
+        ):
+            options = pipeline.predict_options(
+                config_dict, outdir=outdir
+            )
+
+            output, stages["predict"] = measure(
+                lambda: res.predict(**options), repeat=repeat
+            )
+
+        # post-processing alone
+        _, stages["post_processing"] = measure(
+            lambda: res.post_process(
+                output["time"], output["cell_moles"],
+                recovered_mass=output.get("recovered_mass"),
+                backend=options["backend"]
+            ),
+            repeat=repeat
+        )
+
+        def plot() -> None:
+            """
+            """
+            figures.clear_memory()
+            plot_2d(output, config=config_dict, outdir=outdir)
+
+        _, stages["plot_2d"] = measure(plot, repeat=repeat)
+
+        n_output_points = len(output["time"])
+
+    # every measured call integrates once
+    n_calls = repeat + 1
+
+    return {
+        "config": config.stem,
+        "n_steps": n_steps,
+        "n_output_points": n_output_points,
+        "rhs_evaluations": rhs_calls[0] // n_calls,
+        "jacobian_evaluations": (
+            (dense_calls[0] + banded_calls[0]) // n_calls
+        ),
+        "stages": stages
+    }
+
+def per_call(
+        func: Callable[[], Any], *, n_calls: int, repeat: int
+) -> float:
+    """
+    Best-of-`repeat` mean wall time of `n_calls` calls to
+    `func`, after one untimed (e.g. compiling) call.
+    """
+    func()
+
+    wall_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(n_calls):
+            func()
+        wall_times.append((time.perf_counter() - start) / n_calls)
+
+    return min(wall_times)
+
+def evaluation_costs(
+        config: Path, *, n_calls: int=N_CALLS, repeat: int=3,
+        n_cells: tuple[int, ...]=(3, 30, 300)
+) -> list[dict[str, Any]]:
+    """
+    Per-call wall times of the right-hand side, dense
+    Jacobian and derived-metric scans on every installed
+    kernel backend, for columns of `n_cells` cells, with
+    their speedups over the NumPy backend.
+
+    The metric scans run over the configuration's first
+    `n_steps` output points, `n_calls // 100` times.
+    """
+    config_dict = pipeline.read_yaml(config)
+
+    density_data = config_dict.pop("density")
+    diffusivity_data = {
+        species: config_dict.pop(f"{species}_diffusivity")
+        for species in ["water", "solute"]
+    }
+
+    fitting = {
+        "density": {
+            "temperature": density_fit(density_data),
+            "salinity": density_data["salinity_fitting"]
+        },
+        **{
+            f"{species}_diff_{segment}": arrhenius_fit(
+                np.asarray(data[segment], dtype=np.float64)
+            )
+            for species, data in diffusivity_data.items()
+            for segment in ["fresh_segment", "saline_segment"]
+        }
+    }
+
+    backends = []
+    for name in BACKENDS:
+        try:
+            get_backend(name)
+
+        except ValueError:
+            continue
+
+        backends.append(name)
+
+    cases = []
+    for cells in n_cells:
+        res = Reservoir(
+            config={
+                **config_dict,
+                "column": {
+                    **config_dict.get("column", {}),
+                    "n_cells": cells,
+                    "interlayer_cells": max(1, cells // 10)
+                }
+            },
+            fitting=fitting
+        )
+        trajectory = res.predict(
+            n_steps=min(config_dict["n_steps"], 100000),
+            step_size=config_dict["step_size"]
+        )
+
+        costs = {}
+        for name in backends:
+            kernel = res.kernel(backend=name)
+            state = kernel.to_layout(res.parameters.initial_moles)
+
+            costs[name] = {
+                "rhs": per_call(
+                    lambda: kernel.rhs(state, 0.),
+                    n_calls=n_calls, repeat=repeat
+                ),
+                "jacobian": per_call(
+                    lambda: kernel.jacobian(state, 0.),
+                    n_calls=n_calls, repeat=repeat
+                ),
+                "metrics": per_call(
+                    lambda: derived_metrics(
+                        trajectory["time"],
+                        moles=trajectory["moles"],
+                        mass_fraction_solute_fresh=trajectory[
+                            "mass_fraction_solute_fresh"
+                        ],
+                        asr_efficiency=trajectory["asr_efficiency"],
+                        max_solute_fraction=(
+                            res.parameters.max_solute_fraction
+                        ),
+                        backend=name
+                    ),
+                    n_calls=max(1, n_calls // 100), repeat=repeat
+                )
+            }
+
+        cases.append({
+            "config": config.stem,
+            "n_cells": cells,
+            "n_output_points": len(trajectory["time"]),
+            "wall_time": costs,
+            "speedup": {
+                name: {
+                    key: costs["numpy"][key] / value
+                    for key, value in costs[name].items()
+                }
+                for name in backends
+            }
+        })
+
+    return cases
+
+def run(
+        configs: list[Path], *, n_steps: int=N_STEPS,
+        scales: tuple[float, ...]=SCALES, repeat: int=3,
+        logger: logging.Logger | None=None
+) -> dict[str, Any]:
+    """
+    Benchmarks every configuration at `n_steps` scaled by
+    each of `scales`.
+
+    Returns
+    -------
+    JSON-serialisable `"meta"` (commit, versions, host)
+    and per-case `"cases"`.
+    """
+    cases = []
+    for config in configs:
+        for scale in scales:
+            case_steps = max(2, round(n_steps * scale))
+
+            if logger is not None:
+                logger.info(
+                    f"Benchmarking {config.name} with "
+                    f"{case_steps} steps"
+                )
+
+            cases.append(
+                benchmark_case(
+                    config, n_steps=case_steps, repeat=repeat
+                )
+            )
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent
+        ).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "repeat": repeat
+        },
+        "cases": cases
+    }
+
+def compare(
+        baseline: dict[str, Any], candidate: dict[str, Any], *,
+        threshold: float=REGRESSION_THRESHOLD
+) -> list[dict[str, Any]]:
+    """
+    Stage wall times, peak memories and evaluation counts
+    of `candidate` that exceed `baseline`'s by more than
+    the fraction `threshold`, for cases (configuration
+    and `n_steps`) present in both.
+    """
+    def by_case(results: dict[str, Any]) -> dict[tuple, dict]:
+        """
+        """
+        return {
+            (case["config"], case["n_steps"]): case
+            for case in results["cases"]
+        }
+
+    baseline_cases = by_case(baseline)
+    regressions = []
+
+    for key, case in by_case(candidate).items():
+        if key not in baseline_cases:
+            continue
+
+        reference = baseline_cases[key]
+
+        values = [
+            (
+                stage, metric,
+                reference["stages"][stage][metric],
+                case["stages"][stage][metric]
+            )
+            for stage in case["stages"].keys()
+            if stage in reference["stages"].keys()
+            for metric in ["wall_time", "peak_memory"]
+        ] + [
+            (
+                None, metric, reference[metric], case[metric]
+            )
+            for metric in [
+                "rhs_evaluations", "jacobian_evaluations"
+            ]
+        ]
+
+        for stage, metric, before, after in values:
+            if metric == "wall_time" and max(
+                before, after
+            ) < MIN_WALL_TIME:
+                continue
+
+            if after > before * (1. + threshold):
+                regressions.append({
+                    "config": key[0],
+                    "n_steps": key[1],
+                    "stage": stage,
+                    "metric": metric,
+                    "baseline": before,
+                    "candidate": after,
+                    "ratio": after / before if before else np.inf
+                })
+
+    return regressions
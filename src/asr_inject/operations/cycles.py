@@ -0,0 +1,242 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import dataclasses
+from typing import Any
+
+import numpy as np
+from scipy.integrate import odeint
+
+from asr_inject.operations import diagnostics
+from asr_inject.operations.kernel import ReservoirKernel
+from asr_inject.operations.reservoir import Reservoir
+
+
+PHASE_KINDS = ("inject", "store", "recover")
+
+
+@dataclasses.dataclass(frozen=True, slots=True, kw_only=True)
+class Phase:
+    """
+    One phase of an ASR cycle: injecting fresh water,
+    storing it (the well shut) or recovering it, at a
+    constant `flow_rate` (kg/s) for `duration` (s),
+    sampled at `n_points` output points.
+    """
+
+    kind: str
+    duration: float
+    flow_rate: float=0.
+    solute_mass_fraction: float | None=None
+    n_points: int=100
+
+
+    def __post_init__(self) -> None:
+        """
+        """
+        if self.kind not in PHASE_KINDS:
+            raise ValueError(f"unknown phase kind '{self.kind}'")
+
+        if self.duration <= 0. or self.n_points < 2:
+            raise ValueError(
+                "phases need a positive duration and at least "
+                "two output points"
+            )
+
+        if self.flow_rate < 0.:
+            raise ValueError("flow rates must not be negative")
+
+
+    @property
+    def well_rate(self) -> float:
+        """
+        Signed rate handed to `ReservoirKernel.set_well`.
+        """
+        return {
+            "inject": self.flow_rate,
+            "store": 0.,
+            "recover": -self.flow_rate
+        }[self.kind]
+
+
+class CycleSchedule:
+    """
+    Repeated inject -> store -> recover cycles, each
+    phase warm-started from the final state of the
+    previous one on a single prepared kernel, so that
+    `n` cycles of `p` phases cost `n.p` integrations.
+    """
+
+    def __init__(self, phases: list[Phase], *, n_cycles: int) -> None:
+        """
+        """
+        if not phases or n_cycles < 1:
+            raise ValueError(
+                "a schedule needs at least one phase and one "
+                "cycle"
+            )
+
+        self.phases = phases
+        self.n_cycles = n_cycles
+
+
+    @classmethod
+    def from_config(
+            cls, config_dict: dict[str, Any]
+    ) -> "CycleSchedule | None":
+        """
+        Schedule of a parsed configuration's `cycles`, or
+        `None` if it has none (`n_cycles` of 0). Recovery
+        phases default to `recovery.flow_rate`.
+        """
+        cycles = (
+            config_dict["cycles"] if "cycles" in config_dict.keys()
+            else None
+        )
+
+        if not cycles or not cycles["n_cycles"]:
+            return None
+
+        phases = []
+        for phase in cycles["phases"]:
+            phase = dict(phase)
+
+            if phase["kind"] == "recover" and "flow_rate" not in phase:
+                phase["flow_rate"] = config_dict["recovery"]["flow_rate"]
+
+            phases.append(Phase(**phase))
+
+        return cls(phases, n_cycles=cycles["n_cycles"])
+
+
+    def simulate(
+            self, reservoir: Reservoir, *,
+            hmax: float | None=None,
+            jacobian: str | None="dense",
+            backend: str | None=None
+    ) -> dict[str, Any]:
+        """
+        Integrates every phase of every cycle in turn.
+
+        Arguments
+        ---------
+        hmax, jacobian, backend:
+            as in `Reservoir.predict`.
+
+        Returns
+        -------
+        The concatenated trajectory and its derived
+        metrics (see `Reservoir.post_process`), the merged
+        `"solver_stats"`, the `"phase_starts"` (s) and
+        per-cycle `"cycles"` summaries: injected and
+        recovered masses (kg), the resulting
+        `"recovery_efficiency"` and, per recover phase,
+        when and why recovery stopped early (see
+        `Reservoir.integrate_recovery`).
+        """
+        layout = ReservoirKernel.layout_for(jacobian)
+
+        parameters = reservoir.parameters
+
+        kernel = reservoir.kernel(layout=layout, backend=backend)
+
+        jacobian_kwargs = kernel.solver_jacobian(jacobian)
+
+        state = kernel.to_layout(parameters.initial_moles)
+        start = 0.
+
+        times, trajectory = [np.zeros(1)], [state[None, :]]
+        phase_starts, segments, cycles = [], [], []
+
+        for cycle in range(self.n_cycles):
+            injected, recovered, recovery_stops = 0., 0., []
+
+            for number, phase in enumerate(self.phases):
+                time = start + np.linspace(
+                    0., phase.duration, phase.n_points
+                )
+
+                if phase.kind == "recover":
+                    # the well shuts at the threshold or on
+                    # depletion, for the rest of the phase
+                    _, result, events, _, stats = (
+                        reservoir.integrate_recovery(
+                            kernel, time, state=state,
+                            flow_rate=phase.flow_rate,
+                            jacobian=jacobian, hmax=hmax
+                        )
+                    )
+                    stop, reason = reservoir.recovery_stop(events)
+
+                    segments.append(stats)
+                    recovery_stops.append({
+                        "phase": number,
+                        "time": stop,
+                        "reason": reason
+                    })
+                    recovered += phase.flow_rate * float(
+                        (time[-1] if stop is None else stop) - start
+                    )
+
+                else:
+                    kernel.set_well(
+                        rate=phase.well_rate,
+                        mass_fraction_solute=(
+                            parameters.mass_fraction_solute_fresh_initial
+                            if phase.solute_mass_fraction is None
+                            else phase.solute_mass_fraction
+                        )
+                    )
+
+                    result, info = odeint(
+                        kernel.rhs, state, time,
+                        hmax=(
+                            hmax if hmax else 0
+                        ),
+                        full_output=True,
+                        **jacobian_kwargs
+                    )
+
+                    segments.append(diagnostics.from_odeint(info))
+                    injected += phase.well_rate * phase.duration
+
+                if not np.all(np.isfinite(result)) or np.any(
+                    result <= 0.
+                ):
+                    raise RuntimeError(
+                        f"phase {number} ({phase.kind}) of cycle "
+                        f"{cycle} did not keep every cell's moles "
+                        "positive"
+                    )
+
+                phase_starts.append(start)
+                times.append(time[1:])
+                trajectory.append(result[1:])
+
+                state = result[-1]
+                start = time[-1]
+
+            cycles.append({
+                "cycle": cycle,
+                "injected_mass": injected,
+                "recovered_mass": recovered,
+                "recovery_efficiency": (
+                    recovered / injected if injected > 0. else None
+                ),
+                "recovery_stops": recovery_stops
+            })
+
+        output = reservoir.post_process(
+            np.concatenate(times),
+            kernel.to_species(np.concatenate(trajectory)),
+            backend=backend
+        )
+
+        output.update({
+            "solution": None,
+            "solver_stats": diagnostics.merge(segments),
+            "phase_starts": phase_starts,
+            "cycles": cycles
+        })
+
+        return output
@@ -0,0 +1,181 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+from typing import Any
+
+import numpy as np
+from scipy.integrate import OdeSolver
+
+
+LSODA_METHODS = {1: "adams", 2: "bdf"}
+
+def from_odeint(info: dict[str, Any]) -> dict[str, Any]:
+    """
+    Solver statistics from the `infodict` of
+    `odeint(..., full_output=True)`.
+
+    Step sizes and methods are those reported at the
+    output points, so that extremes and method switches
+    between two output points may be missed.
+    """
+    steps = info["hu"][info["hu"] > 0.]
+    methods = info["mused"][info["mused"] > 0]
+
+    return {
+        "integrator": "odeint",
+        "success": info["message"].startswith(
+            "Integration successful"
+        ),
+        "message": info["message"],
+        "n_steps": int(info["nst"][-1]) if info["nst"].size else 0,
+        "rhs_evaluations": (
+            int(info["nfe"][-1]) if info["nfe"].size else 0
+        ),
+        "jacobian_evaluations": (
+            int(info["nje"][-1]) if info["nje"].size else 0
+        ),
+        "lu_decompositions": None,
+        "method_switches": int(
+            np.count_nonzero(np.diff(methods))
+        ),
+        "final_method": (
+            LSODA_METHODS[int(methods[-1])] if methods.size
+            else None
+        ),
+        "min_step": float(steps.min()) if steps.size else None,
+        "max_step": float(steps.max()) if steps.size else None
+    }
+
+def from_solve_ivp(solution: Any) -> dict[str, Any]:
+    """
+    Solver statistics from a `solve_ivp` result; steps
+    are only known with its dense output.
+    """
+    steps = (
+        None if solution.sol is None
+        else np.diff(solution.sol.ts)
+    )
+
+    return {
+        "integrator": "solve_ivp",
+        "success": bool(solution.success),
+        "message": solution.message,
+        "n_steps": None if steps is None else int(steps.size),
+        "rhs_evaluations": int(solution.nfev),
+        "jacobian_evaluations": int(solution.njev),
+        "lu_decompositions": int(solution.nlu),
+        "method_switches": None,
+        "final_method": None,
+        "min_step": (
+            float(steps.min()) if steps is not None and steps.size
+            else None
+        ),
+        "max_step": (
+            float(steps.max()) if steps is not None and steps.size
+            else None
+        )
+    }
+
+def from_solver(
+        solver: OdeSolver, *, n_steps: int,
+        min_step: float, max_step: float
+) -> dict[str, Any]:
+    """
+    Solver statistics of a manually stepped `OdeSolver`,
+    with the step count and extremes tracked by the
+    caller.
+    """
+    return {
+        "integrator": type(solver).__name__,
+        "success": solver.status != "failed",
+        "message": solver.status,
+        "n_steps": n_steps,
+        "rhs_evaluations": int(solver.nfev),
+        "jacobian_evaluations": int(solver.njev),
+        "lu_decompositions": int(solver.nlu),
+        "method_switches": None,
+        "final_method": None,
+        "min_step": min_step if n_steps else None,
+        "max_step": max_step if n_steps else None
+    }
+
+def merge(segments: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Solver statistics of consecutive integration segments
+    (e.g. between checkpoints) combined into those of the
+    whole run; unsuccessful from the first failed segment.
+    """
+    stats = dict(segments[-1])
+
+    for segment in segments:
+        if not segment["success"]:
+            stats["success"] = False
+            stats["message"] = segment["message"]
+            break
+
+    for key in [
+        "n_steps", "rhs_evaluations", "jacobian_evaluations",
+        "lu_decompositions", "method_switches"
+    ]:
+        values = [segment[key] for segment in segments]
+        stats[key] = None if None in values else sum(values)
+
+    for key, extreme in [("min_step", min), ("max_step", max)]:
+        values = [
+            segment[key] for segment in segments
+            if segment[key] is not None
+        ]
+        stats[key] = extreme(values) if values else None
+
+    return stats
+
+def skipped(integrator: str, message: str) -> dict[str, Any]:
+    """
+    Solver statistics of an integration that did not
+    need to start.
+    """
+    return {
+        "integrator": integrator,
+        "success": True,
+        "message": message,
+        "n_steps": 0,
+        "rhs_evaluations": 0,
+        "jacobian_evaluations": 0,
+        "lu_decompositions": 0,
+        "method_switches": None,
+        "final_method": None,
+        "min_step": None,
+        "max_step": None
+    }
+
+def summary(stats: dict[str, Any]) -> str:
+    """
+    One-line summary of solver statistics.
+    """
+    parts = [
+        f"{stats['rhs_evaluations']} RHS",
+        f"{stats['jacobian_evaluations']} Jacobian evaluations"
+    ]
+
+    if stats["n_steps"] is not None:
+        parts.insert(0, f"{stats['n_steps']} steps")
+
+    if stats["method_switches"] is not None:
+        parts.append(
+            f"{stats['method_switches']} method switches "
+            f"(ending {stats['final_method']})"
+        )
+
+    if stats["min_step"] is not None:
+        parts.append(
+            f"step {stats['min_step']:.3g}-"
+            f"{stats['max_step']:.3g} s"
+        )
+
+    if "rhs_share" in stats.keys():
+        parts.append(
+            f"RHS {stats['rhs_share']:.0%} of "
+            f"{stats['integration_wall_time']:.3g} s"
+        )
+
+    return f"{stats['integrator']}: " + ", ".join(parts)
@@ -0,0 +1,363 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+from scipy.integrate import odeint, solve_ivp
+
+from asr_inject.operations import diagnostics
+from asr_inject.operations.kernel import ReservoirKernel
+from asr_inject.operations.metrics import derived_metrics
+from asr_inject.operations.reservoir import (
+    ODEINT_TOLERANCE, RECOVERY_STOPS, Reservoir
+)
+from asr_inject.utils.overrides import apply_overrides
+
+
+class ReservoirEnsemble:
+    """
+    `M` independent `Reservoir` configurations integrated
+    as one stacked state of shape `(M, 2N)` with a single
+    solver call.
+
+    Without recovery, the members relax by diffusion
+    alone and their ASR efficiency is undefined; with it,
+    every member's well shuts on its own events (see
+    `integrate_recovery`).
+    """
+
+    def __init__(self, reservoirs: list[Reservoir]) -> None:
+        """
+        """
+        self.reservoirs = reservoirs
+
+
+    @classmethod
+    def from_overrides(
+            cls, *, config: dict[str, Any],
+            fitting: dict[str, Any],
+            overrides: list[dict[str, Any]]
+    ) -> "ReservoirEnsemble":
+        """
+        One member per entry of `overrides`, each mapping
+        dotted parameter paths of `config` (e.g.
+        `"reservoir_conditions.temperature"`) to values.
+        """
+        return cls([
+            Reservoir(
+                config=apply_overrides(config, member),
+                fitting=fitting
+            )
+            for member in overrides
+        ])
+
+
+    def __len__(self) -> int:
+        """
+        """
+        return len(self.reservoirs)
+
+
+    def kernel(
+            self, *, layout: str="cell",
+            backend: str | None=None
+    ) -> ReservoirKernel:
+        """
+        """
+        return ReservoirKernel.from_reservoirs(
+            self.reservoirs, layout=layout, backend=backend
+        )
+
+
+    def integrate_recovery(
+            self, kernel: ReservoirKernel, time: NDArray, *,
+            jacobian: str | None, hmax: float | None
+    ) -> tuple[NDArray, NDArray, list[str | None], dict[str, Any]]:
+        """
+        Integrates the stacked state over `time` while
+        every member's well withdraws its
+        `recovery.flow_rate`, shutting it for good on the
+        member's own threshold or depletion event (see
+        `Reservoir.integrate_recovery`). The solver stops
+        at every switch and restarts with that member's
+        well shut.
+
+        Returns
+        -------
+        The trajectory at `time` (in the kernel's layout),
+        per member the time its well shut (NaN if it
+        produced throughout) and why, and the merged
+        solver statistics.
+        """
+        width = kernel.size // len(self)
+        rates = np.asarray([
+            res.parameters.recovery_rate for res in self.reservoirs
+        ])
+
+        def member_event(member: int, name: str) -> Any:
+            """
+            """
+            res = self.reservoirs[member]
+            event = res.fresh_events(res.kernel())[name]
+
+            def member_state(t: float, moles: NDArray) -> float:
+                """
+                """
+                return event(
+                    t, kernel.to_species(moles)[
+                        member * width:(member + 1) * width
+                    ]
+                )
+
+            member_state.terminal = True
+            member_state.direction = event.direction
+
+            return member_state
+
+        events = {
+            (member, name): member_event(member, name)
+            for member in range(len(self))
+            for name in RECOVERY_STOPS
+        }
+
+        state = kernel.to_layout(np.concatenate([
+            res.parameters.initial_moles for res in self.reservoirs
+        ]))
+        t_start = time[0]
+
+        stops = np.full(len(self), np.nan)
+        reasons = [None] * len(self)
+
+        # nothing to recover where either condition already holds
+        for (member, name), event in events.items():
+            if reasons[member] is None and (
+                event(t_start, state) * event.direction >= 0.
+            ):
+                stops[member], reasons[member] = t_start, name
+
+        jacobian_kwargs = kernel.solver_jacobian(jacobian, solver="ivp")
+
+        result = np.empty((len(time), kernel.size))
+        result[0] = state
+        filled = 1
+        segments = []
+
+        while filled < len(time):
+            producing = [
+                key for key in events.keys()
+                if reasons[key[0]] is None
+            ]
+
+            kernel.set_well(
+                rate=np.where(np.isnan(stops), -rates, 0.)
+            )
+
+            try:
+                solution = solve_ivp(
+                    lambda t, moles: kernel.rhs(moles, t),
+                    (t_start, time[-1]), state,
+                    method="LSODA", t_eval=time[filled:],
+                    events=[events[key] for key in producing] or None,
+                    max_step=(
+                        hmax if hmax else np.inf
+                    ),
+                    rtol=ODEINT_TOLERANCE, atol=ODEINT_TOLERANCE,
+                    **jacobian_kwargs
+                )
+
+            finally:
+                kernel.set_well(rate=0.)
+
+            segments.append(diagnostics.from_solve_ivp(solution))
+
+            result[filled:filled + len(solution.t)] = solution.y.T
+            filled += len(solution.t)
+
+            switched = [
+                (key, t_events, y_events)
+                for key, t_events, y_events in zip(
+                    producing, solution.t_events or [],
+                    solution.y_events or []
+                )
+                if t_events.size
+            ]
+
+            if not switched:
+                if filled < len(time):
+                    raise RuntimeError(solution.message)
+
+                break
+
+            for (member, name), t_events, y_events in switched:
+                stops[member], reasons[member] = t_events[0], name
+                t_start, state = t_events[0], y_events[0]
+
+        return result, stops, reasons, (
+            diagnostics.merge(segments) if segments
+            else diagnostics.skipped(
+                "solve_ivp", "no output points past the start"
+            )
+        )
+
+
+    def predict(
+            self, *, n_steps: int, step_size: float,
+            hmax: float | None=None,
+            jacobian: str | None="banded",
+            output_times: NDArray | None=None,
+            recovery: bool=False,
+            backend: str | None=None
+    ) -> dict[str, NDArray]:
+        """
+        Arguments
+        ---------
+        jacobian: `str | None="banded"`
+            `"banded"` exploits the block-diagonal,
+            nearest-neighbour structure so that the cost
+            grows linearly with the ensemble size; `"dense"`
+            or `None` (finite differences) as in
+            `Reservoir.predict`.
+
+        recovery: `bool=False`
+            if `True`, every member's well recovers its
+            fresh segment (see `integrate_recovery`), and
+            the output also holds the per-member
+            `"time_to_recovery_stop"` and `"recovery_stop"`
+            reasons; the times to the recovery limit and to
+            full recovery then follow from these events,
+            as in `Reservoir.predict`.
+
+        backend: `str | None=None`
+            kernel backend, as in `Reservoir.predict`.
+
+        Returns
+        -------
+        Per-member trajectories (`"moles"` with shape
+        `(n_times, M, 6)`, `"mass_fraction_solute_fresh"`
+        and `"asr_efficiency"` with shape `(n_times, M)`,
+        NaN without recovery) and per-member `"final_efficiency"` and
+        derived metrics (see `metrics.derived_metrics`),
+        NaN where they do not apply, plus the (shared)
+        solver's `"solver_stats"`.
+        """
+        layout = ReservoirKernel.layout_for(jacobian)
+
+        time = (
+            np.arange(n_steps) * step_size
+            if output_times is None
+            else np.asarray(output_times, dtype=np.float64)
+        )
+
+        kernel = self.kernel(layout=layout, backend=backend)
+
+        if recovery:
+            result, stops, reasons, solver_stats = (
+                self.integrate_recovery(
+                    kernel, time, jacobian=jacobian, hmax=hmax
+                )
+            )
+
+        else:
+            jacobian_kwargs = kernel.solver_jacobian(jacobian)
+
+            initial_moles = np.concatenate([
+                res.parameters.initial_moles
+                for res in self.reservoirs
+            ])
+
+            result, info = odeint(
+                kernel.rhs, kernel.to_layout(initial_moles),
+                time,
+                hmax=(
+                    hmax if hmax else 0
+                ),
+                full_output=True,
+                **jacobian_kwargs
+            )
+
+            solver_stats = diagnostics.from_odeint(info)
+
+        result = kernel.to_species(result).reshape(
+            len(time), len(self), -1
+        )
+
+        moles = np.stack(
+            [
+                res.aggregate(result[:, member])
+                for member, res in enumerate(self.reservoirs)
+            ],
+            axis=1
+        )
+
+        mass_fraction = np.stack(
+            [
+                res.compute_mass_fraction_solute_fresh(
+                    moles[:, member]
+                )
+                for member, res in enumerate(self.reservoirs)
+            ],
+            axis=1
+        )
+
+        if recovery:
+            efficiency = np.stack(
+                [
+                    res.compute_efficiency(
+                        res.parameters.recovery_rate * (
+                            np.minimum(
+                                time,
+                                np.nan_to_num(stops[member], nan=np.inf)
+                            ) - time[0]
+                        )
+                    )
+                    for member, res in enumerate(self.reservoirs)
+                ],
+                axis=1
+            )
+
+        else:
+            # nothing is recovered (see `Reservoir.compute_efficiency`)
+            efficiency = np.full((len(time), len(self)), np.nan)
+
+        threshold = np.asarray([
+            res.parameters.max_solute_fraction
+            for res in self.reservoirs
+        ])
+
+        output = {
+            "time": time,
+            "moles": moles,
+            "cell_moles": result,
+            "mass_fraction_solute_fresh": mass_fraction,
+            "asr_efficiency": efficiency,
+            "final_efficiency": efficiency[-1],
+            **derived_metrics(
+                time, moles=moles,
+                mass_fraction_solute_fresh=mass_fraction,
+                asr_efficiency=efficiency,
+                max_solute_fraction=threshold,
+                backend=backend
+            ),
+            "solver_stats": solver_stats
+        }
+
+        if recovery:
+            # from the recovery events, as for a single column
+            reasons = np.asarray(reasons, dtype=object)
+
+            output.update({
+                "time_to_recovery_stop": stops,
+                "recovery_stop": reasons,
+                "time_to_recovery_limit": np.where(
+                    reasons == "threshold", stops,
+                    output["time_to_recovery_limit"]
+                ),
+                "time_to_full_recovery": np.where(
+                    reasons == "depleted", stops, np.nan
+                )
+            })
+
+        return output
+
@@ -0,0 +1,89 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import dataclasses
+from pathlib import Path
+
+
+@dataclasses.dataclass(frozen=True, slots=True, kw_only=True)
+class InMemory:
+    """
+    Integration held in memory (the default): with
+    `odeint`, or with `solve_ivp` when its events or
+    continuous solution are asked for.
+
+    Arguments
+    ---------
+    early_termination: `bool=False`
+        if `True`, stops integrating as soon as the solute
+        mass fraction of the fresh segment crosses the
+        recovery threshold, or its rate of change drops
+        below `plateau_rate`; the crossing time is
+        root-found on the continuous solution, and the
+        latter is reported as `"time_to_plateau"`. With
+        recovery, the run ends as soon as the well shuts.
+
+    plateau_rate: `float=1.e-10`
+        rate (1/s) of the fresh segment's solute mass
+        fraction below which its composition is considered
+        to have plateaued.
+
+    dense_output: `bool=False`
+        if `True`, the output's `"solution"` entry holds a
+        `DenseSolution` that evaluates the moles at
+        arbitrary times within the run.
+    """
+
+    early_termination: bool=False
+    plateau_rate: float=1.e-10
+    dense_output: bool=False
+
+
+@dataclasses.dataclass(frozen=True, slots=True, kw_only=True)
+class OnDisk:
+    """
+    Integration streamed to memory-mapped `.npy` files in
+    `storage_dir`, `chunk_size` output points at a time;
+    the output holds read-only memory maps instead of
+    in-memory arrays (see `Reservoir.iter_predict`).
+    """
+
+    storage_dir: Path
+    chunk_size: int=100000
+
+
+    def __post_init__(self) -> None:
+        """
+        """
+        if self.chunk_size < 1:
+            raise ValueError(
+                "chunks need at least one output point"
+            )
+
+
+@dataclasses.dataclass(frozen=True, slots=True, kw_only=True)
+class Checkpointed:
+    """
+    Integration in segments of `checkpoint_every` output
+    points, checkpointing the solver state and trajectory
+    to `checkpoint_dir` after each one and resuming from a
+    matching checkpoint found there (see
+    `Reservoir._integrate_checkpointed`); the directory is
+    removed once the run completes.
+    """
+
+    checkpoint_dir: Path
+    checkpoint_every: int=100000
+
+
+    def __post_init__(self) -> None:
+        """
+        """
+        if self.checkpoint_every < 1:
+            raise ValueError(
+                "checkpoints need at least one output point "
+                "per segment"
+            )
+
+
+IntegrationMode = InMemory | OnDisk | Checkpointed
@@ -0,0 +1,533 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+from scipy.sparse import csc_matrix
+
+from asr_inject.operations import chemical_potential
+from asr_inject.operations.backends import get_backend
+
+
+R = 8.314 # J/(mol.K)
+k_TO_SI = 1000.
+JACOBIAN_MODES = ("dense", "banded", None) # None: finite differences
+
+
+class ReservoirKernel:
+    """
+    Vectorised right-hand side of the reservoir mole
+    balance.
+
+    All state-independent quantities (molar masses,
+    pure-water density, salinity correction, Arrhenius
+    diffusivities, cross-sectional area and cell
+    separations) are evaluated once at construction, so
+    that every call to `rhs` reduces to a handful of
+    array operations over all cells and species.
+
+    The cells are coupled through their `N - 1` shared
+    interfaces, so the Jacobian is block-tridiagonal.
+    With the `"species"` layout the state vector is
+    `[water_0, ..., water_{N-1}, solute_0, ..., solute_{N-1}]`;
+    with the `"cell"` layout it is interleaved as
+    `[water_0, solute_0, water_1, solute_1, ...]`, which
+    keeps the Jacobian within a band of half-width 3.
+
+    Every parameter may also carry a leading axis over
+    `M` independent ensemble members, whose states are
+    concatenated member by member; the Jacobian is then
+    block-diagonal and keeps the same band.
+
+    The right-hand side and Jacobian are evaluated by a
+    pluggable backend (see `backends`). A well, if the
+    kernel has one, adds an injection source or a
+    withdrawal sink to the cells it screens (see
+    `set_well`); it is off until set.
+    """
+
+    def __init__(
+            self, *, Mr_water: float | NDArray,
+            Mr_solute: float | NDArray,
+            temperature: float | NDArray,
+            density_pure: float | NDArray,
+            salinity: dict[str, float | NDArray],
+            cs_area: float | NDArray,
+            separation: NDArray, diffusivity: NDArray,
+            well_weights: NDArray | None=None,
+            layout: str="species", backend: str | None=None
+    ) -> None:
+        """
+        Arguments
+        ---------
+        separation: `NDArray`
+            distance between the centres of neighbouring
+            cells, shape `(N - 1,)` or `(M, N - 1)`.
+
+        diffusivity: `NDArray`
+            water and solute diffusivities at every
+            interface, shape `(2, N - 1)` or `(M, 2, N - 1)`.
+
+        well_weights: `NDArray | None=None`
+            share of the well's flow through every cell,
+            shape `(N,)` or `(M, N)`; `None` for a column
+            without well.
+
+        layout: `str="species"`
+            ordering of the state vector, either
+            `"species"` or `"cell"`.
+
+        backend: `str | None=None`
+            `"numpy"` or `"numba"`; `None` for `"numpy"`
+            (see `backends.get_backend`).
+        """
+        if layout not in ("species", "cell"):
+            raise ValueError(
+                f"unknown state layout '{layout}'"
+            )
+
+        def per_member(value: float | NDArray) -> NDArray:
+            """
+            """
+            return np.reshape(
+                np.asarray(value, dtype=np.float64), (-1, 1)
+            )
+
+        separation = np.asarray(separation, dtype=np.float64)
+        separation = separation.reshape(
+            -1, separation.shape[-1]
+        )
+
+        diffusivity = np.asarray(diffusivity, dtype=np.float64)
+        diffusivity = diffusivity.reshape(
+            -1, 2, diffusivity.shape[-1]
+        )
+
+        temperature = per_member(temperature)
+
+        self.n_cells = separation.shape[-1] + 1
+        self.n_members = max(
+            len(separation), len(diffusivity),
+            len(temperature), len(per_member(density_pure))
+        )
+        self.layout = layout
+        self.backend = get_backend(backend)
+
+        def broadcast(value: NDArray) -> NDArray:
+            """
+            """
+            return np.ascontiguousarray(
+                np.broadcast_to(
+                    value, (self.n_members,) + value.shape[1:]
+                )
+            )
+
+        # shape (M, 2, 1)
+        self.molar_mass = broadcast(
+            np.stack(
+                [per_member(Mr_water), per_member(Mr_solute)],
+                axis=1
+            )
+        )
+
+        # shape (M, 1)
+        self.density_pure = broadcast(per_member(density_pure))
+
+        # rho(T, S) = rho(T) + S(A0 + T.A1)
+        self.salinity_slope = broadcast(
+            per_member(salinity["A0"]) +
+            temperature * per_member(salinity["A1"])
+        )
+
+        # J = -D.c/(RT) . A . d(mu)/dz, where
+        # mu = mu_0 + R_mu.T.ln(x)
+        # -> J = -G.c.d(ln x), with G precomputed
+        self.conductance = broadcast(
+            diffusivity * per_member(cs_area)[:, :, None] *
+            chemical_potential.R * temperature[:, :, None] /
+            (
+                R * temperature[:, :, None] *
+                separation[:, None, :]
+            )
+        )
+
+        # concentration = rho . w . (1000 / Mr)
+        self.concentration_scale = (
+            k_TO_SI / self.molar_mass
+        )
+        self.half_conductance = 0.5 * self.conductance
+
+        # buffers reused by every evaluation
+        self._out = np.zeros(self.size)
+        self.flux = np.zeros(
+            (self.n_members, 2, self.n_cells - 1)
+        )
+
+        # shape (M, N)
+        self.well_weights = (
+            None if well_weights is None
+            else broadcast(
+                np.asarray(
+                    well_weights, dtype=np.float64
+                ).reshape(-1, self.n_cells)
+            )
+        )
+        self.well_rate = np.zeros((self.n_members, 1))
+        self._injection = None
+        self._withdrawal = None
+
+        self._build_sparsity()
+
+
+    @classmethod
+    def from_parameters(
+            cls, parameters: list[Any], *,
+            layout: str="species", backend: str | None=None
+    ) -> "ReservoirKernel":
+        """
+        Builds the kernel of an ensemble of columns, given
+        their `ReservoirParameters`, with the same number
+        of cells.
+        """
+        if len({member.n_cells for member in parameters}) != 1:
+            raise ValueError(
+                "ensemble members must have the same "
+                "number of cells"
+            )
+
+        def gather(name: str) -> NDArray:
+            """
+            """
+            return np.asarray(
+                [getattr(member, name) for member in parameters]
+            )
+
+        return cls(
+            layout=layout,
+            backend=backend,
+            Mr_water=gather("Mr_water"),
+            Mr_solute=gather("Mr_solute"),
+            temperature=gather("temperature"),
+            density_pure=gather("density_pure"),
+            salinity={
+                "A0": gather("salinity_A0"),
+                "A1": gather("salinity_A1")
+            },
+            cs_area=gather("cs_area"),
+            separation=gather("cell_separation"),
+            diffusivity=gather("interface_diffusivity"),
+            well_weights=gather("well_weights")
+        )
+
+
+    @classmethod
+    def from_reservoirs(
+            cls, reservoirs: list[Any], *,
+            layout: str="species", backend: str | None=None
+    ) -> "ReservoirKernel":
+        """
+        Builds the kernel of an ensemble of `Reservoir`
+        columns with the same number of cells.
+        """
+        return cls.from_parameters(
+            [res.parameters for res in reservoirs],
+            layout=layout, backend=backend
+        )
+
+
+    @classmethod
+    def from_reservoir(
+            cls, reservoir: Any, *, layout: str="species",
+            backend: str | None=None
+    ) -> "ReservoirKernel":
+        """
+        Builds the kernel of a `Reservoir` column.
+        """
+        return cls.from_reservoirs(
+            [reservoir], layout=layout, backend=backend
+        )
+
+
+    @property
+    def size(self) -> int:
+        """
+        """
+        return 2 * self.n_cells * self.n_members
+
+
+    def to_layout(self, state: NDArray) -> NDArray:
+        """
+        Reorders species-major state(s) into this kernel's
+        layout (along the last axis).
+        """
+        layout_state = np.empty_like(state)
+        layout_state[..., self._index.ravel()] = state
+
+        return layout_state
+
+
+    def to_species(self, state: NDArray) -> NDArray:
+        """
+        Reorders state(s) in this kernel's layout back into
+        the species-major layout (along the last axis).
+        """
+        return state[..., self._index.ravel()]
+
+
+    def set_well(
+            self, *, rate: float | NDArray,
+            mass_fraction_solute: float | NDArray=0.
+    ) -> None:
+        """
+        Sets the well's flow for the following evaluations,
+        per member: a positive `rate` (kg/s) injects water
+        of solute mass fraction `mass_fraction_solute`, a
+        negative one withdraws the screened cells' fluid
+        at their composition, and 0 shuts the well.
+        """
+        if self.well_weights is None:
+            raise ValueError("the kernel has no well")
+
+        rate = np.broadcast_to(
+            np.reshape(np.asarray(rate, dtype=np.float64), (-1, 1)),
+            (self.n_members, 1)
+        ).copy()
+        mass_fraction_solute = np.reshape(
+            np.asarray(mass_fraction_solute, dtype=np.float64),
+            (-1, 1)
+        )
+
+        self.well_rate = rate
+
+        # shape (M, 2, N): mass flow split by species,
+        # converted to moles, spread over the cells
+        injection = np.maximum(rate, 0.)[:, :, None] * np.stack(
+            [1. - mass_fraction_solute, mass_fraction_solute],
+            axis=1
+        ) / self.molar_mass * self.well_weights[:, None, :]
+
+        self._injection = injection if np.any(injection) else None
+
+        # shape (M, 1, N): withdrawn species k of cell i at
+        # q_i . n_k,i / m_i, with m_i the cell's mass
+        withdrawal = (
+            np.maximum(-rate, 0.) * self.well_weights
+        )[:, None, :]
+
+        self._withdrawal = withdrawal if np.any(withdrawal) else None
+
+
+    @staticmethod
+    def layout_for(jacobian: str | None) -> str:
+        """
+        State layout suited to Jacobian mode `jacobian`
+        (one of `JACOBIAN_MODES`): the banded Jacobian
+        needs the cell-interleaved layout.
+        """
+        if jacobian not in JACOBIAN_MODES:
+            raise ValueError(
+                f"unknown jacobian mode '{jacobian}'"
+            )
+
+        return "cell" if jacobian == "banded" else "species"
+
+
+    def solver_jacobian(
+            self, jacobian: str | None, *, solver: str="odeint"
+    ) -> dict[str, Any]:
+        """
+        Keyword arguments handing the analytical Jacobian
+        in mode `jacobian` (see `layout_for`) to `odeint`,
+        or, with `solver="ivp"`, to `solve_ivp` and its
+        `OdeSolver`s; none for finite differences.
+        """
+        if jacobian is None:
+            return {}
+
+        if jacobian == "banded" and self.layout != "cell":
+            raise ValueError(
+                "the banded Jacobian needs the 'cell' layout"
+            )
+
+        evaluate = (
+            self.jacobian if jacobian == "dense"
+            else self.jacobian_banded
+        )
+
+        if solver == "odeint":
+            kwargs = {"Dfun": evaluate}
+            if jacobian == "banded":
+                kwargs["ml"] = kwargs["mu"] = self.bandwidth
+
+            return kwargs
+
+        kwargs = {"jac": lambda t, moles: evaluate(moles, t)}
+        if jacobian == "banded":
+            kwargs["lband"] = kwargs["uband"] = self.bandwidth
+
+        return kwargs
+
+
+    @property
+    def bandwidth(self) -> int:
+        """
+        Half-width of the Jacobian band in this layout.
+        """
+        return int(np.max(np.abs(self._rows - self._cols)))
+
+
+    def _view(self, state: NDArray) -> NDArray:
+        """
+        Member-by-species-by-cell `(M, 2, N)` view of a
+        state vector.
+        """
+        if self.layout == "cell":
+            return state.reshape(
+                self.n_members, self.n_cells, 2
+            ).transpose(0, 2, 1)
+
+        return state.reshape(self.n_members, 2, self.n_cells)
+
+
+    def _build_sparsity(self) -> None:
+        """
+        Row/column indices of the Jacobian entries, in
+        the order in which `_local_jacobian` returns them.
+        """
+        self._index = self._view(np.arange(self.size))
+
+        left = self._index[..., :-1]
+        right = self._index[..., 1:]
+
+        # well blocks within every cell; axes: (member, flux
+        # species, state species, cell)
+        well_shape = (self.n_members, 2, 2, self.n_cells)
+        self._well_rows = np.broadcast_to(
+            self._index[:, :, None, :], well_shape
+        ).ravel()
+        self._well_cols = np.broadcast_to(
+            self._index[:, None, :, :], well_shape
+        ).ravel()
+
+        # axes: (block, member, flux species, state species,
+        # interface)
+        shape = (4, self.n_members, 2, 2, self.n_cells - 1)
+        rows = np.empty(shape, dtype=np.intp)
+        cols = np.empty(shape, dtype=np.intp)
+
+        for block, (row, col) in enumerate(
+            [(left, left), (left, right),
+             (right, left), (right, right)]
+        ):
+            rows[block] = row[:, :, None, :]
+            cols[block] = col[:, None, :, :]
+
+        self._rows = rows.ravel()
+        self._cols = cols.ravel()
+
+
+    def rhs(self, moles: NDArray, t: float) -> NDArray:
+        """
+        Rate of change of the moles of every species in
+        every cell.
+
+        The returned array is a buffer owned by the kernel
+        and is overwritten by the next call; copy it if it
+        needs to outlive the call.
+        """
+        moles_view = self._view(moles)
+        out_view = self._view(self._out)
+
+        self.backend.rhs(self, moles_view, out_view)
+
+        if self._injection is not None:
+            out_view += self._injection
+
+        if self._withdrawal is not None:
+            mass = np.sum(
+                moles_view * self.molar_mass, axis=1, keepdims=True
+            )
+            out_view -= self._withdrawal * moles_view / mass
+
+        return self._out
+
+
+    def _local_jacobian(
+            self, moles: NDArray
+    ) -> tuple[NDArray, NDArray, NDArray]:
+        """
+        Row indices, column indices and values of the
+        non-zero entries of the Jacobian (duplicates add
+        up).
+        """
+        moles_view = self._view(moles)
+        values = self.backend.local_jacobian(self, moles_view)
+
+        if self._withdrawal is None:
+            return self._rows, self._cols, values
+
+        # d(n_k / m)/d(n_j) = delta_kj / m - n_k . Mr_j / m^2
+        mass = np.sum(
+            moles_view * self.molar_mass, axis=1, keepdims=True
+        )
+        well = -(
+            self._withdrawal[:, :, None, :] / mass[:, :, None, :]
+        ) * (
+            np.eye(2)[None, :, :, None] -
+            moles_view[:, :, None, :] *
+            self.molar_mass[:, None, :, :] /
+            mass[:, :, None, :]
+        )
+
+        return (
+            np.concatenate([self._rows, self._well_rows]),
+            np.concatenate([self._cols, self._well_cols]),
+            np.concatenate([values, well.ravel()])
+        )
+
+
+    def jacobian(self, moles: NDArray, t: float) -> NDArray:
+        """
+        Dense analytical Jacobian, `J[i, j] = d(f_i)/d(y_j)`.
+        """
+        size = self.size
+        rows, cols, values = self._local_jacobian(moles)
+
+        return np.bincount(
+            rows * size + cols, weights=values,
+            minlength=size * size
+        ).reshape(size, size)
+
+
+    def jacobian_banded(
+            self, moles: NDArray, t: float
+    ) -> NDArray:
+        """
+        Analytical Jacobian in LAPACK banded storage,
+        `J_banded[i - j + bandwidth, j] = d(f_i)/d(y_j)`,
+        as expected by `odeint` with `ml = mu = bandwidth`.
+        """
+        size = self.size
+        bandwidth = self.bandwidth
+        rows, cols, values = self._local_jacobian(moles)
+
+        return np.bincount(
+            (rows - cols + bandwidth) * size + cols,
+            weights=values,
+            minlength=(2 * bandwidth + 1) * size
+        ).reshape(2 * bandwidth + 1, size)
+
+
+    def jacobian_sparse(
+            self, moles: NDArray, t: float
+    ) -> csc_matrix:
+        """
+        Analytical Jacobian as a `scipy.sparse` matrix.
+        """
+        rows, cols, values = self._local_jacobian(moles)
+
+        return csc_matrix(
+            (values, (rows, cols)), shape=(self.size, self.size)
+        )
@@ -0,0 +1,127 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from asr_inject.operations.backends import get_backend
+
+
+FULL_RECOVERY_TOLERANCE = 0.0001
+EFFICIENCY_LEVELS = (0.5, 0.9, 0.99)
+
+def first_crossing(
+        time: NDArray, series: NDArray, *,
+        threshold: float | NDArray,
+        backend: str | None=None
+) -> NDArray:
+    """
+    First time at which `series` reaches `threshold`,
+    linearly interpolated between output points, or NaN
+    if it never does.
+
+    Scans the first (time) axis of `series` once,
+    vectorised over any trailing (e.g. member) axes, with
+    `threshold` broadcast against them.
+    """
+    return get_backend(backend).first_crossing(
+        time, np.asarray(series), threshold=threshold
+    )
+
+def first_converged(
+        time: NDArray, series: NDArray, *,
+        tolerance: float=FULL_RECOVERY_TOLERANCE,
+        backend: str | None=None
+) -> NDArray:
+    """
+    First time from which `series` stays within
+    `tolerance` below its final value; NaN if the latter
+    is undefined (NaN).
+    """
+    return get_backend(backend).first_converged(
+        time, np.asarray(series), tolerance=tolerance
+    )
+
+def derived_metrics(
+        time: NDArray, *, moles: NDArray,
+        mass_fraction_solute_fresh: NDArray,
+        asr_efficiency: NDArray,
+        max_solute_fraction: float | NDArray,
+        backend: str | None=None
+) -> dict[str, NDArray]:
+    """
+    Scalar metrics of a trajectory (or, with a trailing
+    member axis, of an ensemble), each from a single
+    vectorised scan over the shared `time` axis; NaN
+    where they do not apply.
+
+    Returns
+    -------
+    `"time_to_recovery_limit"`, `"time_to_full_recovery"`
+    (only if the limit is never reached), the times at
+    which the ASR efficiency first reaches each of
+    `EFFICIENCY_LEVELS` (e.g. `"time_to_90pct_efficiency"`),
+    and the `"peak_solute_interlayer"` moles with their
+    `"time_to_peak_solute_interlayer"`. The efficiency
+    metrics are NaN where `asr_efficiency` is undefined
+    (NaN, without a well).
+
+    The scans run on kernel backend `backend` (see
+    `backends.get_backend`).
+    """
+    backend = get_backend(backend)
+
+    time_to_recovery_limit = backend.first_crossing(
+        time, np.asarray(mass_fraction_solute_fresh),
+        threshold=max_solute_fraction
+    )
+
+    metrics = {
+        "time_to_recovery_limit": time_to_recovery_limit,
+        "time_to_full_recovery": np.where(
+            np.isnan(time_to_recovery_limit),
+            backend.first_converged(
+                time, np.asarray(asr_efficiency),
+                tolerance=FULL_RECOVERY_TOLERANCE
+            ),
+            np.nan
+        )
+    }
+
+    for level in EFFICIENCY_LEVELS:
+        metrics[f"time_to_{round(level * 100)}pct_efficiency"] = (
+            backend.first_crossing(
+                time, np.asarray(asr_efficiency), threshold=level
+            )
+        )
+
+    solute_interlayer = moles[..., 4]
+    peak = backend.peak(solute_interlayer)
+
+    metrics["peak_solute_interlayer"] = np.take_along_axis(
+        solute_interlayer, np.expand_dims(peak, 0), axis=0
+    )[0]
+    metrics["time_to_peak_solute_interlayer"] = time[peak]
+
+    return metrics
+
+def final_efficiency(asr_efficiency: NDArray) -> float | None:
+    """
+    Final ASR efficiency of a single trajectory, or
+    `None` if it is undefined (without a well).
+    """
+    value = float(asr_efficiency[-1])
+
+    return None if np.isnan(value) else value
+
+def as_scalars(metrics: dict[str, NDArray]) -> dict[str, Any]:
+    """
+    Single-trajectory `metrics` as floats, with `None`
+    for those that do not apply.
+    """
+    return {
+        key: None if np.isnan(value) else float(value)
+        for key, value in metrics.items()
+    }
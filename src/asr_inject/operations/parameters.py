@@ -0,0 +1,400 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import dataclasses
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+R = 8.314 # J/(mol.K)
+CELSIUS_TO_KELVIN = 273.15
+BAR_TO_PA = 10.**5.
+
+
+def derived() -> Any:
+    """
+    A field computed in `__post_init__`, left out of the
+    constructor, comparisons and hash.
+    """
+    return dataclasses.field(init=False, repr=False, compare=False)
+
+
+@dataclasses.dataclass(frozen=True, slots=True, kw_only=True)
+class ReservoirParameters:
+    """
+    Immutable parameters of a reservoir column: the
+    configured values and fitted coefficients, plus every
+    state-independent quantity derived from them,
+    computed once at construction.
+
+    Equality and hashing consider the configured values
+    only, which determine the derived ones; pickling
+    ships the former and re-derives the latter.
+    """
+
+    Mr_water: float
+    Mr_solute: float
+    length: float
+    width: float
+    height: float
+    interlayer_thickness: float
+    temperature: float # K
+    pressure: float # Pa
+    volume_fraction_fresh: float
+    mass_fraction_solute_fresh_initial: float
+    mass_fraction_solute_saline_initial: float
+    recovery_rate: float
+    max_solute_fraction: float
+    n_cells: int=3
+    interlayer_cells: int=1
+    grading: float=1.
+    density_coefficients: tuple[float, ...]
+    salinity_A0: float
+    salinity_A1: float
+    water_diff_fresh_segment: tuple[float, float]
+    water_diff_saline_segment: tuple[float, float]
+    solute_diff_fresh_segment: tuple[float, float]
+    solute_diff_saline_segment: tuple[float, float]
+
+    mass_fraction_water_fresh_initial: float = derived()
+    mass_fraction_water_saline_initial: float = derived()
+    mass_fraction_solute_interlayer_initial: float = derived()
+    volume_fraction_saline: float = derived()
+    cs_area: float = derived()
+    numerical_separation: tuple[float, float] = derived()
+    volume: float = derived()
+    volume_interlayer: float = derived()
+    volume_fresh: float = derived()
+    volume_saline: float = derived()
+    density_pure: float = derived()
+    mass_water_fresh_initial: float = derived()
+    mass_water_saline_initial: float = derived()
+    mass_water_interlayer_initial: float = derived()
+    mass_solute_fresh_initial: float = derived()
+    mass_solute_saline_initial: float = derived()
+    mass_solute_interlayer_initial: float = derived()
+    moles_water_fresh_initial: float = derived()
+    moles_water_saline_initial: float = derived()
+    moles_water_interlayer_initial: float = derived()
+    moles_solute_fresh_initial: float = derived()
+    moles_solute_saline_initial: float = derived()
+    moles_solute_interlayer_initial: float = derived()
+    diffusivity_water_fresh_segment: float = derived()
+    diffusivity_water_saline_segment: float = derived()
+    diffusivity_solute_fresh_segment: float = derived()
+    diffusivity_solute_saline_segment: float = derived()
+    n_cells_fresh: int = derived()
+    cell_heights: NDArray = derived()
+    cell_zones: NDArray = derived()
+    cell_separation: NDArray = derived()
+    interface_diffusivity: NDArray = derived()
+    cell_mass_fraction_solute_initial: NDArray = derived()
+    initial_moles: NDArray = derived()
+    well_weights: NDArray = derived()
+    zone_matrix: NDArray | None = derived()
+
+
+    @classmethod
+    def from_config(
+            cls, *, config: dict[str, Any],
+            fitting: dict[str, Any]
+    ) -> "ReservoirParameters":
+        """
+        Parameters of a parsed configuration (with its
+        fitting data removed) and its fitted coefficients.
+        """
+        column = (
+            config["column"] if "column" in config.keys()
+            else {}
+        )
+
+        return cls(
+            Mr_water=config[
+                "solution_characteristics"
+            ]["Mr_water"],
+            Mr_solute=config[
+                "solution_characteristics"
+            ]["Mr_solute"],
+            length=config["reservoir_dimensions"]["length"],
+            width=config["reservoir_dimensions"]["width"],
+            height=config["reservoir_dimensions"]["height"],
+            interlayer_thickness=config[
+                "reservoir_dimensions"
+            ]["interlayer_thickness"],
+            temperature=config["reservoir_conditions"][
+                "temperature"
+            ] + CELSIUS_TO_KELVIN,
+            pressure=config["reservoir_conditions"][
+                "pressure"
+            ] * BAR_TO_PA,
+            volume_fraction_fresh=config["fresh_segment"][
+                "volume_fraction"
+            ],
+            mass_fraction_solute_fresh_initial=config[
+                "fresh_segment"
+            ]["solute_mass_fraction"],
+            mass_fraction_solute_saline_initial=config[
+                "saline_segment"
+            ]["solute_mass_fraction"],
+            recovery_rate=config["recovery"]["flow_rate"],
+            max_solute_fraction=config[
+                "recovery"
+            ]["threshold_solute_mass_fraction"],
+            **{
+                key: column[key]
+                for key in ["n_cells", "interlayer_cells", "grading"]
+                if key in column.keys()
+            },
+            density_coefficients=tuple(
+                float(coeff)
+                for coeff in fitting["density"]["temperature"]
+            ),
+            salinity_A0=fitting["density"]["salinity"]["A0"],
+            salinity_A1=fitting["density"]["salinity"]["A1"],
+            **{
+                key: tuple(float(value) for value in fitting[key])
+                for key in [
+                    "water_diff_fresh_segment",
+                    "water_diff_saline_segment",
+                    "solute_diff_fresh_segment",
+                    "solute_diff_saline_segment"
+                ]
+            }
+        )
+
+
+    def __post_init__(self) -> None:
+        """
+        """
+        if self.n_cells < self.interlayer_cells + 2:
+            raise ValueError(
+                "the column needs at least one fresh and one "
+                "saline cell besides the interlayer cells"
+            )
+
+        for name, value in self._derive().items():
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+
+            object.__setattr__(self, name, value)
+
+
+    def __reduce__(self) -> tuple:
+        """
+        """
+        return _rebuild, (
+            type(self),
+            {
+                field.name: getattr(self, field.name)
+                for field in dataclasses.fields(self)
+                if field.init
+            }
+        )
+
+
+    def _derive(self) -> dict[str, Any]:
+        """
+        State-independent quantities of the column, in
+        dependency order.
+        """
+        values = {}
+
+        values["mass_fraction_water_fresh_initial"] = (
+            1. - self.mass_fraction_solute_fresh_initial
+        )
+        values["mass_fraction_water_saline_initial"] = (
+            1. - self.mass_fraction_solute_saline_initial
+        )
+        values["mass_fraction_solute_interlayer_initial"] = 0.5 * (
+            self.mass_fraction_solute_fresh_initial +
+            self.mass_fraction_solute_saline_initial
+        )
+
+        volume_fraction_saline = 1. - self.volume_fraction_fresh
+        values["volume_fraction_saline"] = volume_fraction_saline
+
+        cs_area = self.length * self.width
+        values["cs_area"] = cs_area
+
+        height_fresh = self.height * self.volume_fraction_fresh
+        height_saline = self.height * volume_fraction_saline
+
+        values["numerical_separation"] = (
+            (
+                0.5 * height_fresh +
+                0.5 * self.interlayer_thickness
+            ),
+            (
+                0.5 * self.interlayer_thickness +
+                0.5 * height_saline
+            )
+        )
+
+        volume = self.length * self.width * self.height
+        values["volume"] = volume
+        values["volume_interlayer"] = (
+            cs_area * self.interlayer_thickness
+        )
+        values["volume_fresh"] = volume * self.volume_fraction_fresh
+        values["volume_saline"] = volume * volume_fraction_saline
+
+        density_pure = 0.
+        for idx, coeff in enumerate(self.density_coefficients):
+            density_pure += coeff * self.temperature**idx
+
+        values["density_pure"] = density_pure
+
+        for zone in ["fresh", "saline", "interlayer"]:
+            mass = density_pure * values[f"volume_{zone}"]
+            solute = (
+                values["mass_fraction_solute_interlayer_initial"]
+                if zone == "interlayer"
+                else getattr(
+                    self, f"mass_fraction_solute_{zone}_initial"
+                )
+            )
+
+            values[f"mass_water_{zone}_initial"] = (
+                mass * (1. - solute)
+            )
+            values[f"mass_solute_{zone}_initial"] = mass * solute
+
+            values[f"moles_water_{zone}_initial"] = (
+                values[f"mass_water_{zone}_initial"] /
+                self.Mr_water
+            )
+            values[f"moles_solute_{zone}_initial"] = (
+                values[f"mass_solute_{zone}_initial"] /
+                self.Mr_solute
+            )
+
+        # Arrhenius: D = D0 . exp(-Ea / RT)
+        for species in ["water", "solute"]:
+            for segment in ["fresh", "saline"]:
+                base, energy = getattr(
+                    self, f"{species}_diff_{segment}_segment"
+                )
+
+                values[f"diffusivity_{species}_{segment}_segment"] = (
+                    base * np.exp(-energy / (R * self.temperature))
+                )
+
+        # column discretisation
+        n_bulk = self.n_cells - self.interlayer_cells
+        n_fresh = min(
+            max(1, round(n_bulk * self.volume_fraction_fresh)),
+            n_bulk - 1
+        )
+        n_saline = n_bulk - n_fresh
+        values["n_cells_fresh"] = n_fresh
+
+        def graded(height: float, n: int) -> NDArray:
+            """
+            """
+            ratios = self.grading ** np.arange(n)
+
+            return height * ratios / np.sum(ratios)
+
+        # top (fresh) to bottom (saline); bulk cells grow
+        # geometrically by `grading` away from the interlayer
+        cell_heights = np.concatenate([
+            graded(height_fresh, n_fresh)[::-1],
+            np.full(
+                self.interlayer_cells,
+                self.interlayer_thickness /
+                self.interlayer_cells
+            ),
+            graded(height_saline, n_saline)
+        ])
+        values["cell_heights"] = cell_heights
+
+        # 0 (fresh), 1 (interlayer) or 2 (saline)
+        cell_zones = np.concatenate([
+            np.zeros(n_fresh, dtype=np.intp),
+            np.ones(self.interlayer_cells, dtype=np.intp),
+            np.full(n_saline, 2, dtype=np.intp)
+        ])
+        values["cell_zones"] = cell_zones
+
+        values["cell_separation"] = 0.5 * (
+            cell_heights[:-1] + cell_heights[1:]
+        )
+
+        # interfaces above the middle of the interlayer take
+        # the fresh-segment values
+        depth = np.cumsum(cell_heights)[:-1]
+        fresh = depth <= (
+            height_fresh + 0.5 * self.interlayer_thickness
+        ) * (1. + 1.e-12)
+
+        values["interface_diffusivity"] = np.asarray([
+            np.where(
+                fresh,
+                values[f"diffusivity_{species}_fresh_segment"],
+                values[f"diffusivity_{species}_saline_segment"]
+            )
+            for species in ["water", "solute"]
+        ])
+
+        # linear across the interlayer
+        centres = np.cumsum(cell_heights) - 0.5 * cell_heights
+        interlayer_position = (
+            centres - height_fresh
+        ) / self.interlayer_thickness
+
+        mass_fraction = np.select(
+            [cell_zones == 0, cell_zones == 2],
+            [
+                self.mass_fraction_solute_fresh_initial,
+                self.mass_fraction_solute_saline_initial
+            ],
+            default=(
+                self.mass_fraction_solute_fresh_initial +
+                interlayer_position * (
+                    self.mass_fraction_solute_saline_initial -
+                    self.mass_fraction_solute_fresh_initial
+                )
+            )
+        )
+        values["cell_mass_fraction_solute_initial"] = mass_fraction
+
+        # species-major (all water, then all solute)
+        mass = density_pure * cs_area * cell_heights
+        values["initial_moles"] = np.concatenate([
+            mass * (1. - mass_fraction) / self.Mr_water,
+            mass * mass_fraction / self.Mr_solute
+        ])
+
+        # the well screens the fresh segment; each fresh cell
+        # takes a share of its flow proportional to its height
+        values["well_weights"] = np.where(
+            cell_zones == 0, cell_heights / height_fresh, 0.
+        )
+
+        # sums column states into the six zone totals; `None`
+        # for the three-cell column, where the two coincide
+        if self.n_cells == 3:
+            values["zone_matrix"] = None
+
+        else:
+            zone_matrix = np.zeros((2 * self.n_cells, 6))
+            cells = np.arange(self.n_cells)
+
+            zone_matrix[cells, cell_zones] = 1.
+            zone_matrix[self.n_cells + cells, 3 + cell_zones] = 1.
+
+            values["zone_matrix"] = zone_matrix
+
+        return values
+
+
+def _rebuild(
+        cls: type[ReservoirParameters], values: dict[str, Any]
+) -> ReservoirParameters:
+    """
+    Unpickles `ReservoirParameters` from its configured
+    values.
+    """
+    return cls(**values)
@@ -1,18 +1,41 @@
 """ Licensed under the same terms as described in the main 
 licensing script of this repository. """
 
+import json
+import logging
 import yaml
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 
+from asr_inject.operations import diagnostics
+from asr_inject.operations.cycles import CycleSchedule
+from asr_inject.operations.integration import (
+    Checkpointed, InMemory, IntegrationMode, OnDisk
+)
+from asr_inject.operations.metrics import (
+    EFFICIENCY_LEVELS, final_efficiency
+)
 from asr_inject.operations.reservoir import Reservoir
 from asr_inject.operations.visualise import plot_2d
+from asr_inject.utils import profiling
+from asr_inject.utils.cache import ResultCache, content_hash
+from asr_inject.utils.figures import render_all
 from asr_inject.utils.fitting import (
-    arrhenius_fit, density_fit
+    arrhenius_figure, arrhenius_fit, density_figure,
+    density_fit
 )
+from asr_inject.utils.schedule import output_times
+
 
+RESUME_CONFIG = "config.yml"
+EXCLUSIVE_OPTIONS = {
+    "checkpoint_every": (
+        "early_termination", "dense_output", "memmap_trajectory"
+    ),
+    "memmap_trajectory": ("early_termination", "dense_output")
+} # per mode-selecting key, options of the other integration modes
 
 def read_yaml(dir: Path) -> dict[str, Any]:
     """
@@ -20,74 +43,320 @@ def read_yaml(dir: Path) -> dict[str, Any]:
     with open(f"{dir}", 'r') as file:
         return yaml.safe_load(file)
 
-def run(config: Path, *, outdir: Path) -> None:
+def run(
+        config: Path, *, outdir: Path,
+        logger: logging.Logger | None=None,
+        plots: bool | None=None
+) -> dict[str, Any]:
     """
+    `plots`, if given, overrides the configuration's
+    `plots` switch.
     """
     # read `.yml`
-    config_dict = read_yaml(config)
+    with profiling.stage("config_load"):
+        config_dict = read_yaml(config)
 
-    # fit density
-    density_data = config_dict.pop("density")
+    # kept with the checkpoints, for `--resume <outdir>`
+    if config_dict.get("checkpoint_every", None):
+        outdir.mkdir(parents=True, exist_ok=True)
+        with open(outdir / RESUME_CONFIG, 'w') as file:
+            yaml.safe_dump(config_dict, file, sort_keys=False)
+
+    if plots is not None:
+        config_dict["plots"] = plots
+
+    output = run_config(
+        config_dict, outdir=outdir, logger=logger
+    )
+
+    # temporary prints
+    print(
+        "final efficiency: "
+        f"{final_efficiency(output['asr_efficiency'])}"
+    )
 
-    density_coefficients = density_fit(
-        density_data,
-        outfile=(
-            outdir / "fitting" / "density.png"
+    if output['time_to_recovery_limit'] is not None:
+        print(
+            "time to recovery limit: "
+            f"{output['time_to_recovery_limit'] / 86400.} "
+            "days"
         )
+
+    elif output.get('time_to_plateau') is not None:
+        print(
+            "time to plateau: "
+            f"{output['time_to_plateau'] / 86400.} "
+            "days"
+        )
+
+    elif output['time_to_full_recovery'] is not None:
+        print(
+            "time to full recovery: "
+            f"{output['time_to_full_recovery'] / 86400.} "
+            "days"
+        )
+
+    for level in EFFICIENCY_LEVELS:
+        key = f"time_to_{round(level * 100)}pct_efficiency"
+
+        if output.get(key) is not None:
+            print(
+                f"time to {level:.0%} efficiency: "
+                f"{output[key] / 86400.} days"
+            )
+
+    return output
+
+def check_config(config_dict: dict[str, Any]) -> None:
+    """
+    Rejects options of more than one integration mode
+    (see `integration_mode`), naming their configuration
+    keys.
+    """
+    cycles = (
+        config_dict["cycles"]
+        if "cycles" in config_dict.keys()
+        else None
     )
 
-    # fit water diffusivity
-    water_diffusivity_data = config_dict.pop(
-        "water_diffusivity"
+    # cycles integrate through their own phases
+    if cycles and cycles["n_cycles"]:
+        return
+
+    for option, excluded in EXCLUSIVE_OPTIONS.items():
+        if not config_dict.get(option, None):
+            continue
+
+        conflicts = [
+            key for key in excluded if config_dict.get(key, None)
+        ]
+
+        if conflicts:
+            raise ValueError(
+                f"`{option}` cannot be combined with "
+                + ", ".join(f"`{key}`" for key in conflicts)
+            )
+
+def integration_mode(
+        config_dict: dict[str, Any], *, outdir: Path
+) -> IntegrationMode:
+    """
+    Integration mode of `Reservoir.predict` selected by a
+    parsed configuration whose options `check_config`
+    accepts: checkpointed if `checkpoint_every` is set,
+    on disk if `memmap_trajectory` is, in memory
+    otherwise.
+    """
+    if config_dict.get("checkpoint_every", None):
+        return Checkpointed(
+            checkpoint_dir=outdir / "checkpoint",
+            checkpoint_every=config_dict["checkpoint_every"]
+        )
+
+    if config_dict.get("memmap_trajectory", False):
+        return OnDisk(
+            storage_dir=outdir / "trajectory",
+            chunk_size=(
+                config_dict["chunk_size"]
+                if "chunk_size" in config_dict.keys()
+                else 100000
+            )
+        )
+
+    return InMemory(
+        early_termination=(
+            config_dict["early_termination"]
+            if "early_termination" in config_dict.keys()
+            else False
+        ),
+        plateau_rate=(
+            config_dict["plateau_rate"]
+            if "plateau_rate" in config_dict.keys()
+            else 1.e-10
+        ),
+        dense_output=(
+            config_dict["dense_output"]
+            if "dense_output" in config_dict.keys()
+            else False
+        )
     )
 
-    water_diff_coeff_fresh_segment = arrhenius_fit(
-        np.asarray(
-            water_diffusivity_data["fresh_segment"],
-            dtype=np.float64
+def predict_options(
+        config_dict: dict[str, Any], *, outdir: Path
+) -> dict[str, Any]:
+    """
+    Keyword arguments of `Reservoir.predict` set by a
+    parsed configuration.
+    """
+    return {
+        "n_steps": config_dict["n_steps"],
+        "step_size": config_dict["step_size"],
+        "hmax": (
+            config_dict["hmax"]
+            if "hmax" in config_dict.keys()
+            else None
+        ),
+        "jacobian": (
+            config_dict["jacobian"]
+            if "jacobian" in config_dict.keys()
+            else "dense"
         ),
-        outfile=(
-            outdir / "fitting" /
-            "water_diffusivity_fresh_segment.png"
+        "output_times": output_times(
+            (
+                config_dict["output_schedule"]
+                if "output_schedule" in config_dict.keys()
+                else None
+            ),
+            n_steps=config_dict["n_steps"],
+            step_size=config_dict["step_size"]
+        ),
+        "mode": integration_mode(config_dict, outdir=outdir),
+        "recovery": (
+            config_dict["recovery"]["enabled"]
+            if "enabled" in config_dict["recovery"].keys()
+            else False
+        ),
+        "backend": (
+            config_dict["kernel_backend"]
+            if "kernel_backend" in config_dict.keys()
+            else None
+        )
+    }
+
+def run_config(
+        config_dict: dict[str, Any], *, outdir: Path,
+        logger: logging.Logger | None=None
+) -> dict[str, Any]:
+    """
+    Fits, simulates and plots a parsed configuration,
+    reusing cached results when the configuration's
+    `cache` is enabled and cached fits when its `fits`
+    are. No figures are drawn if its `plots` is `False`.
+    """
+    check_config(config_dict)
+
+    plots = (
+        config_dict["plots"] if "plots" in config_dict.keys()
+        else True
+    )
+
+    cache_config = (
+        config_dict.pop("cache") if "cache" in config_dict.keys()
+        else {"enabled": False}
+    )
+
+    fit_cache, figure_cache = (
+        [
+            ResultCache(
+                Path(cache_config["directory"]) / name,
+                max_bytes=int(cache_config["max_size_mb"] * 2**20)
+            )
+            for name in ["fits", "figures"]
+        ]
+        if cache_config.get("fits", False) else [None, None]
+    )
+
+    # fit density
+    density_data = config_dict.pop("density")
+
+    with profiling.stage("fit density"):
+        density_coefficients = density_fit(
+            density_data,
+            cache=fit_cache
         )
+
+    # fit water diffusivity
+    water_diffusivity_data = config_dict.pop(
+        "water_diffusivity"
     )
 
-    water_diff_coeff_saline_segment = arrhenius_fit(
+    with profiling.stage("fit water_diffusivity_fresh_segment"):
+        water_diff_coeff_fresh_segment = arrhenius_fit(
             np.asarray(
-                water_diffusivity_data["saline_segment"],
+                water_diffusivity_data["fresh_segment"],
                 dtype=np.float64
             ),
-            outfile=(
-                outdir / "fitting" /
-                "water_diffusivity_saline_segment.png"
-            )
+            cache=fit_cache
         )
 
+    with profiling.stage("fit water_diffusivity_saline_segment"):
+        water_diff_coeff_saline_segment = arrhenius_fit(
+                np.asarray(
+                    water_diffusivity_data["saline_segment"],
+                    dtype=np.float64
+                ),
+                cache=fit_cache
+            )
+
     # fit solute diffusivity
     solute_diffusivity_data = config_dict.pop(
         "solute_diffusivity"
     )
 
-    solute_diff_coeff_fresh_segment = arrhenius_fit(
-        np.asarray(
-            solute_diffusivity_data["fresh_segment"],
-            dtype=np.float64
-        ),
-        outfile=(
-            outdir / "fitting" /
-            "solute_diffusivity_fresh_segment.png"
-        )
-    )
-
-    solute_diff_coeff_saline_segment = arrhenius_fit(
+    with profiling.stage("fit solute_diffusivity_fresh_segment"):
+        solute_diff_coeff_fresh_segment = arrhenius_fit(
             np.asarray(
-                solute_diffusivity_data["saline_segment"],
+                solute_diffusivity_data["fresh_segment"],
                 dtype=np.float64
             ),
-            outfile=(
-                outdir / "fitting" /
-                "solute_diffusivity_saline_segment.png"
+            cache=fit_cache
+        )
+
+    with profiling.stage("fit solute_diffusivity_saline_segment"):
+        solute_diff_coeff_saline_segment = arrhenius_fit(
+                np.asarray(
+                    solute_diffusivity_data["saline_segment"],
+                    dtype=np.float64
+                ),
+                cache=fit_cache
             )
+
+    # fitting figures, drawn concurrently
+    if plots:
+        figures = {
+            outdir / "fitting" / "density.png": density_figure(
+                density_data, density_coefficients,
+                title="density"
+            )
+        }
+
+        for name, data, coefficients in [
+            (
+                "water_diffusivity_fresh_segment",
+                water_diffusivity_data["fresh_segment"],
+                water_diff_coeff_fresh_segment
+            ),
+            (
+                "water_diffusivity_saline_segment",
+                water_diffusivity_data["saline_segment"],
+                water_diff_coeff_saline_segment
+            ),
+            (
+                "solute_diffusivity_fresh_segment",
+                solute_diffusivity_data["fresh_segment"],
+                solute_diff_coeff_fresh_segment
+            ),
+            (
+                "solute_diffusivity_saline_segment",
+                solute_diffusivity_data["saline_segment"],
+                solute_diff_coeff_saline_segment
+            )
+        ]:
+            figures[outdir / "fitting" / f"{name}.png"] = (
+                arrhenius_figure(
+                    np.asarray(data, dtype=np.float64),
+                    coefficients, title=name
+                )
+            )
+
+        render_all(
+            figures,
+            workers=(
+                config_dict["plot_workers"]
+                if "plot_workers" in config_dict.keys()
+                else None
+            ),
+            cache=figure_cache
         )
 
     # run simulation
@@ -102,41 +371,99 @@ def run(config: Path, *, outdir: Path) -> None:
         "solute_diff_saline_segment": solute_diff_coeff_saline_segment,
     }
 
+    # look up results
+    cache = None
+    if cache_config["enabled"]:
+        if config_dict.get("memmap_trajectory", False):
+            if logger is not None:
+                logger.info(
+                    "Result cache bypassed for on-disk "
+                    "trajectories"
+                )
+
+        else:
+            cache = ResultCache(
+                Path(cache_config["directory"]),
+                max_bytes=int(
+                    cache_config["max_size_mb"] * 2**20
+                )
+            )
+
+    if cache is not None:
+        key = content_hash(config_dict, fitting)
+
+        output = cache.get(
+            key, files_to=(outdir / "results")
+        )
+
+        if logger is not None:
+            logger.info(
+                f"Result cache {'miss' if output is None else 'hit'}"
+                f" [{key[:12]}]"
+            )
+
+        if output is not None:
+            return output
+
     res = Reservoir(
         config=config_dict, fitting=fitting
     )
 
-    output = res.predict(
-        n_steps=config_dict["n_steps"],
-        step_size=config_dict["step_size"],
-        hmax=(
-            config_dict["hmax"]
-            if "hmax" in config_dict.keys()
-            else None
+    options = predict_options(config_dict, outdir=outdir)
+    schedule = CycleSchedule.from_config(config_dict)
+
+    if schedule is None:
+        output = res.predict(**options)
+
+    else:
+        with profiling.stage("integration"):
+            output = schedule.simulate(
+                res, hmax=options["hmax"],
+                jacobian=options["jacobian"],
+                backend=options["backend"]
+            )
+
+    if logger is not None:
+        logger.info(
+            f"Solver - {diagnostics.summary(output['solver_stats'])}"
         )
-    )
 
-    plot_2d(
-        output, config=config_dict,
-        outdir=(outdir / "results")
-    )
+        for cycle in output.get("cycles", []):
+            logger.info(
+                f"Cycle {cycle['cycle']} - recovery efficiency = "
+                f"{cycle['recovery_efficiency']}"
+            )
 
-    # temporary prints
-    print(
-        "final efficiency: "
-        f"{output['asr_efficiency'][-1]}"
-    )
+    (outdir / "results").mkdir(parents=True, exist_ok=True)
+    with open(outdir / "results" / "solver_stats.json", 'w') as file:
+        json.dump(output["solver_stats"], file, indent=2)
 
-    if output['time_to_recovery_limit']:
-        print(
-            "time to recovery limit: "
-            f"{output['time_to_recovery_limit'] / 86400.} "
-            "days"
+    if "cycles" in output.keys():
+        with open(outdir / "results" / "cycles.json", 'w') as file:
+            json.dump(output["cycles"], file, indent=2)
+
+    if plots:
+        plot_2d(
+            output, config=config_dict,
+            outdir=(outdir / "results"),
+            cache=figure_cache
         )
 
-    else:
-        print(
-            "time to full recovery: "
-            f"{output['time_to_full_recovery'] / 86400.} "
-            "days"
+    if cache is not None:
+        cache.put(
+            key, output,
+            summary={
+                "final_efficiency": final_efficiency(
+                    output["asr_efficiency"]
+                ),
+                "time_to_recovery_limit": (
+                    output["time_to_recovery_limit"]
+                ),
+                "time_to_full_recovery": (
+                    output["time_to_full_recovery"]
+                )
+            },
+            files_from=(outdir / "results")
         )
+
+    return output
@@ -1,339 +1,1277 @@
 """ Licensed under the same terms as described in the main 
 licensing script of this repository. """
 
+import dataclasses
+import hashlib
+from collections.abc import Callable, Iterator
+from pathlib import Path
 from typing import Any
 
 import numpy as np
 from numpy.typing import NDArray
-from scipy.integrate import odeint
+from scipy.integrate import LSODA, OdeSolution, odeint, solve_ivp
 
-from asr_inject.operations import chemical_potential
+from asr_inject.operations import chemical_potential, diagnostics
+from asr_inject.operations.integration import (
+    Checkpointed, InMemory, IntegrationMode, OnDisk
+)
+from asr_inject.operations.kernel import ReservoirKernel
+from asr_inject.operations.metrics import as_scalars, derived_metrics
+from asr_inject.operations.parameters import ReservoirParameters
+from asr_inject.utils import profiling
+from asr_inject.utils.cache import content_hash
+from asr_inject.utils.checkpoint import Checkpointer
+from asr_inject.utils.storage import TrajectoryStore
 
 
 R = 8.314 # J/(mol.K)
-CELSIUS_TO_KELVIN = 273.15
-BAR_TO_PA = 10.**5.
+ODEINT_TOLERANCE = 1.49012e-8
+DEPLETION_FRACTION = 0.01 # of the initial fresh mass, ending recovery
+RECOVERY_STOPS = ("threshold", "depleted") # events shutting the well
 
 
-class Reservoir:
-    """"""
+class DenseSolution:
+    """
+    Continuous solution of a `Reservoir.predict` run.
+    """
 
     def __init__(
-            self, *, config: dict[str, Any],
-            fitting: dict[str, Any]
+            self, solution: OdeSolution, *,
+            kernel: ReservoirKernel, zone_matrix: NDArray | None
     ) -> None:
         """
         """
-        self.fitting = fitting
+        self.solution = solution
+        self.kernel = kernel
+        self.zone_matrix = zone_matrix
+        self.t_min = solution.t_min
+        self.t_max = solution.t_max
+
+
+    def profile(self, t: float | NDArray) -> NDArray:
+        """
+        Moles of every cell at time(s) `t`, species-major,
+        shape `(2N,)` for a scalar and `(len(t), 2N)`
+        otherwise.
+        """
+        return self.kernel.to_species(self.solution(t).T)
 
-        self.Mr_water = config[
-            "solution_characteristics"
-        ]["Mr_water"]
 
-        self.Mr_solute = config[
-            "solution_characteristics"
-        ]["Mr_solute"]
+    def __call__(self, t: float | NDArray) -> NDArray:
+        """
+        Moles of the fresh, interlayer and saline zones at
+        time(s) `t`, shape `(6,)` for a scalar and
+        `(len(t), 6)` otherwise.
+        """
+        moles = self.profile(t)
 
-        self.length = config["reservoir_dimensions"][
-            "length"
-        ]
+        if self.zone_matrix is None:
+            return moles
 
-        self.width = config["reservoir_dimensions"][
-            "width"
-        ]
+        return moles @ self.zone_matrix
 
-        self.height = config["reservoir_dimensions"][
-            "height"
-        ]
 
-        self.interlayer_thickness = config[
-            "reservoir_dimensions"
-        ]["interlayer_thickness"]
+class Reservoir:
+    """
+    Mole balance of a reservoir column, with its
+    parameters in an immutable `ReservoirParameters`.
+    """
 
-        self.temperature = config["reservoir_conditions"][
-            "temperature"
-        ] + CELSIUS_TO_KELVIN
+    def __init__(
+            self, *, config: dict[str, Any] | None=None,
+            fitting: dict[str, Any] | None=None,
+            parameters: ReservoirParameters | None=None
+    ) -> None:
+        """
+        Arguments
+        ---------
+        config, fitting: `dict[str, Any] | None=None`
+            parsed configuration and fitted coefficients,
+            from which the parameters are built unless
+            `parameters` is given.
+        """
+        if parameters is None:
+            if config is None or fitting is None:
+                raise ValueError(
+                    "either parameters or a configuration "
+                    "and its fitting are required"
+                )
 
-        self.pressure = config["reservoir_conditions"][
-            "pressure"
-        ] * BAR_TO_PA
+            parameters = ReservoirParameters.from_config(
+                config=config, fitting=fitting
+            )
 
-        self.volume_fraction_fresh = config["fresh_segment"][
-            "volume_fraction"
-        ]
+        self.parameters = parameters
 
-        self.mass_fraction_solute_fresh_initial = config[
-            "fresh_segment"
-        ]["solute_mass_fraction"]
 
-        self.mass_fraction_solute_saline_initial = config[
-            "saline_segment"
-        ]["solute_mass_fraction"]
+    def compute_density_solution(
+            self,
+            mass_fraction_solute: float | NDArray
+    ) -> float | NDArray:
+        """
+        """
+        solubility = mass_fraction_solute / (
+            1. - mass_fraction_solute
+        )
 
-        self.recovery_rate = config["recovery"]["flow_rate"]
+        parameters = self.parameters
 
-        self.max_solute_fraction = config[
-            "recovery"
-        ]["threshold_solute_mass_fraction"]
+        d_rho = solubility * (
+            parameters.salinity_A0 +
+            parameters.temperature * parameters.salinity_A1
+        )
 
-        self.recovery_gate = 1.
+        return parameters.density_pure + d_rho
 
 
-    @property
-    def mass_fraction_water_fresh_initial(self) -> float:
+    def compute_mass_fraction_solute_fresh(
+            self, moles: NDArray
+    ) -> float | NDArray:
         """
         """
-        return 1. - self.mass_fraction_solute_fresh_initial
+        parameters = self.parameters
+
+        mass_solute = moles[..., 3] * parameters.Mr_solute
+
+        total = moles[..., 0] * parameters.Mr_water
+        total += mass_solute
+        mass_solute /= total
+
+        return mass_solute
 
 
-    @property
-    def mass_fraction_water_saline_initial(self) -> float:
+    def compute_efficiency(
+            self, recovered_mass: float | NDArray
+    ) -> float | NDArray:
         """
+        ASR efficiency: the mass recovered by the well
+        (kg) over the initial mass of the fresh segment
+        (at pure-water density). Without a well, nothing
+        is recovered and the efficiency is undefined.
         """
-        return 1. - self.mass_fraction_solute_saline_initial
+        parameters = self.parameters
+
+        return recovered_mass / (
+            parameters.density_pure * parameters.volume_fresh
+        )
 
 
-    @property
-    def cs_area(self) -> float:
+    def aggregate(self, moles: NDArray) -> NDArray:
         """
+        Sums column states (..., 2N) into the fresh,
+        interlayer and saline zones (..., 6).
         """
-        return self.length * self.width
+        zone_matrix = self.parameters.zone_matrix
+
+        if zone_matrix is None:
+            return moles
 
+        return moles @ zone_matrix
 
-    @property
-    def numerical_separation(self) -> list[float]:
+
+    def kernel(
+            self, *, layout: str="species",
+            backend: str | None=None
+    ) -> ReservoirKernel:
         """
         """
-        height_fresh = (
-            self.height * self.volume_fraction_fresh
+        return ReservoirKernel.from_reservoir(
+            self, layout=layout, backend=backend
         )
 
-        height_saline = (
-            self.height * self.volume_fraction_saline
+
+    def fresh_events(
+            self, kernel: ReservoirKernel, *,
+            plateau_rate: float=1.e-10
+    ) -> dict[str, Callable[[float, NDArray], float]]:
+        """
+        Terminal `solve_ivp` events on the fresh segment of
+        a state in the kernel's layout: its solute mass
+        fraction reaching the recovery threshold
+        (`"threshold"`), its mass falling to
+        `DEPLETION_FRACTION` of the initial one
+        (`"depleted"`) and the rate of change of its
+        solute mass fraction dropping below `plateau_rate`
+        (1/s; `"plateau"`).
+        """
+        parameters = self.parameters
+        zone_matrix = parameters.zone_matrix
+
+        def zones(moles: NDArray) -> NDArray:
+            """
+            """
+            return (
+                moles if zone_matrix is None
+                else moles @ zone_matrix
+            )
+
+        def threshold(t: float, moles: NDArray) -> float:
+            """
+            """
+            return (
+                self.compute_mass_fraction_solute_fresh(
+                    zones(kernel.to_species(moles))
+                ) - parameters.max_solute_fraction
+            )
+
+        threshold.terminal = True
+        threshold.direction = 1.
+
+        floor = DEPLETION_FRACTION * (
+            parameters.mass_water_fresh_initial +
+            parameters.mass_solute_fresh_initial
         )
 
-        return [
-            (
-                0.5 * height_fresh +
-                0.5 * self.interlayer_thickness
-            ),
-            (
-                0.5 * self.interlayer_thickness +
-                0.5 * height_saline
+        def depleted(t: float, moles: NDArray) -> float:
+            """
+            """
+            fresh = zones(kernel.to_species(moles))
+
+            return (
+                fresh[0] * parameters.Mr_water +
+                fresh[3] * parameters.Mr_solute - floor
             )
-        ]
 
+        depleted.terminal = True
+        depleted.direction = -1.
 
-    @property
-    def volume_fraction_saline(self) -> float:
-        """
-        """
-        return 1. - self.volume_fraction_fresh
+        def plateau(t: float, moles: NDArray) -> float:
+            """
+            """
+            state = zones(kernel.to_species(moles))
+            rates = zones(kernel.to_species(kernel.rhs(moles, t)))
 
+            # rate of the fresh segment's solute mass fraction
+            mass_water = state[0] * parameters.Mr_water
+            mass_solute = state[3] * parameters.Mr_solute
+            fraction_rate = (
+                rates[3] * parameters.Mr_solute * mass_water -
+                rates[0] * parameters.Mr_water * mass_solute
+            ) / (mass_water + mass_solute) ** 2
 
-    @property
-    def volume(self) -> float:
-        """
-        """
-        return self.length * self.width * self.height
+            return abs(fraction_rate) - plateau_rate
 
+        plateau.terminal = True
+        plateau.direction = -1.
 
-    @property
-    def volume_fresh(self) -> float:
+        return {
+            "threshold": threshold,
+            "depleted": depleted,
+            "plateau": plateau
+        }
+
+
+    def _integrate_ivp(
+            self, kernel: ReservoirKernel, time: NDArray, *,
+            jacobian: str | None, hmax: float | None,
+            early_termination: bool, plateau_rate: float,
+            dense_output: bool
+    ) -> tuple[
+        NDArray, NDArray, dict[str, float],
+        DenseSolution | None, dict[str, Any]
+    ]:
         """
+        Integrates up to `time[-1]` with `solve_ivp`,
+        storing the state at `time`. With
+        `early_termination`, stops at the recovery-limit
+        or the fresh-segment plateau event, whichever
+        comes first.
         """
-        return self.volume * self.volume_fraction_fresh
+        zone_matrix = self.parameters.zone_matrix
 
+        fresh_events = self.fresh_events(
+            kernel, plateau_rate=plateau_rate
+        )
+        recovery_limit = fresh_events["threshold"]
+        plateau = fresh_events["plateau"]
 
-    @property
-    def volume_saline(self) -> float:
-        """
-        """
-        return self.volume * self.volume_fraction_saline
+        initial_moles = kernel.to_layout(
+            self.parameters.initial_moles
+        )
+
+        # limit already exceeded at the start
+        if (
+            early_termination and
+            recovery_limit(time[0], initial_moles) >= 0.
+        ):
+            return (
+                time[:1], self.parameters.initial_moles[None, :],
+                {"recovery_limit": time[0]}, None,
+                diagnostics.skipped(
+                    "solve_ivp",
+                    "recovery limit exceeded at the start"
+                )
+            )
 
+        jacobian_kwargs = kernel.solver_jacobian(jacobian, solver="ivp")
 
-    @property
-    def mass_water_fresh_initial(self) -> float:
-        """
-        """
-        return (
-            self.density_pure * self.volume_fresh *
-            self.mass_fraction_water_fresh_initial
+        solution = solve_ivp(
+            lambda t, moles: kernel.rhs(moles, t),
+            (time[0], time[-1]), initial_moles,
+            method="LSODA", t_eval=time,
+            dense_output=dense_output,
+            events=(
+                [recovery_limit, plateau]
+                if early_termination else None
+            ),
+            max_step=(
+                hmax if hmax else np.inf
+            ),
+            rtol=ODEINT_TOLERANCE, atol=ODEINT_TOLERANCE,
+            **jacobian_kwargs
         )
 
+        events = {
+            name: t_events[0]
+            for name, t_events in zip(
+                ["recovery_limit", "plateau"],
+                solution.t_events or []
+            )
+            if t_events.size
+        }
 
-    @property
-    def mass_water_saline_initial(self) -> float:
-        """
-        """
         return (
-            self.density_pure * self.volume_saline *
-            self.mass_fraction_water_saline_initial
+            solution.t, kernel.to_species(solution.y.T),
+            events, (
+                DenseSolution(
+                    solution.sol, kernel=kernel,
+                    zone_matrix=zone_matrix
+                )
+                if dense_output else None
+            ),
+            diagnostics.from_solve_ivp(solution)
         )
 
 
-    @property
-    def mass_solute_fresh_initial(self) -> float:
+    def _integrate_checkpointed(
+            self, kernel: ReservoirKernel, time: NDArray, *,
+            checkpoint_dir: Path, checkpoint_every: int,
+            jacobian: str | None, hmax: float | None,
+            recovery: bool
+    ) -> tuple[NDArray, dict[str, float], dict[str, Any]]:
         """
+        Integrates with `odeint` (with `recovery`,
+        `integrate_recovery`) in segments of
+        `checkpoint_every` output points, checkpointing
+        the trajectory and the solver state (state vector,
+        last step size and whether the well has shut)
+        after each one, and resumes from the latest
+        checkpoint in `checkpoint_dir` if it was written
+        for the same parameters and numerics.
+
+        Every segment restarts the solver from its
+        checkpoint, interrupted or not, so that a resumed
+        run reproduces an uninterrupted one exactly.
+
+        Returns
+        -------
+        The trajectory, the recovery events (see
+        `integrate_recovery`; empty without `recovery`)
+        and the merged solver statistics.
         """
-        return (
-            self.density_pure * self.volume_fresh *
-            self.mass_fraction_solute_fresh_initial
+        n_points = len(time)
+
+        jacobian_kwargs = kernel.solver_jacobian(jacobian)
+
+        checkpointer = Checkpointer(
+            checkpoint_dir,
+            key=content_hash(
+                {
+                    field.name: getattr(self.parameters, field.name)
+                    for field in dataclasses.fields(self.parameters)
+                    if field.init
+                },
+                hashlib.sha256(
+                    np.ascontiguousarray(time)
+                ).hexdigest(),
+                kernel.layout, kernel.backend.name, jacobian,
+                hmax, checkpoint_every, recovery
+            )
         )
 
+        checkpoint = checkpointer.load()
+
+        if checkpoint is None:
+            idx = 0
+            state = kernel.to_layout(self.parameters.initial_moles)
+            first_step = 0.
+            segments = []
+            events = {}
+
+        else:
+            state, metadata = checkpoint
+            idx = metadata["index"]
+            first_step = metadata["first_step"]
+            segments = metadata["solver_stats"]
+            events = metadata["events"]
+
+        while idx < n_points:
+            stop = min(idx + checkpoint_every, n_points)
+
+            # the segment ends on the next one's first point
+            segment_time = time[idx:min(stop + 1, n_points)]
+
+            if len(segment_time) == 1:
+                result = state[None, :]
+                segments.append(
+                    diagnostics.skipped("odeint", "single point")
+                )
+
+            elif recovery:
+                # the well stays shut once it has
+                _, result, segment_events, _, stats = (
+                    self.integrate_recovery(
+                        kernel, segment_time, state=state,
+                        flow_rate=self.parameters.recovery_rate,
+                        jacobian=jacobian, hmax=hmax,
+                        recovering=not events
+                    )
+                )
+
+                segments.append(stats)
+                events.update(segment_events)
+
+            else:
+                result, info = odeint(
+                    kernel.rhs, state, segment_time,
+                    hmax=(
+                        hmax if hmax else 0
+                    ),
+                    h0=first_step,
+                    full_output=True,
+                    **jacobian_kwargs
+                )
+
+                segments.append(diagnostics.from_odeint(info))
+
+                steps = info["hu"][info["hu"] > 0.]
+                if steps.size:
+                    first_step = float(steps[-1])
+
+            state = result[-1]
+
+            checkpointer.save(
+                start=idx, chunk=result[:stop - idx], state=state,
+                metadata={
+                    "first_step": first_step,
+                    "solver_stats": segments,
+                    "events": events
+                }
+            )
+
+            idx = stop
+
+        result = np.concatenate(checkpointer.trajectory(n_points))
+        checkpointer.clear()
 
-    @property
-    def mass_solute_saline_initial(self) -> float:
-        """
-        """
         return (
-            self.density_pure * self.volume_saline *
-            self.mass_fraction_solute_saline_initial
+            kernel.to_species(result), events,
+            diagnostics.merge(segments)
         )
 
 
-    @property
-    def moles_water_fresh_initial(self) -> float:
+    @staticmethod
+    def recovery_stop(
+            events: dict[str, float]
+    ) -> tuple[float | None, str | None]:
         """
+        Time the well shut and why (one of
+        `RECOVERY_STOPS`) among the `events` of
+        `integrate_recovery`; `None` for both if it
+        produced throughout.
         """
-        return (
-            self.mass_water_fresh_initial /
-            self.Mr_water
-        )
+        for reason in RECOVERY_STOPS:
+            if reason in events.keys():
+                return events[reason], reason
 
+        return None, None
 
-    @property
-    def moles_water_saline_initial(self) -> float:
+
+    def _recovery_metrics(
+            self, events: dict[str, float]
+    ) -> dict[str, Any]:
         """
+        Metrics of a run with recovery, from the event
+        that shut the well (see `integrate_recovery`)
+        rather than from the output grid: when and why it
+        shut, the exact time the recovery threshold was
+        reached if that shut it, and the time to full
+        recovery if the fresh segment was depleted
+        (`None` otherwise, as the efficiency is still
+        rising at the end of the run or was capped by the
+        threshold).
         """
-        return (
-            self.mass_water_saline_initial /
-            self.Mr_water
-        )
-
+        stop, reason = self.recovery_stop(events)
 
-    @property
-    def moles_solute_fresh_initial(self) -> float:
+        metrics = {
+            "time_to_recovery_stop": stop,
+            "recovery_stop": reason,
+            "time_to_full_recovery": (
+                stop if reason == "depleted" else None
+            )
+        }
+
+        if reason == "threshold":
+            metrics["time_to_recovery_limit"] = stop
+
+        return metrics
+
+
+    def integrate_recovery(
+            self, kernel: ReservoirKernel, time: NDArray, *,
+            state: NDArray, flow_rate: float,
+            jacobian: str | None, hmax: float | None,
+            recovering: bool=True,
+            early_termination: bool=False,
+            plateau_rate: float=1.e-10,
+            dense_output: bool=False
+    ) -> tuple[
+        NDArray, NDArray, dict[str, float],
+        DenseSolution | None, dict[str, Any]
+    ]:
         """
+        Integrates from `state` (in the kernel's layout)
+        over `time` while the well withdraws `flow_rate`
+        (kg/s) from the fresh segment, as a hybrid system:
+        recovery stops for good once the fresh segment's
+        solute mass fraction reaches the recovery
+        threshold, or its mass falls to
+        `DEPLETION_FRACTION` of the initial one. Both
+        conditions are solver events, so that the solver
+        stops at the exact switch time and restarts with
+        the well shut, instead of stepping across a
+        discontinuous right-hand side.
+
+        Arguments
+        ---------
+        recovering: `bool=True`
+            if `False`, the well has already shut (e.g. in
+            an earlier segment) and stays so.
+
+        early_termination: `bool=False`
+            if `True`, the run ends with recovery, or as
+            soon as the fresh segment's composition
+            plateaus (see `fresh_events`).
+
+        plateau_rate, dense_output:
+            as in `integration.InMemory`.
+
+        Returns
+        -------
+        The output times reached, the trajectory at them
+        (in the kernel's layout), the `"threshold"` or
+        `"depleted"` time at which the well shut (see
+        `recovery_stop`) and, with `early_termination`,
+        the `"plateau"` time, the continuous solution if
+        `dense_output` and the merged solver statistics.
         """
-        return (
-            self.mass_solute_fresh_initial /
-            self.Mr_solute
+        fresh_events = self.fresh_events(
+            kernel, plateau_rate=plateau_rate
         )
+        threshold = fresh_events["threshold"]
+        depleted = fresh_events["depleted"]
 
+        names = ["threshold", "depleted"] + (
+            ["plateau"] if early_termination else []
+        )
 
-    @property
-    def moles_solute_saline_initial(self) -> float:
-        """
-        """
-        return (
-            self.mass_solute_saline_initial /
-            self.Mr_solute
+        jacobian_kwargs = kernel.solver_jacobian(jacobian, solver="ivp")
+
+        def integrate(
+                lo: int, t_start: float, y_start: NDArray,
+                events: list | None
+        ) -> Any:
+            """
+            """
+            return solve_ivp(
+                lambda t, moles: kernel.rhs(moles, t),
+                (t_start, time[-1]), y_start,
+                method="LSODA", t_eval=time[lo:],
+                dense_output=dense_output,
+                events=events,
+                max_step=(
+                    hmax if hmax else np.inf
+                ),
+                rtol=ODEINT_TOLERANCE, atol=ODEINT_TOLERANCE,
+                **jacobian_kwargs
+            )
+
+        events, segments, solutions = {}, [], []
+        result = np.empty((len(time), kernel.size))
+        result[0] = state
+        filled = 1
+
+        # nothing to recover if either condition already holds
+        if recovering and threshold(time[0], state) >= 0.:
+            events["threshold"] = float(time[0])
+
+        elif recovering and depleted(time[0], state) <= 0.:
+            events["depleted"] = float(time[0])
+
+        elif recovering:
+            kernel.set_well(rate=-flow_rate)
+
+            try:
+                solution = integrate(
+                    1, time[0], state,
+                    [fresh_events[name] for name in names]
+                )
+
+            finally:
+                kernel.set_well(rate=0.)
+
+            segments.append(diagnostics.from_solve_ivp(solution))
+            solutions.append(solution.sol)
+
+            result[filled:filled + len(solution.t)] = solution.y.T
+            filled += len(solution.t)
+
+            for name, t_events, y_events in zip(
+                names, solution.t_events, solution.y_events
+            ):
+                if t_events.size:
+                    events[name] = float(t_events[0])
+                    state = y_events[0]
+
+            if not events and filled < len(time):
+                raise RuntimeError(solution.message)
+
+        if early_termination and events:
+            time, result = time[:filled], result[:filled]
+
+        # the well shut for the rest of the horizon
+        elif filled < len(time):
+            stop, _ = self.recovery_stop(events)
+
+            solution = integrate(
+                filled, time[0] if stop is None else stop,
+                state, None
+            )
+            segments.append(diagnostics.from_solve_ivp(solution))
+            solutions.append(solution.sol)
+
+            result[filled:] = solution.y.T
+
+        return time, result, events, (
+            DenseSolution(
+                OdeSolution(
+                    np.concatenate(
+                        [solutions[0].ts] +
+                        [sol.ts[1:] for sol in solutions[1:]]
+                    ),
+                    [
+                        interpolant for sol in solutions
+                        for interpolant in sol.interpolants
+                    ]
+                ),
+                kernel=kernel,
+                zone_matrix=self.parameters.zone_matrix
+            )
+            if dense_output and solutions else None
+        ), (
+            diagnostics.merge(segments) if segments
+            else diagnostics.skipped(
+                "solve_ivp", "no output points past the start"
+            )
         )
 
 
-    @property
-    def diffusivity_water_fresh_segment(self) -> float:
+    def iter_predict(
+            self, *, n_steps: int, step_size: float,
+            hmax: float | None=None,
+            jacobian: str | None="dense",
+            output_times: NDArray | None=None,
+            chunk_size: int=100000,
+            recovery: bool=False,
+            solver_stats: dict[str, Any] | None=None,
+            events: dict[str, float] | None=None,
+            backend: str | None=None
+    ) -> Iterator[dict[str, NDArray]]:
         """
+        Generator counterpart of `predict`.
+
+        Steps a single LSODA solver through the horizon,
+        so that its state (step size, order, history) is
+        carried across segments, and yields chunks of at
+        most `chunk_size` output points with keys `"time"`,
+        `"moles"`, `"mass_fraction_solute_fresh"` and
+        `"asr_efficiency"` (NaN without `recovery`, as
+        there is no well). Memory is O(`chunk_size`);
+        breaking out of the loop stops the integration.
+
+        With `recovery`, each chunk is integrated by
+        `integrate_recovery` instead, restarting the
+        solver from the previous chunk's last state, and
+        `events`, if given, is updated with the time the
+        well shut and why.
+
+        `solver_stats`, if given, is updated with the
+        solver statistics up to each yielded chunk.
         """
-        base = self.fitting[
-            "water_diff_fresh_segment"
-        ][0]
-        energy = self.fitting[
-            "water_diff_fresh_segment"
-        ][1]
+        layout = ReservoirKernel.layout_for(jacobian)
+
+        # the default grid is generated lazily, so that the
+        # horizon is not bounded by memory
+        if output_times is None:
+            n_points = n_steps
+
+            def times(lo: int, hi: int) -> NDArray:
+                """
+                """
+                return np.arange(lo, hi) * step_size
+
+            def reached(t: float) -> int:
+                """
+                """
+                n = min(n_points, int(t // step_size) + 1)
+                while n < n_points and n * step_size <= t:
+                    n += 1
+
+                return n
+
+        else:
+            output_times = np.asarray(
+                output_times, dtype=np.float64
+            )
+            n_points = len(output_times)
+
+            def times(lo: int, hi: int) -> NDArray:
+                """
+                """
+                return output_times[lo:hi]
+
+            def reached(t: float) -> int:
+                """
+                """
+                return int(
+                    np.searchsorted(output_times, t, side="right")
+                )
+
+        kernel = self.kernel(layout=layout, backend=backend)
+
+        def package(
+                time: NDArray, states: NDArray, efficiency: NDArray
+        ) -> dict[str, NDArray]:
+            """
+            """
+            cell_moles = kernel.to_species(states)
+            moles = self.aggregate(cell_moles)
+
+            return {
+                "time": time,
+                "moles": moles,
+                "cell_moles": cell_moles,
+                "mass_fraction_solute_fresh": (
+                    self.compute_mass_fraction_solute_fresh(moles)
+                ),
+                "asr_efficiency": efficiency
+            }
+
+        if recovery:
+            state = kernel.to_layout(self.parameters.initial_moles)
+            start = times(0, 1)[0]
+            events = {} if events is None else events
+            segments = []
+
+            for lo in range(0, n_points, chunk_size):
+                hi = min(lo + chunk_size, n_points)
+
+                # the chunk ends on the next one's first point
+                chunk_time = times(lo, min(hi + 1, n_points))
+
+                if len(chunk_time) == 1:
+                    result = state[None, :]
+
+                else:
+                    _, result, chunk_events, _, stats = (
+                        self.integrate_recovery(
+                            kernel, chunk_time, state=state,
+                            flow_rate=self.parameters.recovery_rate,
+                            jacobian=jacobian, hmax=hmax,
+                            recovering=not events
+                        )
+                    )
+
+                    segments.append(stats)
+                    events.update(chunk_events)
+
+                state = result[-1]
+                stop, _ = self.recovery_stop(events)
+
+                if solver_stats is not None:
+                    solver_stats.update(
+                        diagnostics.merge(segments) if segments
+                        else diagnostics.skipped(
+                            "solve_ivp", "single output point"
+                        )
+                    )
+
+                yield package(
+                    chunk_time[:hi - lo], result[:hi - lo],
+                    self.compute_efficiency(
+                        self.parameters.recovery_rate * (
+                            np.minimum(
+                                chunk_time[:hi - lo],
+                                np.inf if stop is None else stop
+                            ) - start
+                        )
+                    )
+                )
+
+            return
+
+        jacobian_kwargs = kernel.solver_jacobian(jacobian, solver="ivp")
+
+        solver = LSODA(
+            lambda t, moles: kernel.rhs(moles, t),
+            times(0, 1)[0],
+            kernel.to_layout(self.parameters.initial_moles),
+            times(n_points - 1, n_points)[0],
+            max_step=(
+                hmax if hmax else np.inf
+            ),
+            rtol=ODEINT_TOLERANCE, atol=ODEINT_TOLERANCE,
+            **jacobian_kwargs
+        )
+
+        buffer = np.empty((min(chunk_size, n_points), kernel.size))
+        filled = 0
+        idx = 0
+
+        n_steps_taken = 0
+        min_step, max_step = np.inf, 0.
 
-        exp_term = -energy / (R * self.temperature)
+        while idx < n_points:
+            # output points reached by the current step
+            stop = reached(solver.t)
 
-        return base * np.exp(exp_term)
+            if stop == idx:
+                message = solver.step()
 
+                if solver.status == "failed":
+                    raise RuntimeError(message)
 
-    @property
-    def diffusivity_water_saline_segment(self) -> float:
+                n_steps_taken += 1
+                min_step = min(min_step, solver.step_size)
+                max_step = max(max_step, solver.step_size)
+
+                continue
+
+            interpolant = (
+                None if solver.t_old is None
+                else solver.dense_output()
+            )
+
+            while idx < stop:
+                n = min(stop - idx, len(buffer) - filled)
+
+                buffer[filled:filled + n] = (
+                    solver.y if interpolant is None
+                    else interpolant(times(idx, idx + n)).T
+                )
+
+                filled += n
+                idx += n
+
+                if filled == len(buffer) or idx == n_points:
+                    if solver_stats is not None:
+                        solver_stats.update(
+                            diagnostics.from_solver(
+                                solver, n_steps=n_steps_taken,
+                                min_step=min_step,
+                                max_step=max_step
+                            )
+                        )
+
+                    yield package(
+                        times(idx - filled, idx), buffer[:filled],
+                        np.full(filled, np.nan)
+                    )
+
+                    filled = 0
+
+
+    def _predict_to_disk(
+            self, time: NDArray, *, storage_dir: Path,
+            chunk_size: int, jacobian: str | None,
+            hmax: float | None, recovery: bool,
+            backend: str | None
+    ) -> dict[str, Any]:
         """
+        Streams every chunk of `iter_predict` to a
+        `TrajectoryStore`, deriving the metrics on the way.
         """
-        base = self.fitting[
-            "water_diff_saline_segment"
-        ][0]
-        energy = self.fitting[
-            "water_diff_saline_segment"
-        ][1]
+        store = TrajectoryStore(
+            storage_dir, n_points=len(time), n_states=6,
+            n_cell_states=(
+                None if self.parameters.n_cells == 3
+                else 2 * self.parameters.n_cells
+            )
+        )
+
+        # metrics streamed chunk by chunk, each chunk led by
+        # the previous one's last point so that crossings
+        # interpolate across chunk boundaries
+        start = 0
+        previous = None
+        metrics = {}
+        solver_stats = {}
+        events = {}
+
+        for chunk in self.iter_predict(
+            n_steps=len(time), step_size=0.,
+            hmax=hmax, jacobian=jacobian,
+            output_times=time, chunk_size=chunk_size,
+            recovery=recovery, solver_stats=solver_stats,
+            events=events, backend=backend
+        ):
+            store.write(start, **chunk)
+            start += len(chunk["time"])
+
+            series = {
+                key: (
+                    chunk[key] if previous is None
+                    else np.concatenate([previous[key], chunk[key]])
+                )
+                for key in [
+                    "time", "moles", "mass_fraction_solute_fresh",
+                    "asr_efficiency"
+                ]
+            }
+
+            previous = {
+                key: value[-1:] for key, value in series.items()
+            }
+
+            chunk_metrics = derived_metrics(
+                series["time"], moles=series["moles"],
+                mass_fraction_solute_fresh=(
+                    series["mass_fraction_solute_fresh"]
+                ),
+                asr_efficiency=series["asr_efficiency"],
+                max_solute_fraction=(
+                    self.parameters.max_solute_fraction
+                ),
+                backend=backend
+            )
+
+            # set below
+            del chunk_metrics["time_to_full_recovery"]
+
+            peak = {
+                key: chunk_metrics.pop(key)
+                for key in [
+                    "peak_solute_interlayer",
+                    "time_to_peak_solute_interlayer"
+                ]
+            }
 
-        exp_term = -energy / (R * self.temperature)
+            if peak["peak_solute_interlayer"] > metrics.get(
+                "peak_solute_interlayer", -np.inf
+            ):
+                metrics.update(peak)
+
+            # first crossings
+            for key, value in chunk_metrics.items():
+                if key.startswith("time_to_") and np.isnan(
+                    metrics.get(key, np.nan)
+                ):
+                    metrics[key] = value
+
+        output = store.close()
+        metrics = as_scalars(metrics)
+
+        # without a well, the efficiency never converges
+        metrics["time_to_full_recovery"] = None
 
-        return base * np.exp(exp_term)
+        output.update({
+            **metrics,
+            "solution": None,
+            "solver_stats": solver_stats
+        })
 
+        if recovery:
+            output.update(self._recovery_metrics(events))
 
-    @property
-    def diffusivity_solute_fresh_segment(self) -> float:
+        return output
+
+
+    @staticmethod
+    def _time_solver(
+            solver_stats: dict[str, Any], *,
+            integration_clock: profiling.Stopwatch,
+            rhs_clock: profiling.Stopwatch | None
+    ) -> None:
         """
+        Adds the integration wall time and, while
+        profiling, the right-hand side's share of it to
+        `solver_stats`.
         """
-        base = self.fitting[
-            "solute_diff_fresh_segment"
-        ][0]
-        energy = self.fitting[
-            "solute_diff_fresh_segment"
-        ][1]
+        solver_stats["integration_wall_time"] = (
+            integration_clock.elapsed
+        )
 
-        exp_term = -energy / (R * self.temperature)
+        if rhs_clock is not None:
+            solver_stats["rhs_wall_time"] = rhs_clock.elapsed
+            solver_stats["rhs_share"] = (
+                rhs_clock.elapsed / integration_clock.elapsed
+            )
 
-        return base * np.exp(exp_term)
 
-    @property
-    def diffusivity_solute_saline_segment(self) -> float:
+    def post_process(
+            self, time: NDArray, cell_moles: NDArray, *,
+            recovered_mass: NDArray | None=None,
+            backend: str | None=None
+    ) -> dict[str, Any]:
         """
+        Zone moles, fresh-segment solute mass fraction,
+        ASR efficiency and derived metrics (scanned by
+        kernel backend `backend`) of an integrated column
+        trajectory. The efficiency follows from the well's
+        `recovered_mass` (kg) at every output point (see
+        `compute_efficiency`); without it, the efficiency
+        is NaN and the metrics derived from it `None`.
         """
-        base = self.fitting[
-            "solute_diff_saline_segment"
-        ][0]
-        energy = self.fitting[
-            "solute_diff_saline_segment"
-        ][1]
+        moles = self.aggregate(cell_moles)
+
+        mass_fraction_solute_fresh = (
+            self.compute_mass_fraction_solute_fresh(moles)
+        )
 
-        exp_term = -energy / (R * self.temperature)
+        efficiency = (
+            np.full(len(time), np.nan) if recovered_mass is None
+            else self.compute_efficiency(recovered_mass)
+        )
 
-        return base * np.exp(exp_term)
+        return {
+            "time": time,
+            "moles": moles,
+            "cell_moles": cell_moles,
+            "mass_fraction_solute_fresh": (
+                mass_fraction_solute_fresh
+            ),
+            "asr_efficiency": efficiency,
+            **as_scalars(
+                derived_metrics(
+                    time, moles=moles,
+                    mass_fraction_solute_fresh=(
+                        mass_fraction_solute_fresh
+                    ),
+                    asr_efficiency=efficiency,
+                    max_solute_fraction=(
+                        self.parameters.max_solute_fraction
+                    ),
+                    backend=backend
+                )
+            )
+        }
 
 
-    @property
-    def density_pure(self) -> float:
+    def predict(
+            self, *, n_steps: int, step_size: float,
+            hmax: float | None=None,
+            jacobian: str | None="dense",
+            output_times: NDArray | None=None,
+            mode: IntegrationMode=InMemory(),
+            recovery: bool=False,
+            backend: str | None=None
+    ) -> dict[str, NDArray]:
         """
+        Arguments
+        ---------
+        jacobian: `str | None="dense"`
+            analytical Jacobian handed to the solver:
+            `"dense"`, `"banded"` (cell-interleaved state,
+            exploiting the nearest-neighbour coupling) or
+            `None` for LSODA's finite differences.
+
+        output_times: `NDArray | None=None`
+            times (s) at which the trajectory is stored,
+            starting at `t = 0`; defaults to every
+            `step_size` over `n_steps`. Independent of the
+            solver's internal stepping.
+
+        mode: `IntegrationMode=InMemory()`
+            how the trajectory is integrated and kept:
+            `InMemory` (with its events and continuous
+            solution), `OnDisk` or `Checkpointed` (see
+            `integration`).
+
+        recovery: `bool=False`
+            if `True`, the well recovers the fresh segment
+            at the configured flow rate until its solute
+            mass fraction reaches the recovery threshold
+            or it is depleted (see `integrate_recovery`),
+            and the output also holds the
+            `"time_to_recovery_stop"`, the `"recovery_stop"`
+            reason and, unless stored on disk, the
+            `"recovered_mass"`; the time to full recovery
+            then follows from the recovery event (see
+            `_recovery_metrics`). Without it, the ASR
+            efficiency is undefined (NaN; see
+            `compute_efficiency`).
+
+        backend: `str | None=None`
+            kernel backend evaluating the right-hand side,
+            its Jacobian and the derived metrics:
+            `"numpy"`, `"numba"` (opt-in), or `None` for
+            `"numpy"` (see `backends`).
+
+        Returns
+        -------
+        The trajectory, its derived metrics and the
+        solver's `"solver_stats"` (see `diagnostics`); the
+        latter include the right-hand side's share of the
+        integration wall time while profiling.
         """
-        coefficients = self.fitting["density"][
-            "temperature"
-        ]
+        layout = ReservoirKernel.layout_for(jacobian)
 
-        output = 0.
-        for idx, coeff in enumerate(coefficients):
-            output += coeff * self.temperature**idx
+        time = (
+            np.arange(n_steps) * step_size
+            if output_times is None
+            else np.asarray(output_times, dtype=np.float64)
+        )
+        events = {}
+        solution = None
+        recovered_mass = None
+
+        if isinstance(mode, OnDisk):
+            # post-processing streamed along
+            with profiling.stage("integration"):
+                return self._predict_to_disk(
+                    time, storage_dir=mode.storage_dir,
+                    chunk_size=mode.chunk_size, jacobian=jacobian,
+                    hmax=hmax, recovery=recovery, backend=backend
+                )
 
-        return output
+        # right-hand side timed only while profiling
+        rhs_clock = profiling.Stopwatch() if profiling.active() else None
+        integration_clock = profiling.Stopwatch()
 
+        # numerical solution
+        with profiling.stage("integration"), integration_clock:
+            kernel = self.kernel(layout=layout, backend=backend)
+
+            if rhs_clock is not None:
+                kernel.rhs = rhs_clock.wrap(kernel.rhs)
+
+            if isinstance(mode, Checkpointed):
+                result, events, solver_stats = (
+                    self._integrate_checkpointed(
+                        kernel, time,
+                        checkpoint_dir=mode.checkpoint_dir,
+                        checkpoint_every=mode.checkpoint_every,
+                        jacobian=jacobian, hmax=hmax,
+                        recovery=recovery
+                    )
+                )
 
-    def compute_density_solution(
-            self,
-            mass_fraction_solute: float | NDArray
-    ) -> float | NDArray:
-        """
-        """
-        solubility = mass_fraction_solute / (
-            1. - mass_fraction_solute
+            elif recovery:
+                time, result, events, solution, solver_stats = (
+                    self.integrate_recovery(
+                        kernel, time,
+                        state=kernel.to_layout(
+                            self.parameters.initial_moles
+                        ),
+                        flow_rate=self.parameters.recovery_rate,
+                        jacobian=jacobian, hmax=hmax,
+                        early_termination=mode.early_termination,
+                        plateau_rate=mode.plateau_rate,
+                        dense_output=mode.dense_output
+                    )
+                )
+
+                result = kernel.to_species(result)
+
+            elif mode.early_termination or mode.dense_output:
+                time, result, events, solution, solver_stats = (
+                    self._integrate_ivp(
+                        kernel, time, jacobian=jacobian,
+                        hmax=hmax,
+                        early_termination=mode.early_termination,
+                        plateau_rate=mode.plateau_rate,
+                        dense_output=mode.dense_output
+                    )
+                )
+
+            else:
+                jacobian_kwargs = kernel.solver_jacobian(jacobian)
+
+                result, info = odeint(
+                    kernel.rhs,
+                    kernel.to_layout(
+                        self.parameters.initial_moles
+                    ),
+                    time,
+                    hmax=(
+                        hmax if hmax else 0
+                    ),
+                    full_output=True,
+                    **jacobian_kwargs
+                )
+
+                result = kernel.to_species(result)
+                solver_stats = diagnostics.from_odeint(info)
+
+        self._time_solver(
+            solver_stats, integration_clock=integration_clock,
+            rhs_clock=rhs_clock
         )
 
-        A0 = self.fitting["density"]["salinity"]["A0"]
-        A1 = self.fitting["density"]["salinity"]["A1"]
+        if recovery:
+            stop, _ = self.recovery_stop(events)
+            recovered_mass = self.parameters.recovery_rate * (
+                np.minimum(
+                    time, time[-1] if stop is None else stop
+                ) - time[0]
+            )
+
+        with profiling.stage("post_processing"):
+            output = self.post_process(
+                time, result, recovered_mass=recovered_mass,
+                backend=backend
+            )
+
+        if recovery:
+            output["recovered_mass"] = recovered_mass
+            output.update(self._recovery_metrics(events))
 
-        d_rho = solubility * (A0 + (self.temperature * A1))
+        # root-found on the continuous solution instead
+        if "recovery_limit" in events:
+            output["time_to_recovery_limit"] = (
+                events["recovery_limit"]
+            )
+            output["time_to_full_recovery"] = None
 
-        return self.density_pure + d_rho
+        if isinstance(mode, InMemory) and mode.early_termination:
+            output["time_to_plateau"] = events.get("plateau")
 
+        output["solution"] = solution
+        output["solver_stats"] = solver_stats
 
-    def predict(
+        return output
+
+
+    def predict_reference(
             self, *, n_steps: int, step_size: float,
-            hmax: float | None=None
+            hmax: float | None=None,
+            output_times: NDArray | None=None,
+            backend: str | None=None
     ) -> dict[str, NDArray]:
         """
+        `predict` with the reference (non-vectorised)
+        right-hand side of the three-cell column, a
+        finite-difference Jacobian and no well, held in
+        memory; the kernel is validated against it.
         """
+        if self.parameters.n_cells != 3:
+            raise ValueError(
+                "the reference right-hand side only supports "
+                "the three-cell column"
+            )
+
+        parameters = self.parameters
+
         def differential(
                 moles: NDArray, t: float
         ) -> NDArray:
@@ -354,10 +1292,10 @@ class Reservoir:
             )
 
             water_mass_fraction_fresh = (
-                (water_fraction_fresh * self.Mr_water) /
+                (water_fraction_fresh * parameters.Mr_water) /
                 (
-                    water_fraction_fresh * self.Mr_water +
-                    solute_fraction_fresh * self.Mr_solute
+                    water_fraction_fresh * parameters.Mr_water +
+                    solute_fraction_fresh * parameters.Mr_solute
                 )
             )
 
@@ -372,13 +1310,13 @@ class Reservoir:
             water_concentration_fresh = (
                 density_solution_fresh *
                 water_mass_fraction_fresh *
-                (1000. / self.Mr_water)
+                (1000. / parameters.Mr_water)
             )
 
             solute_concentration_fresh = (
                 density_solution_fresh *
                 solute_mass_fraction_fresh *
-                (1000. / self.Mr_solute)
+                (1000. / parameters.Mr_solute)
             )
 
             # intermediate layer
@@ -393,10 +1331,10 @@ class Reservoir:
             )
 
             water_mass_fraction_intermediate = (
-                (water_fraction_intermediate * self.Mr_water) /
+                (water_fraction_intermediate * parameters.Mr_water) /
                 (
-                    water_fraction_intermediate * self.Mr_water +
-                    solute_fraction_intermediate * self.Mr_solute
+                    water_fraction_intermediate * parameters.Mr_water +
+                    solute_fraction_intermediate * parameters.Mr_solute
                 )
             )
 
@@ -411,13 +1349,13 @@ class Reservoir:
             water_concentration_intermediate = (
                 density_solution_intermediate *
                 water_mass_fraction_intermediate *
-                (1000. / self.Mr_water)
+                (1000. / parameters.Mr_water)
             )
 
             solute_concentration_intermediate = (
                 density_solution_intermediate *
                 solute_mass_fraction_intermediate *
-                (1000. / self.Mr_solute)
+                (1000. / parameters.Mr_solute)
             )
 
             # saline segment
@@ -432,10 +1370,10 @@ class Reservoir:
             )
 
             water_mass_fraction_saline = (
-                (water_fraction_saline * self.Mr_water) /
+                (water_fraction_saline * parameters.Mr_water) /
                 (
-                    water_fraction_saline * self.Mr_water +
-                    solute_fraction_saline * self.Mr_solute
+                    water_fraction_saline * parameters.Mr_water +
+                    solute_fraction_saline * parameters.Mr_solute
                 )
             )
 
@@ -450,13 +1388,13 @@ class Reservoir:
             water_concentration_saline = (
                 density_solution_saline *
                 water_mass_fraction_saline *
-                (1000. / self.Mr_water)
+                (1000. / parameters.Mr_water)
             )
 
             solute_concentration_saline = (
                 density_solution_saline *
                 solute_mass_fraction_saline *
-                (1000. / self.Mr_solute)
+                (1000. / parameters.Mr_solute)
             )
 
             # average diffusion coefficients
@@ -481,30 +1419,30 @@ class Reservoir:
             ])
 
             water_diffusion_coeff_fi = (
-                self.diffusivity_water_fresh_segment *
+                parameters.diffusivity_water_fresh_segment *
                 water_concentration_fi  / (
-                    R * self.temperature
+                    R * parameters.temperature
                 )
             )
 
             water_diffusion_coeff_is = (
-                self.diffusivity_water_saline_segment *
+                parameters.diffusivity_water_saline_segment *
                 water_concentration_is  / (
-                    R * self.temperature
+                    R * parameters.temperature
                 )
             )
 
             solute_diffusion_coeff_fi = (
-                self.diffusivity_solute_fresh_segment *
+                parameters.diffusivity_solute_fresh_segment *
                 solute_concentration_fi / (
-                    R * self.temperature
+                    R * parameters.temperature
                 )
             )
 
             solute_diffusion_coeff_is = (
-                self.diffusivity_solute_saline_segment *
+                parameters.diffusivity_solute_saline_segment *
                 solute_concentration_is / (
-                    R * self.temperature
+                    R * parameters.temperature
                 )
             )
 
@@ -512,42 +1450,42 @@ class Reservoir:
             water_potential_fresh = (
                 chemical_potential.compute(
                     activity=water_fraction_fresh,
-                    temperature=self.temperature
+                    temperature=parameters.temperature
                 )
             )
 
             water_potential_intermediate = (
                 chemical_potential.compute(
                     activity=water_fraction_intermediate,
-                    temperature=self.temperature
+                    temperature=parameters.temperature
                 )
             )
 
             water_potential_saline = (
                 chemical_potential.compute(
                     activity=water_fraction_saline,
-                    temperature=self.temperature
+                    temperature=parameters.temperature
                 )
             )
 
             solute_potential_fresh = (
                 chemical_potential.compute(
                     activity=solute_fraction_fresh,
-                    temperature=self.temperature
+                    temperature=parameters.temperature
                 )
             )
 
             solute_potential_intermediate = (
                 chemical_potential.compute(
                     activity=solute_fraction_intermediate,
-                    temperature=self.temperature
+                    temperature=parameters.temperature
                 )
             )
 
             solute_potential_saline = (
                 chemical_potential.compute(
                     activity=solute_fraction_saline,
-                    temperature=self.temperature
+                    temperature=parameters.temperature
                 )
             )
 
@@ -555,44 +1493,44 @@ class Reservoir:
             J_w_fi = (
                 -1. *
                 water_diffusion_coeff_fi *
-                self.cs_area * (
+                parameters.cs_area * (
                     (
                         water_potential_fresh -
                         water_potential_intermediate
-                    ) / self.numerical_separation[0]
+                    ) / parameters.numerical_separation[0]
                 )
             )
 
             J_w_is = (
                 -1. *
                 water_diffusion_coeff_is *
-                self.cs_area * (
+                parameters.cs_area * (
                     (
                         water_potential_intermediate -
                         water_potential_saline
-                    ) / self.numerical_separation[1]
+                    ) / parameters.numerical_separation[1]
                 ) 
             )
 
             J_s_fi = (
                 -1. *
                 solute_diffusion_coeff_fi *
-                self.cs_area * (
+                parameters.cs_area * (
                     (
                         solute_potential_fresh -
                         solute_potential_intermediate
-                    ) / self.numerical_separation[0]
+                    ) / parameters.numerical_separation[0]
                 )
             )
 
             J_s_is = (
                 -1. *
                 solute_diffusion_coeff_is *
-                self.cs_area * (
+                parameters.cs_area * (
                     (
                         solute_potential_intermediate -
                         solute_potential_saline
-                    ) / self.numerical_separation[1]
+                    ) / parameters.numerical_separation[1]
                 ) 
             )
 
@@ -601,191 +1539,40 @@ class Reservoir:
                 J_s_fi, J_s_is - J_s_fi, -J_s_is
             ])
 
-        # initial condition
-
-            # average diffusion coefficients
-            #water_concentration_mean = np.mean([
-            #    water_concentration_fresh,
-            #    water_concentration_saline
-            #])
-
-            #solute_concentration_mean = np.mean([
-            #    solute_concentration_fresh,
-            #    solute_concentration_saline
-            #])
-
-            #water_diffusion_coefficient_average = (
-            #    self.diffusivity_water *
-            #    water_concentration_mean / (
-            #        R * self.temperature
-            #    )
-            #)
-
-            #solute_diffusion_coefficient_average = (
-            #    self.diffusivity_solute *
-            #    solute_concentration_mean / (
-            #        R * self.temperature
-            #    )
-            #)
-
-            # chemical potentials
-            #water_potential_fresh = (
-            #    chemical_potential.compute(
-            #        activity=water_fraction_fresh,
-            #        temperature=self.temperature
-            #    )
-            #)
-
-            #water_potential_saline = (
-            #    chemical_potential.compute(
-            #        activity=water_fraction_saline,
-            #        temperature=self.temperature
-            #    )
-            #)
-
-            #solute_potential_fresh = (
-            #    chemical_potential.compute(
-            #        activity=solute_fraction_fresh,
-            #        temperature=self.temperature
-            #    )
-            #)
-
-            #solute_potential_saline = (
-            #    chemical_potential.compute(
-            #        activity=solute_fraction_saline,
-            #        temperature=self.temperature
-            #    )
-            #)
-
-            # fluxes
-            #self.recovery_gate *= (
-            #    np.heaviside(
-            #        water_moles[0] + solute_moles[0] - 0.01, 0.
-            #    )
-            #)
-
-            #J_w_sf = (
-            #    -1. *
-            #    water_diffusion_coefficient_average *
-            #    self.cs_area * (
-            #        (
-            #            water_potential_saline -
-            #            water_potential_fresh
-            #        ) / self.numerical_separation
-            #    )
-            #)
-
-            #J_s_sf = (
-            #    -1. *
-            #    solute_diffusion_coefficient_average *
-            #    self.cs_area * (
-            #        (
-            #            solute_potential_saline -
-            #            solute_potential_fresh
-            #        ) / self.numerical_separation
-            #    )
-            #)
-
-            #J_w_fr = (
-            #    -1. *
-            #    np.heaviside(
-            #        (
-            #            water_mass_fraction_fresh -
-            #            (1. - self.max_solute_fraction)
-            #        ), 0.
-            #    ) *
-            #    self.recovery_gate *
-            #    self.recovery_rate *
-            #    water_mass_fraction_fresh /
-            #    self.Mr_water
-            #)
-
-            #J_s_fr = (
-            #    -1. *
-            #    np.heaviside(
-            #        (
-            #            self.max_solute_fraction -
-            #            solute_mass_fraction_fresh
-            #        ), 0.
-            #    ) *
-            #    self.recovery_gate *
-            #    self.recovery_rate *
-            #    solute_mass_fraction_fresh /
-            #    self.Mr_solute
-            #)
-
-            #return np.asarray([
-            #    -J_w_sf + J_w_fr, J_w_sf, -J_w_fr,
-            #    -J_s_sf + J_s_fr, J_s_sf, -J_s_fr
-            #])
-
-        # initial condition
-        initial_moles = np.asarray([
-            self.moles_water_fresh_initial,
-            self.moles_water_saline_initial,
-            0.,
-            self.moles_solute_fresh_initial,
-            self.moles_solute_saline_initial,
-            0.
-        ])
-
-        # numerical solution
-        result = odeint(
-            differential, initial_moles,
-            np.arange(n_steps) * step_size,
-            hmax=(
-                hmax if hmax else 0
-            )
-        )
-
-        mass_fraction_solute_fresh = (
-            (result[:, 3] * self.Mr_solute)
-        ) / (
-            (result[:, 0] * self.Mr_water) +
-            (result[:, 3] * self.Mr_solute)
+        time = (
+            np.arange(n_steps) * step_size
+            if output_times is None
+            else np.asarray(output_times, dtype=np.float64)
         )
 
-        efficiency = (
-            (
-                result[:, 2] * self.Mr_water +
-                result[:, -1] * self.Mr_solute
-            ) / self.density_pure
-        ) / self.volume_fresh
+        # right-hand side timed only while profiling
+        rhs_clock = profiling.Stopwatch() if profiling.active() else None
+        integration_clock = profiling.Stopwatch()
 
-        if (
-            np.max(mass_fraction_solute_fresh) <
-            self.max_solute_fraction
-        ):
-            time_at_limit = None
+        with profiling.stage("integration"), integration_clock:
+            result, info = odeint(
+                (
+                    differential if rhs_clock is None
+                    else rhs_clock.wrap(differential)
+                ),
+                self.parameters.initial_moles, time,
+                hmax=(
+                    hmax if hmax else 0
+                ),
+                full_output=True
+            )
 
-            idx = 0
-            while (
-                efficiency[-1] - efficiency[idx]
-                >= 0.0001
-            ):
-                idx += 1
+        solver_stats = diagnostics.from_odeint(info)
 
-            time_to_full_recovery = (
-                np.arange(n_steps) * step_size
-            )[idx]
+        self._time_solver(
+            solver_stats, integration_clock=integration_clock,
+            rhs_clock=rhs_clock
+        )
 
-        else:
-            time_at_limit = np.interp(
-                self.max_solute_fraction,
-                mass_fraction_solute_fresh,
-                np.arange(n_steps) * step_size,
-            )
+        with profiling.stage("post_processing"):
+            output = self.post_process(time, result, backend=backend)
 
-            time_to_full_recovery = None
+        output["solution"] = None
+        output["solver_stats"] = solver_stats
 
-        return {
-            "moles": result,
-            "mass_fraction_solute_fresh": (
-                mass_fraction_solute_fresh
-            ),
-            "asr_efficiency": efficiency,
-            "time_to_recovery_limit": time_at_limit,
-            "time_to_full_recovery": (
-                time_to_full_recovery
-            )
-        }    
+        return output
@@ -0,0 +1,713 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import asyncio
+import contextlib
+import http.client
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from asr_inject.utils.overrides import apply_overrides
+
+
+MAX_BODY_BYTES = 2**24
+POLL_INTERVAL = 0.5 # s
+STATUS_REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request",
+    404: "Not Found", 405: "Method Not Allowed",
+    409: "Conflict", 413: "Payload Too Large",
+    500: "Internal Server Error"
+}
+
+
+def warm_up(base_config: dict[str, Any] | None) -> None:
+    """
+    Worker initialiser: imports the pipeline and the
+    plotting backend once, and fits the base
+    configuration's data so that jobs sharing it hit the
+    in-memory fit memo.
+    """
+    import numpy as np
+
+    # imported for their side effect of loading the
+    # simulation and plotting stacks once per worker
+    import matplotlib.figure
+    from asr_inject.operations import pipeline
+    from asr_inject.utils.fitting import arrhenius_fit, density_fit
+
+    if base_config is None:
+        return
+
+    density_fit(base_config["density"])
+
+    for species in ["water", "solute"]:
+        for segment in ["fresh_segment", "saline_segment"]:
+            arrhenius_fit(
+                np.asarray(
+                    base_config[f"{species}_diffusivity"][segment],
+                    dtype=np.float64
+                )
+            )
+
+def run_job(
+        config_dict: dict[str, Any], outdir: Path
+) -> dict[str, Any]:
+    """
+    Runs a parsed configuration through the pipeline and
+    summarises it as JSON-serialisable values.
+    """
+    from asr_inject.operations import pipeline
+    from asr_inject.operations.metrics import final_efficiency
+
+    output = pipeline.run_config(config_dict, outdir=outdir)
+
+    def scalar(value: Any) -> float | None:
+        """
+        """
+        return None if value is None else float(value)
+
+    return {
+        "final_efficiency": final_efficiency(output["asr_efficiency"]),
+        **{
+            key: scalar(output[key])
+            for key in output.keys() if key.startswith("time_to_")
+        },
+        "peak_solute_interlayer": scalar(
+            output["peak_solute_interlayer"]
+        ),
+        "solver_stats": output["solver_stats"],
+        "outdir": str(outdir)
+    }
+
+
+class JobServer:
+    """
+    Local JSON-over-HTTP service queueing pipeline runs
+    onto a pool of long-lived worker processes.
+
+    Endpoints
+    ---------
+    `GET /health`, `GET /jobs`, `POST /jobs` (body
+    `{"config": {...}, "overrides": {...}, "plots": bool}`,
+    every key optional if the server has a base
+    configuration), `GET /jobs/<id>` (status) and
+    `GET /jobs/<id>/result`.
+
+    Jobs and their results are kept in memory for the
+    server's lifetime; their outputs are written to
+    `<outdir>/<id>`.
+    """
+
+    def __init__(
+            self, *, outdir: Path, workers: int | None=None,
+            base_config: dict[str, Any] | None=None,
+            in_process: bool=False,
+            logger: logging.Logger | None=None
+    ) -> None:
+        """
+        Arguments
+        ---------
+        workers: `int | None=None`
+            number of jobs run concurrently (defaults to
+            all cores).
+
+        base_config: `dict[str, Any] | None=None`
+            parsed configuration used by jobs that do not
+            send their own, and whose fits are warmed up
+            on every worker.
+
+        in_process: `bool=False`
+            if `True`, runs jobs on threads of this process
+            instead (e.g. for tests).
+        """
+        self.outdir = outdir
+        self.workers = workers if workers else (
+            1 if in_process else os.cpu_count() or 1
+        )
+        self.base_config = base_config
+        self.in_process = in_process
+        self.logger = logger
+
+        self.jobs: dict[str, dict[str, Any]] = {}
+        self.results: dict[str, dict[str, Any]] = {}
+
+        self._queue: asyncio.Queue | None = None
+        self._executor: Executor | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._consumers: list[asyncio.Task] = []
+
+
+    async def start(
+            self, *, host: str="127.0.0.1", port: int=0,
+            socket_path: Path | None=None
+    ) -> str:
+        """
+        Starts the worker pool and listens on `host:port`
+        (an ephemeral port if 0) or on the Unix socket
+        `socket_path`.
+
+        Returns
+        -------
+        The server's address, as accepted by `JobClient`.
+        """
+        self._queue = asyncio.Queue()
+
+        self._executor = (
+            ThreadPoolExecutor(max_workers=self.workers)
+            if self.in_process
+            else ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=warm_up,
+                initargs=(self.base_config,)
+            )
+        )
+
+        self._consumers = [
+            asyncio.create_task(self._consume())
+            for _ in range(self.workers)
+        ]
+
+        if socket_path is not None:
+            self._server = await asyncio.start_unix_server(
+                self._handle, path=str(socket_path)
+            )
+            address = f"unix:{socket_path}"
+
+        else:
+            self._server = await asyncio.start_server(
+                self._handle, host=host, port=port
+            )
+            host, port = self._server.sockets[0].getsockname()[:2]
+            address = f"http://{host}:{port}"
+
+        if self.logger is not None:
+            self.logger.info(
+                f"Serving on {address} with {self.workers} "
+                f"{'thread' if self.in_process else 'process'}"
+                " worker(s)"
+            )
+
+        return address
+
+
+    async def close(self) -> None:
+        """
+        Stops listening, cancels queued jobs and shuts the
+        worker pool down once running jobs finish.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+        for consumer in self._consumers:
+            consumer.cancel()
+
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+
+        for job in self.jobs.values():
+            if job["status"] == "queued":
+                job["status"] = "cancelled"
+
+        if self._executor is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._executor.shutdown
+            )
+
+
+    def submit(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """
+        Validates and queues a job request.
+
+        Returns
+        -------
+        The new job's status.
+        """
+        config = payload.get("config", self.base_config)
+
+        if not isinstance(config, dict):
+            raise ValueError(
+                "the request has no `config` and the server "
+                "no base configuration"
+            )
+
+        from asr_inject.operations import pipeline
+
+        config_dict = apply_overrides(
+            config, payload.get("overrides", {})
+        )
+        pipeline.check_config(config_dict)
+
+        if "plots" in payload.keys():
+            config_dict["plots"] = bool(payload["plots"])
+
+        # jobs already run in parallel; draw figures in-process
+        config_dict["plot_workers"] = 1
+
+        job_id = uuid.uuid4().hex[:12]
+        self.jobs[job_id] = {
+            "id": job_id,
+            "status": "queued",
+            "submitted": datetime.now().isoformat(),
+            "started": None,
+            "finished": None,
+            "error": None
+        }
+
+        self._queue.put_nowait((job_id, config_dict))
+
+        if self.logger is not None:
+            self.logger.info(
+                f"Job {job_id} queued "
+                f"({self._queue.qsize()} waiting)"
+            )
+
+        return self.jobs[job_id]
+
+
+    async def _consume(self) -> None:
+        """
+        Runs queued jobs one at a time on the pool.
+        """
+        loop = asyncio.get_running_loop()
+
+        while True:
+            job_id, config_dict = await self._queue.get()
+            job = self.jobs[job_id]
+
+            job["status"] = "running"
+            job["started"] = datetime.now().isoformat()
+            start = time.perf_counter()
+
+            try:
+                self.results[job_id] = await loop.run_in_executor(
+                    self._executor, run_job,
+                    config_dict, self.outdir / job_id
+                )
+                job["status"] = "done"
+
+            except asyncio.CancelledError:
+                job["status"] = "cancelled"
+                raise
+
+            except Exception as exc:
+                job["status"] = "failed"
+                job["error"] = f"{type(exc).__name__}: {exc}"
+
+            finally:
+                job["finished"] = datetime.now().isoformat()
+                self._queue.task_done()
+
+            if self.logger is not None:
+                self.logger.info(
+                    f"Job {job_id} {job['status']} in "
+                    f"{round(time.perf_counter() - start, 3)} s"
+                    + (f" ({job['error']})" if job["error"] else "")
+                )
+
+
+    def _route(
+            self, method: str, path: str, body: bytes
+    ) -> tuple[int, dict[str, Any]]:
+        """
+        Dispatches a request to its endpoint.
+
+        Returns
+        -------
+        The HTTP status code and JSON payload.
+        """
+        parts = [part for part in path.split('?')[0].split('/') if part]
+
+        if parts == ["health"] and method == "GET":
+            return 200, {
+                "status": "ok",
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "jobs": len(self.jobs)
+            }
+
+        if parts == ["jobs"]:
+            if method == "GET":
+                return 200, {"jobs": list(self.jobs.values())}
+
+            if method != "POST":
+                return 405, {"error": f"{method} not allowed"}
+
+            try:
+                payload = json.loads(body or b"{}")
+
+                if not isinstance(payload, dict):
+                    raise ValueError("the payload must be an object")
+
+                return 202, self.submit(payload)
+
+            except (ValueError, KeyError) as exc:
+                return 400, {"error": str(exc)}
+
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            if method != "GET":
+                return 405, {"error": f"{method} not allowed"}
+
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return 404, {"error": f"unknown job '{parts[1]}'"}
+
+            if len(parts) == 2:
+                return 200, job
+
+            if parts[2] == "result":
+                if job["status"] != "done":
+                    return 409, job
+
+                return 200, {
+                    **job, "result": self.results[parts[1]]
+                }
+
+        return 404, {"error": f"unknown endpoint '{path}'"}
+
+
+    async def _handle(
+            self, reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Serves one HTTP/1.1 request per connection.
+        """
+        try:
+            request_line = await reader.readline()
+            method, path, _ = request_line.decode().split(' ', 2)
+
+            headers = {}
+            while (line := await reader.readline()) not in (
+                b"\r\n", b"\n", b""
+            ):
+                key, _, value = line.decode().partition(':')
+                headers[key.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+
+            if length > MAX_BODY_BYTES:
+                code, payload = 413, {"error": "payload too large"}
+
+            else:
+                code, payload = self._route(
+                    method, path,
+                    await reader.readexactly(length)
+                )
+
+        except (ValueError, asyncio.IncompleteReadError) as exc:
+            code, payload = 400, {"error": f"malformed request: {exc}"}
+
+        except Exception as exc:
+            code, payload = 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+        body = json.dumps(payload).encode()
+
+        writer.write(
+            (
+                f"HTTP/1.1 {code} {STATUS_REASONS[code]}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode() + body
+        )
+
+        try:
+            await writer.drain()
+
+        finally:
+            writer.close()
+
+
+class JobClient:
+    """
+    Blocking client of a `JobServer`, at an address
+    `"http://host:port"` or `"unix:/path/to/socket"`.
+    """
+
+    def __init__(self, address: str, *, timeout: float=30.) -> None:
+        """
+        """
+        self.address = address
+        self.timeout = timeout
+
+
+    def _connection(self) -> http.client.HTTPConnection:
+        """
+        """
+        if self.address.startswith("unix:"):
+            return _UnixConnection(
+                self.address[len("unix:"):], timeout=self.timeout
+            )
+
+        host, _, port = self.address.removeprefix(
+            "http://"
+        ).rstrip('/').rpartition(':')
+
+        return http.client.HTTPConnection(
+            host, int(port), timeout=self.timeout
+        )
+
+
+    def request(
+            self, method: str, path: str,
+            payload: dict[str, Any] | None=None
+    ) -> tuple[int, dict[str, Any]]:
+        """
+        Sends a JSON request.
+
+        Returns
+        -------
+        The HTTP status code and decoded JSON payload.
+        """
+        connection = self._connection()
+
+        try:
+            connection.request(
+                method, path,
+                body=(
+                    None if payload is None
+                    else json.dumps(payload).encode()
+                ),
+                headers={"Content-Type": "application/json"}
+            )
+            response = connection.getresponse()
+
+            return response.status, json.loads(response.read())
+
+        finally:
+            connection.close()
+
+
+    def _checked(
+            self, method: str, path: str,
+            payload: dict[str, Any] | None=None
+    ) -> dict[str, Any]:
+        """
+        """
+        status, body = self.request(method, path, payload)
+
+        if status >= 400:
+            raise RuntimeError(
+                f"{method} {path} failed with {status}: "
+                f"{body.get('error', body)}"
+            )
+
+        return body
+
+
+    def health(self) -> dict[str, Any]:
+        """
+        """
+        return self._checked("GET", "/health")
+
+
+    def jobs(self) -> list[dict[str, Any]]:
+        """
+        """
+        return self._checked("GET", "/jobs")["jobs"]
+
+
+    def submit(
+            self, *, config: dict[str, Any] | None=None,
+            overrides: dict[str, Any] | None=None,
+            plots: bool | None=None
+    ) -> str:
+        """
+        Queues a job, from a parsed `config` (the server's
+        base configuration if `None`) with dotted
+        parameter `overrides`.
+
+        Returns
+        -------
+        The job's id.
+        """
+        payload = {}
+        if config is not None:
+            payload["config"] = config
+
+        if overrides is not None:
+            payload["overrides"] = overrides
+
+        if plots is not None:
+            payload["plots"] = plots
+
+        return self._checked("POST", "/jobs", payload)["id"]
+
+
+    def status(self, job_id: str) -> dict[str, Any]:
+        """
+        """
+        return self._checked("GET", f"/jobs/{job_id}")
+
+
+    def result(self, job_id: str) -> dict[str, Any]:
+        """
+        Result summary of a finished job; raises a
+        `RuntimeError` if it has not finished or failed.
+        """
+        status, body = self.request("GET", f"/jobs/{job_id}/result")
+
+        if status != 200:
+            raise RuntimeError(
+                f"job {job_id} is {body.get('status', 'unknown')}"
+                + (f": {body['error']}" if body.get("error") else "")
+            )
+
+        return body["result"]
+
+
+    def wait(
+            self, job_id: str, *, timeout: float | None=None,
+            interval: float=POLL_INTERVAL
+    ) -> dict[str, Any]:
+        """
+        Polls a job until it finishes and returns its
+        result (see `result`).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while self.status(job_id)["status"] in ("queued", "running"):
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"job {job_id} did not finish within {timeout} s"
+                )
+
+            time.sleep(interval)
+
+        return self.result(job_id)
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    """
+    `HTTPConnection` over a Unix domain socket.
+    """
+
+    def __init__(self, path: str, *, timeout: float) -> None:
+        """
+        """
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+
+    def connect(self) -> None:
+        """
+        """
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def serve(
+        *, outdir: Path, host: str="127.0.0.1", port: int=8765,
+        socket_path: Path | None=None, workers: int | None=None,
+        base_config: dict[str, Any] | None=None,
+        logger: logging.Logger | None=None
+) -> None:
+    """
+    Runs a `JobServer` until interrupted (SIGINT/SIGTERM).
+    """
+    async def main() -> None:
+        """
+        """
+        server = JobServer(
+            outdir=outdir, workers=workers,
+            base_config=base_config, logger=logger
+        )
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        for signum in [signal.SIGINT, signal.SIGTERM]:
+            loop.add_signal_handler(signum, stop.set)
+
+        await server.start(
+            host=host, port=port, socket_path=socket_path
+        )
+
+        try:
+            await stop.wait()
+
+        finally:
+            if logger is not None:
+                logger.info("Shutting down")
+
+            await server.close()
+
+            if socket_path is not None:
+                socket_path.unlink(missing_ok=True)
+
+    asyncio.run(main())
+
+@contextlib.contextmanager
+def serve_in_thread(
+        *, outdir: Path, workers: int=1,
+        base_config: dict[str, Any] | None=None,
+        in_process: bool=True,
+        socket_path: Path | None=None
+) -> Iterator[JobClient]:
+    """
+    Runs a `JobServer` on an ephemeral local port (or
+    `socket_path`) in a background thread, with jobs on
+    threads of this process unless `in_process` is
+    `False`, and yields a client connected to it.
+    """
+    started = threading.Event()
+    state = {}
+
+    async def main() -> None:
+        """
+        """
+        server = JobServer(
+            outdir=outdir, workers=workers,
+            base_config=base_config, in_process=in_process
+        )
+
+        state["stop"] = asyncio.Event()
+        state["loop"] = asyncio.get_running_loop()
+
+        try:
+            state["address"] = await server.start(
+                port=0, socket_path=socket_path
+            )
+
+        except Exception as exc:
+            state["error"] = exc
+            started.set()
+            return
+
+        started.set()
+
+        try:
+            await state["stop"].wait()
+
+        finally:
+            await server.close()
+
+    thread = threading.Thread(
+        target=asyncio.run, args=(main(),), daemon=True
+    )
+    thread.start()
+    started.wait()
+
+    if "error" in state.keys():
+        thread.join()
+        raise state["error"]
+
+    try:
+        yield JobClient(state["address"])
+
+    finally:
+        state["loop"].call_soon_threadsafe(state["stop"].set)
+        thread.join()
+
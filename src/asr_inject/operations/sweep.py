@@ -0,0 +1,150 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import csv
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from asr_inject.operations import pipeline
+from asr_inject.operations.metrics import final_efficiency
+from asr_inject.utils.overrides import apply_overrides
+
+
+DAY_TO_SEC = 86400.
+
+def expand(
+        parameters: dict[str, list[Any]], *,
+        mode: str="product"
+) -> list[dict[str, Any]]:
+    """
+    Expands value grids keyed by dotted parameter paths
+    into one override dictionary per case, either as
+    their cartesian `"product"` or `"zip"`-ped together.
+    """
+    paths = list(parameters.keys())
+
+    if mode == "product":
+        combinations = itertools.product(
+            *parameters.values()
+        )
+
+    elif mode == "zip":
+        lengths = {len(values) for values in parameters.values()}
+        if len(lengths) > 1:
+            raise ValueError(
+                "zipped parameter lists must have the same "
+                "length"
+            )
+
+        combinations = zip(*parameters.values())
+
+    else:
+        raise ValueError(f"unknown sweep mode '{mode}'")
+
+    return [
+        dict(zip(paths, values)) for values in combinations
+    ]
+
+
+def run_case(
+        case: int, config_dict: dict[str, Any],
+        overrides: dict[str, Any], outdir: Path
+) -> dict[str, Any]:
+    """
+    Runs a single case of a sweep and summarises it.
+    """
+    output = pipeline.run_config(
+        apply_overrides(config_dict, overrides),
+        outdir=outdir / f"case_{case:04d}"
+    )
+
+    def in_days(seconds: float | None) -> float | None:
+        """
+        """
+        return None if seconds is None else seconds / DAY_TO_SEC
+
+    return {
+        "case": case,
+        **overrides,
+        "final_efficiency": final_efficiency(output["asr_efficiency"]),
+        **{
+            f"{key}_days": in_days(output[key])
+            for key in output.keys() if key.startswith("time_to_")
+        },
+        "peak_solute_interlayer": output["peak_solute_interlayer"]
+    }
+
+
+def run(
+        spec: Path, *, outdir: Path,
+        workers: int | None=None,
+        logger: logging.Logger | None=None,
+        plots: bool | None=None
+) -> list[dict[str, Any]]:
+    """
+    Runs every case of a sweep specification on a process
+    pool and writes `sweep_summary.csv` to `outdir`.
+
+    The specification is a `.yml` file with keys `base`
+    (path to the base configuration, relative to the
+    specification), `parameters` (dotted parameter paths
+    mapped to lists of values), and optionally `mode`
+    (`"product"` or `"zip"`) and `workers`. `plots`, if
+    given, overrides the base configuration's `plots`.
+    """
+    spec_dict = pipeline.read_yaml(spec)
+
+    config_dict = pipeline.read_yaml(
+        spec.parent / spec_dict["base"]
+    )
+
+    if plots is not None:
+        config_dict["plots"] = plots
+
+    # cases already run in parallel; draw their figures in-process
+    config_dict["plot_workers"] = 1
+
+    cases = expand(
+        spec_dict["parameters"],
+        mode=(
+            spec_dict["mode"] if "mode" in spec_dict.keys()
+            else "product"
+        )
+    )
+
+    if not cases:
+        raise ValueError("the sweep has no cases")
+
+    if workers is None and "workers" in spec_dict.keys():
+        workers = spec_dict["workers"]
+
+    if logger is not None:
+        logger.info(
+            f"Running {len(cases)} sweep cases on "
+            f"{workers if workers else 'all available'} "
+            "workers"
+        )
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        summary = list(
+            executor.map(
+                run_case,
+                range(len(cases)),
+                itertools.repeat(config_dict),
+                cases,
+                itertools.repeat(outdir)
+            )
+        )
+
+    outdir.mkdir(parents=True, exist_ok=True)
+    with open(outdir / "sweep_summary.csv", 'w', newline='') as file:
+        writer = csv.DictWriter(
+            file, fieldnames=list(summary[0].keys())
+        )
+        writer.writeheader()
+        writer.writerows(summary)
+
+    return summary
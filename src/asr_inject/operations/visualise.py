@@ -4,200 +4,208 @@ licensing script of this repository. """
 from pathlib import Path
 from typing import Any
 
-import matplotlib.pyplot as plt
 import numpy as np
 from numpy.typing import NDArray
 
+from asr_inject.operations.metrics import final_efficiency
+from asr_inject.utils.cache import ResultCache
+from asr_inject.utils.figures import render_all
+
 
 DAY_TO_SEC = 86400.
 k_TO_SI = 1000.
+PLOT_POINTS = 4000
+BUCKET_CHUNK_POINTS = 2**18 # rows per read of a (memory-mapped) series
 
-def plot_2d(
-        results: dict[str, NDArray], *,
-        config: dict[str, Any], outdir: Path
-) -> None:
-    """
+def bucket_extrema(series: NDArray, *, n_buckets: int) -> NDArray:
     """
-    # make outdir
-    outdir.mkdir(parents=True, exist_ok=True)
+    Sorted indices of the end points and of the minimum
+    and maximum of every column of `series` within each
+    of `n_buckets` equal buckets (plus the remainder),
+    so that peaks and steps survive downsampling.
 
-    # water moles
-    water_mass = results["moles"][:, :3] * (
-        config["solution_characteristics"]["Mr_water"] /
-        k_TO_SI
-    )
+    Whole buckets are read `BUCKET_CHUNK_POINTS` rows at
+    a time, so that memory-mapped series stay on disk.
+    """
+    n_points = len(series)
+    if n_points <= 2 * n_buckets + 2:
+        return np.arange(n_points)
 
-    if results["time_to_recovery_limit"]:
-        limiting = (
-            results["time_to_recovery_limit"] / DAY_TO_SEC
-        )
-        limit_label = "recovery limit"
+    size = n_points // n_buckets
+    end = n_buckets * size
+    per_chunk = max(1, BUCKET_CHUNK_POINTS // size)
 
-    else:
-        limiting = (
-            results["time_to_full_recovery"] / DAY_TO_SEC
-        )
-        limit_label = "full recovery"
+    indices = [np.asarray([0, n_points - 1])]
 
-    plt.plot(
-        (
-            np.arange(config["n_steps"]) *
-            config["step_size"] / DAY_TO_SEC
-        ),
-        water_mass[:, 0],
-        label="fresh segment"
-    )
+    for first in range(0, n_buckets, per_chunk):
+        last = min(first + per_chunk, n_buckets)
 
-    plt.plot(
-        (
-            np.arange(config["n_steps"]) *
-            config["step_size"] / DAY_TO_SEC
-        ),
-        water_mass[:, 1],
-        label="saline segment"
-    )
+        buckets = np.asarray(
+            series[first * size:last * size]
+        ).reshape(last - first, size, -1)
+        offsets = (np.arange(first, last) * size)[:, None]
 
-    plt.plot(
-        (
-            np.arange(config["n_steps"]) *
-            config["step_size"] / DAY_TO_SEC
-        ),
-        water_mass[:, 2],
-        label="recovered"
-    )
+        indices.append((buckets.argmin(axis=1) + offsets).ravel())
+        indices.append((buckets.argmax(axis=1) + offsets).ravel())
 
-    plt.plot(
-        np.asarray([limiting, limiting]),
-        np.asarray([
-            np.min(water_mass), np.max(water_mass)
-        ]),
-        "k--",
-        label=limit_label
-    )
+    if end < n_points:
+        rest = np.asarray(series[end:]).reshape(n_points - end, -1)
 
-    filename = "water_mass"
-    plt.legend(loc="best")
-    plt.title(filename)
-    plt.xlabel("time (days)")
-    plt.ylabel("mass (kg)")
-    plt.savefig(f"{outdir / f"{filename}.png"}")
-    plt.close()
-
-    # solute moles
-    solute_mass = results["moles"][:, 3:] * (
-        config["solution_characteristics"]["Mr_solute"] /
-        k_TO_SI
-    )
+        indices.append(rest.argmin(axis=0) + end)
+        indices.append(rest.argmax(axis=0) + end)
 
-    plt.plot(
-        (
-            np.arange(config["n_steps"]) *
-            config["step_size"] / DAY_TO_SEC
-        ),
-        solute_mass[:, 0],
-        label="fresh segment"
-    )
+    return np.unique(np.concatenate(indices))
 
-    plt.plot(
-        (
-            np.arange(config["n_steps"]) *
-            config["step_size"] / DAY_TO_SEC
-        ),
-        solute_mass[:, 1],
-        label="saline segment"
+def plot_2d(
+        results: dict[str, NDArray], *,
+        config: dict[str, Any], outdir: Path,
+        cache: ResultCache | None=None
+) -> None:
+    """
+    Renders the water mass, solute mass, recovery purity
+    and (with a well) ASR efficiency figures concurrently
+    on `config["plot_workers"]` processes.
+    """
+    # per-figure point budget, spread over its series
+    n_points = (
+        config["plot_points"] if "plot_points" in config.keys()
+        else PLOT_POINTS
     )
 
-    plt.plot(
-        (
-            np.arange(config["n_steps"]) *
-            config["step_size"] / DAY_TO_SEC
-        ),
-        solute_mass[:, 2],
-        label="recovered"
-    )
+    # shared (possibly memory-mapped) series, read once
+    time = results["time"]
+    moles = results["moles"]
+
+    # first of the limiting times that applies, if any
+    limiting, limit_label = None, None
+    for key, label in [
+        ("time_to_recovery_limit", "recovery limit"),
+        ("time_to_plateau", "plateau"),
+        ("time_to_full_recovery", "full recovery")
+    ]:
+        if results.get(key) is not None:
+            limiting = results[key] / DAY_TO_SEC
+            limit_label = label
+            break
+
+    def limit_line(low: float, high: float) -> list[dict[str, Any]]:
+        """
+        """
+        if limiting is None:
+            return []
+
+        return [{
+            "kind": "plot",
+            "args": (
+                np.asarray([limiting, limiting]),
+                np.asarray([low, high]),
+                "k--"
+            ),
+            "kwargs": {"label": limit_label}
+        }]
+
+    figures = {}
+
+    # water and solute moles
+    for filename, columns, Mr in [
+        ("water_mass", slice(0, 3), "Mr_water"),
+        ("solute_mass", slice(3, 6), "Mr_solute")
+    ]:
+        idx = bucket_extrema(
+            moles[:, columns], n_buckets=n_points // 6
+        )
+        time_days = time[idx] / DAY_TO_SEC
 
-    plt.plot(
-        np.asarray([limiting, limiting]),
-        np.asarray([
-            np.min(solute_mass), np.max(solute_mass)
-        ]),
-        "k--",
-        label=limit_label
-    )
+        mass = moles[idx, columns] * (
+            config["solution_characteristics"][Mr] /
+            k_TO_SI
+        )
 
-    filename = "solute_mass"
-    plt.legend(loc="best")
-    plt.title(filename)
-    plt.xlabel("time (days)")
-    plt.ylabel("mass (kg)")
-    plt.savefig(f"{outdir / f"{filename}.png"}")
-    plt.close()
+        figures[outdir / f"{filename}.png"] = {
+            "title": filename,
+            "xlabel": "time (days)",
+            "ylabel": "mass (kg)",
+            "series": [
+                *(
+                    {
+                        "kind": "plot",
+                        "args": (time_days, mass[:, cell]),
+                        "kwargs": {"label": label}
+                    }
+                    for cell, label in enumerate([
+                        "fresh segment", "interlayer",
+                        "saline segment"
+                    ])
+                ),
+                *limit_line(np.min(mass), np.max(mass))
+            ]
+        }
 
     # mass fraction of fresh segment
-    mass_fraction = results["mass_fraction_solute_fresh"]
-    plt.plot(
-        (
-            np.arange(config["n_steps"]) *
-            config["step_size"] / DAY_TO_SEC
-        ),
-        mass_fraction
-    )
-
-    plt.plot(
-        np.asarray([limiting, limiting]),
-        np.asarray([
-            mass_fraction[0], mass_fraction[-1]
-        ]),
-        "k--",
-        label=limit_label
+    idx = bucket_extrema(
+        results["mass_fraction_solute_fresh"],
+        n_buckets=n_points // 2
     )
-
-    if results["time_to_recovery_limit"]:
-        plt.plot(
-            (
-                np.arange(config["n_steps"]) *
-                config["step_size"] / DAY_TO_SEC
-            ),
-            (
-                np.zeros(config["n_steps"]) +
-                config["recovery"][
-                    "threshold_solute_mass_fraction"
-                ]
-            ),
-            "k--"
+    time_days = time[idx] / DAY_TO_SEC
+
+    mass_fraction = results["mass_fraction_solute_fresh"][idx]
+
+    series = [
+        {"kind": "plot", "args": (time_days, mass_fraction)},
+        *limit_line(mass_fraction[0], mass_fraction[-1])
+    ]
+
+    if results["time_to_recovery_limit"] is not None:
+        threshold = config["recovery"][
+            "threshold_solute_mass_fraction"
+        ]
+
+        series.append({
+            "kind": "plot",
+            "args": (
+                np.asarray([time_days[0], time_days[-1]]),
+                np.asarray([threshold, threshold]),
+                "k--"
+            )
+        })
+
+    figures[outdir / "recovery_purity.png"] = {
+        "title": "recovery_purity",
+        "xlabel": "time (days)",
+        "ylabel": "solute mass fraction in fresh segment",
+        "series": series
+    }
+
+    # asr efficiency, undefined without a well
+    if final_efficiency(results["asr_efficiency"]) is not None:
+        idx = bucket_extrema(
+            results["asr_efficiency"], n_buckets=n_points // 2
         )
-
-    filename = "recovery_purity"
-
-    plt.legend(loc="best")
-    plt.title(filename)
-    plt.xlabel("time (days)")
-    plt.ylabel("solute mass fraction in fresh segment")
-    plt.savefig(f"{outdir / f"{filename}.png"}")
-    plt.close()
-
-    # asr efficiency
-    plt.plot(
-        (
-            np.arange(config["n_steps"]) *
-            config["step_size"] / DAY_TO_SEC
+        time_days = time[idx] / DAY_TO_SEC
+
+        figures[outdir / "asr_efficiency.png"] = {
+            "title": "asr_efficiency",
+            "xlabel": "time (days)",
+            "ylabel": "efficiency (%)",
+            "ylim": (-5., 105.),
+            "series": [
+                {
+                    "kind": "plot",
+                    "args": (
+                        time_days,
+                        results["asr_efficiency"][idx] * 100.
+                    )
+                },
+                *limit_line(0., 100.)
+            ]
+        }
+
+    render_all(
+        figures,
+        workers=(
+            config["plot_workers"]
+            if "plot_workers" in config.keys()
+            else None
         ),
-        results["asr_efficiency"] * 100.
-    )
-
-    plt.plot(
-        np.asarray([limiting, limiting]),
-        np.asarray([0., 100.]),
-        "k--",
-        label=limit_label
+        cache=cache
     )
-
-    filename = "asr_efficiency"
-
-    plt.legend(loc="best")
-    plt.title(filename)
-    plt.xlabel("time (days)")
-    plt.ylabel("efficiency (%)")
-    plt.ylim(-5., 105.)
-    plt.savefig(f"{outdir / f"{filename}.png"}")
-    plt.close()
@@ -0,0 +1,220 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import contextlib
+import errno
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+
+CACHE_VERSION = 3
+
+def canonicalise(obj: Any) -> Any:
+    """
+    JSON-serialisable, order-independent representation
+    of nested configuration/fitting data, with `numpy`
+    arrays and scalars converted to plain lists/numbers.
+    """
+    if isinstance(obj, dict):
+        return {
+            str(key): canonicalise(value)
+            for key, value in sorted(
+                obj.items(), key=lambda item: str(item[0])
+            )
+        }
+
+    if isinstance(obj, (list, tuple)):
+        return [canonicalise(value) for value in obj]
+
+    if isinstance(obj, np.ndarray):
+        return canonicalise(obj.tolist())
+
+    if isinstance(obj, np.generic):
+        return obj.item()
+
+    if isinstance(obj, Path):
+        return str(obj)
+
+    return obj
+
+
+def content_hash(*objects: Any) -> str:
+    """
+    SHA-256 of the canonical JSON form of `objects`.
+    """
+    payload = json.dumps(
+        [CACHE_VERSION, *map(canonicalise, objects)],
+        sort_keys=True, separators=(',', ':')
+    )
+
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed, size-bounded store of pickled
+    results, evicted least-recently-used first.
+
+    Every entry is a directory named after its key,
+    holding `value.pkl`, a human-readable
+    `summary.json` and optional attached files.
+
+    Several processes may share a cache: entries are
+    staged and renamed into place, never modified once
+    there, and may disappear (evicted by another process)
+    at any time, which reads treat as a miss.
+    """
+
+    def __init__(
+            self, directory: Path, *, max_bytes: int
+    ) -> None:
+        """
+        """
+        self.directory = Path(directory).expanduser()
+        self.max_bytes = max_bytes
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+
+    def _entry(self, key: str) -> Path:
+        """
+        """
+        return self.directory / key
+
+
+    def get(
+            self, key: str, *, files_to: Path | None=None
+    ) -> Any | None:
+        """
+        Cached value for `key`, or `None` on a miss; the
+        entry's attached files are copied to `files_to`.
+        """
+        entry = self._entry(key)
+        value_file = entry / "value.pkl"
+
+        try:
+            with open(value_file, 'rb') as file:
+                value = pickle.load(file)
+
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+        # mark as most recently used, unless just evicted
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(value_file)
+
+        if files_to is not None and (entry / "files").is_dir():
+            try:
+                shutil.copytree(
+                    entry / "files", files_to, dirs_exist_ok=True
+                )
+
+            # evicted while copying
+            except (FileNotFoundError, shutil.Error):
+                return None
+
+        return value
+
+
+    def put(
+            self, key: str, value: Any, *,
+            summary: dict[str, Any] | None=None,
+            files_from: Path | None=None
+    ) -> None:
+        """
+        Stores `value` (and a copy of the directory
+        `files_from`) atomically under `key`, then evicts
+        least-recently-used entries beyond `max_bytes`.
+
+        Keys are content hashes, so that an existing entry
+        (e.g. stored concurrently by another process)
+        already holds the same value and is kept as is.
+        """
+        staging = Path(
+            tempfile.mkdtemp(dir=self.directory, prefix=".tmp-")
+        )
+
+        try:
+            with open(staging / "value.pkl", 'wb') as file:
+                pickle.dump(
+                    value, file, protocol=pickle.HIGHEST_PROTOCOL
+                )
+
+            with open(staging / "summary.json", 'w') as file:
+                json.dump(
+                    canonicalise(summary or {}), file, indent=2
+                )
+
+            if files_from is not None and files_from.is_dir():
+                shutil.copytree(files_from, staging / "files")
+
+            entry = self._entry(key)
+
+            for _ in range(2):
+                try:
+                    staging.rename(entry)
+                    break
+
+                except OSError as exc:
+                    if exc.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                        raise
+
+                # already stored
+                if (entry / "value.pkl").exists():
+                    break
+
+                # left half-removed by an interrupted eviction
+                shutil.rmtree(entry, ignore_errors=True)
+
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging)
+
+        self.evict()
+
+
+    def evict(self) -> list[str]:
+        """
+        Removes least-recently-used entries until the
+        cache fits in `max_bytes`; returns their keys.
+        Entries removed concurrently are skipped.
+        """
+        entries = []
+        for entry in self.directory.iterdir():
+            value_file = entry / "value.pkl"
+            if entry.name.startswith('.'):
+                continue
+
+            try:
+                size = sum(
+                    path.stat().st_size
+                    for path in entry.rglob('*') if path.is_file()
+                )
+
+                entries.append(
+                    (value_file.stat().st_mtime, size, entry)
+                )
+
+            except FileNotFoundError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        evicted = []
+
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            evicted.append(entry.name)
+
+        return evicted
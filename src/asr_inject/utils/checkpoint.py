@@ -0,0 +1,140 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+class Checkpointer:
+    """
+    Periodic checkpoints of an integration split into
+    segments: the trajectory chunk of every completed
+    segment (`chunk_<start>.npy`) and the latest
+    `checkpoint.npz`, holding the solver state to restart
+    from, its output index and metadata.
+
+    Every file is written to a temporary file and renamed
+    into place, so that an interrupted run leaves the
+    last complete checkpoint intact.
+    """
+
+    def __init__(self, directory: Path, *, key: str) -> None:
+        """
+        Arguments
+        ---------
+        key: `str`
+            hash of everything the trajectory depends on;
+            checkpoints written under another key are
+            refused.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+
+        self.directory = directory
+        self.key = key
+
+
+    def _atomic(self, path: Path, write: Any) -> None:
+        """
+        Calls `write(file)` on a temporary file that then
+        replaces `path`.
+        """
+        descriptor, temporary = tempfile.mkstemp(
+            dir=self.directory, prefix=".tmp-"
+        )
+
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                write(file)
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.replace(temporary, path)
+
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+    def chunk_path(self, start: int) -> Path:
+        """
+        """
+        return self.directory / f"chunk_{start:012d}.npy"
+
+
+    def save(
+            self, *, start: int, chunk: NDArray,
+            state: NDArray, metadata: dict[str, Any]
+    ) -> None:
+        """
+        Stores the output rows `chunk` from index `start`
+        onwards, then the checkpoint to restart from
+        `state` at index `start + len(chunk)`.
+        """
+        self._atomic(
+            self.chunk_path(start),
+            lambda file: np.save(file, chunk)
+        )
+
+        self._atomic(
+            self.directory / "checkpoint.npz",
+            lambda file: np.savez(
+                file, state=state,
+                metadata=json.dumps({
+                    "key": self.key,
+                    "index": start + len(chunk),
+                    **metadata
+                })
+            )
+        )
+
+
+    def load(self) -> tuple[NDArray, dict[str, Any]] | None:
+        """
+        State and metadata of the latest checkpoint, or
+        `None` if there is none.
+        """
+        path = self.directory / "checkpoint.npz"
+
+        if not path.exists():
+            return None
+
+        with np.load(path) as checkpoint:
+            state = checkpoint["state"]
+            metadata = json.loads(str(checkpoint["metadata"]))
+
+        if metadata["key"] != self.key:
+            raise ValueError(
+                f"the checkpoint in {self.directory} belongs to "
+                "a different configuration"
+            )
+
+        return state, metadata
+
+
+    def trajectory(self, stop: int) -> list[NDArray]:
+        """
+        Stored chunks covering the output rows up to
+        `stop`, in order.
+        """
+        chunks = []
+        start = 0
+
+        while start < stop:
+            chunks.append(np.load(self.chunk_path(start)))
+            start += len(chunks[-1])
+
+        return chunks
+
+
+    def clear(self) -> None:
+        """
+        Removes every checkpoint, once the run completes.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,130 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from asr_inject.utils import profiling
+from asr_inject.utils.cache import ResultCache, content_hash
+
+
+def render(figure: dict[str, Any], outfile: Path) -> bytes:
+    """
+    Draws a figure description on its own Agg-backed
+    `Figure` (no global `pyplot` state, so figures can
+    be drawn concurrently) and saves it to `outfile`.
+
+    Arguments
+    ---------
+    figure: `dict[str, Any]`
+        `"title"`, `"xlabel"`, `"ylabel"`, optional
+        `"ylim"`, and `"series"`: a list of
+        `{"kind", "args", "kwargs"}` dictionaries, each
+        drawn as `getattr(axes, kind)(*args, **kwargs)`.
+
+    Returns
+    -------
+    The saved PNG's bytes.
+    """
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    axes = fig.add_subplot()
+
+    for series in figure["series"]:
+        getattr(axes, series["kind"])(
+            *series["args"],
+            **(series["kwargs"] if "kwargs" in series.keys() else {})
+        )
+
+    # unlabelled figures (e.g. without a limit line) get none
+    if axes.get_legend_handles_labels()[0]:
+        axes.legend(loc="best")
+
+    axes.set_title(figure["title"])
+    axes.set_xlabel(figure["xlabel"])
+    axes.set_ylabel(figure["ylabel"])
+
+    if "ylim" in figure.keys():
+        axes.set_ylim(*figure["ylim"])
+
+    outfile.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(outfile, format="png")
+
+    return outfile.read_bytes()
+
+
+def render_all(
+        figures: dict[Path, dict[str, Any]], *,
+        workers: int | None=None,
+        cache: ResultCache | None=None
+) -> None:
+    """
+    Renders independent figures (keyed by output file) on
+    a process pool of up to `workers` (default: all
+    cores) processes, or in-process if that is 1.
+
+    Figures already rendered with identical content, in
+    this process or in `cache`, are copied instead. While
+    profiling, figures are rendered (and timed) in-process.
+    """
+    pending = {}
+    for outfile, figure in figures.items():
+        key = content_hash(figure)
+
+        image = _memory.get(key)
+        if image is None and cache is not None:
+            image = cache.get(key)
+
+        if image is None:
+            pending[outfile] = key
+            continue
+
+        _memory[key] = image
+
+        outfile.parent.mkdir(parents=True, exist_ok=True)
+        outfile.write_bytes(image)
+
+    outfiles = list(pending.keys())
+
+    workers = min(
+        workers if workers else os.cpu_count() or 1,
+        len(outfiles)
+    )
+
+    if workers < 2 or profiling.active():
+        images = []
+        for outfile in outfiles:
+            with profiling.stage(f"figure {outfile.name}"):
+                images.append(render(figures[outfile], outfile))
+
+    else:
+        # loaded once here, inherited by forked workers
+        import matplotlib.figure
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            images = list(
+                executor.map(
+                    render,
+                    [figures[outfile] for outfile in outfiles],
+                    outfiles
+                )
+            )
+
+    for outfile, image in zip(outfiles, images):
+        _memory[pending[outfile]] = image
+
+        if cache is not None:
+            cache.put(pending[outfile], image)
+
+def clear_memory() -> None:
+    """
+    Forgets the figures rendered in this process, so that
+    `render_all` renders them again (unless cached).
+    """
+    _memory.clear()
+
+
+_memory: dict[str, bytes] = {}
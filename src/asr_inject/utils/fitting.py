@@ -1,27 +1,57 @@
 """ Licensed under the same terms as described in the main 
 licensing script of this repository. """
 
+import copy
+import functools
+from collections.abc import Callable
 from typing import Any
 
-import matplotlib.pyplot as plt
 import numpy as np
 from numpy.polynomial.polynomial import polyfit
 from numpy.typing import NDArray
 
+from asr_inject.utils.cache import ResultCache, content_hash
+
 
 R = 8.314462618  # J/(molK)
 CELSIUS_TO_KELVIN = 273.15
 
-def density_fit(
-        density_data: dict[str, Any], *,
-        outfile: str | None=None
-) -> NDArray:
+def memoised(fit: Callable) -> Callable:
+    """
+    Memoises a fitting function on a hash of its input
+    data, in memory and, if a `cache` is given, on disk.
+    """
+    @functools.wraps(fit)
+    def wrapper(
+            data: Any, *, cache: ResultCache | None=None
+    ) -> Any:
+        """
+        """
+        key = content_hash(fit.__name__, data)
+
+        coefficients = _memory.get(key)
+        if coefficients is None and cache is not None:
+            coefficients = cache.get(key)
+
+        if coefficients is None:
+            coefficients = fit(data)
+
+            if cache is not None:
+                cache.put(key, coefficients)
+
+        _memory[key] = coefficients
+
+        return copy.deepcopy(coefficients)
+
+    return wrapper
+
+
+@memoised
+def density_fit(density_data: dict[str, Any]) -> NDArray:
     """
     """
     data = np.asarray(density_data["data"])
     degree = density_data["temperature_fitting_degree"]
-    A0 = density_data["salinity_fitting"]["A0"]
-    A1 = density_data["salinity_fitting"]["A1"]
 
     # temperature fitting
     coefficients, stats = polyfit(
@@ -29,57 +59,73 @@ def density_fit(
         degree, full=True
     )
 
-    # plots
-    if outfile:
-        outfile.parent.mkdir(parents=True, exist_ok=True)
+    return np.asarray(coefficients)
 
-        temp = np.arange(data[0, 0], data[-1, 0], 0.01)
-        dens = np.zeros(len(temp))
-        for idx in range(degree + 1):
-            dens += (
-                coefficients[idx] *
-                (temp + CELSIUS_TO_KELVIN)**idx
-            )
+def density_figure(
+        density_data: dict[str, Any], coefficients: NDArray,
+        *, title: str
+) -> dict[str, Any]:
+    """
+    Figure description (see `figures.render`) of a
+    `density_fit`.
+    """
+    data = np.asarray(density_data["data"])
+    A0 = density_data["salinity_fitting"]["A0"]
+    A1 = density_data["salinity_fitting"]["A1"]
 
-        # imported data
-        plt.scatter(
-            data[:, 0], data[:, 1],
-            marker='x', c="red", label="real data"
+    temp = np.arange(data[0, 0], data[-1, 0], 0.01)
+    dens = np.zeros(len(temp))
+    for idx in range(len(coefficients)):
+        dens += (
+            coefficients[idx] *
+            (temp + CELSIUS_TO_KELVIN)**idx
         )
 
+    series = [
+        # imported data
+        {
+            "kind": "scatter",
+            "args": (data[:, 0], data[:, 1]),
+            "kwargs": {
+                "marker": 'x', "c": "red", "label": "real data"
+            }
+        },
         # pure water fit
-        plt.plot(temp, dens, label="polynomial fit")
-
-        # impure water
-        for mass_fraction in [0.0025, 0.005]:
-            solubility = (
-                mass_fraction / (1. - mass_fraction)
-            )
-
-            d_rho = solubility * (
-                A0 + 
-                (temp + CELSIUS_TO_KELVIN) * A1
-            )
-
-            dens_impure = dens + d_rho
-
-            plt.plot(
-                temp, dens_impure,
-                label=f"mass%={mass_fraction*100.}"
-            )
-
-        plt.legend(loc="best")
-        plt.title(str(outfile.stem))
-        plt.xlabel("T (degC)")
-        plt.ylabel("dens (kg/m^3)")
-        plt.savefig(str(outfile))
-        plt.close()
+        {
+            "kind": "plot",
+            "args": (temp, dens),
+            "kwargs": {"label": "polynomial fit"}
+        }
+    ]
+
+    # impure water
+    for mass_fraction in [0.0025, 0.005]:
+        solubility = (
+            mass_fraction / (1. - mass_fraction)
+        )
 
-    return np.asarray(coefficients)
+        d_rho = solubility * (
+            A0 + 
+            (temp + CELSIUS_TO_KELVIN) * A1
+        )
 
-def arrhenius_fit(
-        data: NDArray, *, outfile: str | None=None
-) -> tuple[float, float]:
+        series.append({
+            "kind": "plot",
+            "args": (temp, dens + d_rho),
+            "kwargs": {
+                "label": f"mass%={mass_fraction*100.}"
+            }
+        })
+
+    return {
+        "title": title,
+        "xlabel": "T (degC)",
+        "ylabel": "dens (kg/m^3)",
+        "series": series
+    }
+
+@memoised
+def arrhenius_fit(data: NDArray) -> tuple[float, float]:
     """
     """
     x_axis = 1. / (data[:, 0] + CELSIUS_TO_KELVIN)
@@ -88,29 +134,48 @@ def arrhenius_fit(
     # least-squares' fitting
     slope, intercept = np.polyfit(x_axis, y_axis, 1)
 
-    # plots
-    if outfile is not None:
-        outfile.parent.mkdir(parents=True, exist_ok=True)
-
-        plt.scatter(
-            x_axis, y_axis,
-            marker='x', c="red", label="real data"
-        )
-
-        plt.plot(
-            np.asarray([x_axis[0], x_axis[-1]]),
-            np.asarray([
-                intercept + slope * x_axis[0],
-                intercept + slope * x_axis[-1]
-            ]),
-            label="linear fit"
-        )
+    return np.exp(intercept), -R * slope
 
-        plt.legend(loc="best")
-        plt.title(str(outfile.stem))
-        plt.xlabel("1/T (K^-1)")
-        plt.ylabel("ln(diff)")
-        plt.savefig(str(outfile))
-        plt.close()
+def arrhenius_figure(
+        data: NDArray, coefficients: tuple[float, float],
+        *, title: str
+) -> dict[str, Any]:
+    """
+    Figure description (see `figures.render`) of an
+    `arrhenius_fit`.
+    """
+    x_axis = 1. / (data[:, 0] + CELSIUS_TO_KELVIN)
+    y_axis = np.log(data[:, 1])
 
-    return np.exp(intercept), -R * slope
+    intercept = np.log(coefficients[0])
+    slope = -coefficients[1] / R
+
+    return {
+        "title": title,
+        "xlabel": "1/T (K^-1)",
+        "ylabel": "ln(diff)",
+        "series": [
+            {
+                "kind": "scatter",
+                "args": (x_axis, y_axis),
+                "kwargs": {
+                    "marker": 'x', "c": "red",
+                    "label": "real data"
+                }
+            },
+            {
+                "kind": "plot",
+                "args": (
+                    np.asarray([x_axis[0], x_axis[-1]]),
+                    np.asarray([
+                        intercept + slope * x_axis[0],
+                        intercept + slope * x_axis[-1]
+                    ])
+                ),
+                "kwargs": {"label": "linear fit"}
+            }
+        ]
+    }
+
+
+_memory: dict[str, Any] = {}
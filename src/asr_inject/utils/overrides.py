@@ -0,0 +1,34 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import copy
+from typing import Any
+
+
+def apply_overrides(
+        config: dict[str, Any], overrides: dict[str, Any]
+) -> dict[str, Any]:
+    """
+    Returns a deep copy of `config` with every dotted
+    parameter path in `overrides` (e.g.
+    `"reservoir_conditions.temperature"`) set to its
+    value.
+    """
+    config = copy.deepcopy(config)
+
+    for path, value in overrides.items():
+        *parents, key = path.split('.')
+
+        node = config
+        for parent in parents:
+            if not isinstance(node.get(parent), dict):
+                raise KeyError(
+                    f"'{path}' is not a parameter path of "
+                    "the configuration"
+                )
+
+            node = node[parent]
+
+        node[key] = value
+
+    return config
@@ -0,0 +1,162 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import contextlib
+import contextvars
+import cProfile
+import io
+import logging
+import pstats
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Times the enclosed block as stage `name` while a
+    `profile` is active; a no-op otherwise.
+    """
+    timings = _timings.get()
+
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+
+    try:
+        yield
+
+    finally:
+        timings.append((name, time.perf_counter() - start))
+
+
+class Stopwatch:
+    """
+    Wall time accumulated inside its `with` blocks and
+    the calls to functions it `wrap`s.
+    """
+
+    def __init__(self) -> None:
+        """
+        """
+        self.elapsed = 0.
+
+
+    def __enter__(self) -> "Stopwatch":
+        """
+        """
+        self._start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """
+        """
+        self.elapsed += time.perf_counter() - self._start
+
+
+    def wrap(self, func: Callable) -> Callable:
+        """
+        """
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            """
+            """
+            with self:
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+def active() -> bool:
+    """
+    """
+    return _timings.get() is not None
+
+
+@contextlib.contextmanager
+def profile(
+        *, outdir: Path, memory: bool=False, top: int=30,
+        logger: logging.Logger | None=None
+) -> Iterator[list[tuple[str, float]]]:
+    """
+    Profiles the enclosed block with `cProfile` (and, if
+    `memory`, `tracemalloc`), then writes
+    `profile.pstats` and a `profile.txt` summary of the
+    `top` entries to `outdir` and logs the stage timings.
+
+    Only the calling process is profiled.
+    """
+    timings = []
+    token = _timings.set(timings)
+
+    if memory:
+        tracemalloc.start()
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    try:
+        yield timings
+
+    finally:
+        profiler.disable()
+        _timings.reset(token)
+
+        snapshot, peak_memory = None, None
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        outdir.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(outdir / "profile.pstats")
+
+        summary = io.StringIO()
+        summary.write("STAGE TIMINGS\n")
+        for name, seconds in timings:
+            summary.write(f"{seconds:12.4f} s  {name}\n")
+
+        for sort_key in ["cumulative", "tottime"]:
+            summary.write(f"\nTOP {top} BY {sort_key.upper()}\n")
+            pstats.Stats(
+                profiler, stream=summary
+            ).sort_stats(sort_key).print_stats(top)
+
+        if snapshot is not None:
+            summary.write(
+                f"\nTOP {top} ALLOCATIONS "
+                f"(peak {peak_memory / 2**20:.1f} MiB)\n"
+            )
+            for statistic in snapshot.statistics("lineno")[:top]:
+                summary.write(f"{statistic}\n")
+
+        (outdir / "profile.txt").write_text(summary.getvalue())
+
+        if logger is not None:
+            for name, seconds in timings:
+                logger.info(
+                    f"Stage '{name}' = {round(seconds, 3)} s"
+                )
+
+            if peak_memory is not None:
+                logger.info(
+                    f"Peak traced memory = "
+                    f"{round(peak_memory / 2**20, 1)} MiB"
+                )
+
+            logger.info(
+                f"Profile written to {outdir / 'profile.pstats'}"
+            )
+
+
+_timings: contextvars.ContextVar[
+    list[tuple[str, float]] | None
+] = contextvars.ContextVar(
+    "timings",
+    default=None,
+)
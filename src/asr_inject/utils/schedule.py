@@ -0,0 +1,60 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+def output_times(
+        schedule: dict[str, Any] | None, *, n_steps: int,
+        step_size: float
+) -> NDArray:
+    """
+    Times (s) at which the solution is stored.
+
+    The horizon is always `(n_steps - 1) * step_size`; the
+    schedule only decides where within it the trajectory
+    is sampled, independently of the solver's internal
+    stepping. The returned times are sorted, unique and
+    start at `t = 0`.
+
+    Arguments
+    ---------
+    schedule: `dict[str, Any] | None`
+        `kind` is one of `"grid"` (every `step_size`, the
+        default), `"linear"` (`n_points` evenly spaced),
+        `"log"` (`n_points` log-spaced from `first_time`)
+        or `"explicit"` (the listed `times`).
+    """
+    horizon = (n_steps - 1) * step_size
+    kind = "grid" if not schedule else schedule["kind"]
+
+    if kind == "grid":
+        return np.arange(n_steps) * step_size
+
+    if kind == "linear":
+        return np.linspace(0., horizon, schedule["n_points"])
+
+    if kind == "log":
+        times = np.geomspace(
+            schedule["first_time"], horizon,
+            schedule["n_points"] - 1
+        )
+
+    elif kind == "explicit":
+        times = np.asarray(schedule["times"], dtype=np.float64)
+
+        if np.any(times < 0.) or np.any(times > horizon):
+            raise ValueError(
+                "explicit output times must lie within "
+                f"[0, {horizon}] s"
+            )
+
+    else:
+        raise ValueError(
+            f"unknown output schedule '{kind}'"
+        )
+
+    return np.unique(np.concatenate([[0.], times]))
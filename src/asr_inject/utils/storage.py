@@ -0,0 +1,93 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+from pathlib import Path
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+class TrajectoryStore:
+    """
+    Memory-mapped `.npy` files holding a trajectory that
+    is written chunk by chunk as the integration proceeds.
+    """
+
+    def __init__(
+            self, directory: Path, *, n_points: int,
+            n_states: int, n_cell_states: int | None=None
+    ) -> None:
+        """
+        Arguments
+        ---------
+        n_cell_states: `int | None=None`
+            width of the per-cell state; if `None`, the
+            per-cell trajectory coincides with `moles` and
+            is not stored separately.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+
+        self.directory = directory
+        self.n_points = n_points
+
+        widths = {
+            "time": None,
+            "moles": n_states,
+            "cell_moles": n_cell_states,
+            "mass_fraction_solute_fresh": None,
+            "asr_efficiency": None
+        }
+
+        if n_cell_states is None:
+            del widths["cell_moles"]
+
+        self.fields = tuple(widths.keys())
+
+        self._arrays = {
+            field: np.lib.format.open_memmap(
+                self.path(field), mode="w+",
+                dtype=np.float64,
+                shape=(
+                    (n_points,) if width is None
+                    else (n_points, width)
+                )
+            )
+            for field, width in widths.items()
+        }
+
+
+    def path(self, field: str) -> Path:
+        """
+        """
+        return self.directory / f"{field}.npy"
+
+
+    def write(self, start: int, **chunks: NDArray) -> None:
+        """
+        Writes `chunks` (one per field) from row `start`
+        onwards and flushes them to disk; chunks of fields
+        that are not stored are ignored.
+        """
+        for field, chunk in chunks.items():
+            if field not in self._arrays:
+                continue
+
+            array = self._arrays[field]
+            array[start:start + len(chunk)] = chunk
+            array.flush()
+
+
+    def close(self) -> dict[str, NDArray]:
+        """
+        Releases the writable maps and returns read-only,
+        lazily loaded views of every field.
+        """
+        self._arrays.clear()
+
+        output = {
+            field: np.load(self.path(field), mmap_mode="r")
+            for field in self.fields
+        }
+        output.setdefault("cell_moles", output["moles"])
+
+        return output
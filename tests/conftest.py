@@ -0,0 +1,61 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+
+from asr_inject.operations import pipeline
+from asr_inject.utils.fitting import arrhenius_fit, density_fit
+
+
+CONFIG = Path(__file__).parents[1] / "config" / "default.yml"
+
+@pytest.fixture(scope="session")
+def parsed_config() -> dict[str, Any]:
+    """
+    Default configuration, without its fitting data.
+    """
+    config_dict = pipeline.read_yaml(CONFIG)
+
+    for key in ["density", "water_diffusivity", "solute_diffusivity"]:
+        config_dict.pop(key)
+
+    return config_dict
+
+@pytest.fixture(scope="session")
+def fitting() -> dict[str, Any]:
+    """
+    Coefficients fitted to the default configuration's
+    data, as built by `pipeline.run_config`.
+    """
+    config_dict = pipeline.read_yaml(CONFIG)
+    density_data = config_dict["density"]
+
+    def fit(data: list[list[float]]) -> np.ndarray:
+        """
+        """
+        return arrhenius_fit.__wrapped__(
+            np.asarray(data, dtype=np.float64)
+        )
+
+    return {
+        "density": {
+            "temperature": density_fit.__wrapped__(density_data),
+            "salinity": density_data["salinity_fitting"]
+        },
+        "water_diff_fresh_segment": fit(
+            config_dict["water_diffusivity"]["fresh_segment"]
+        ),
+        "water_diff_saline_segment": fit(
+            config_dict["water_diffusivity"]["saline_segment"]
+        ),
+        "solute_diff_fresh_segment": fit(
+            config_dict["solute_diffusivity"]["fresh_segment"]
+        ),
+        "solute_diff_saline_segment": fit(
+            config_dict["solute_diffusivity"]["saline_segment"]
+        )
+    }
@@ -0,0 +1,132 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from asr_inject.utils.cache import ResultCache, content_hash
+
+
+N_WRITERS = 8
+N_ROUNDS = 25
+
+def write_and_read(directory: Path, writer: int) -> list[str]:
+    """
+    Stores and reads back a few shared keys from a writer
+    process, with a cache small enough to evict while the
+    others write; returns what went wrong.
+    """
+    cache = ResultCache(directory, max_bytes=2**16)
+    files = directory.parent / f"files_{writer}"
+    files.mkdir(exist_ok=True)
+    (files / "figure.png").write_bytes(b"\0" * 2**12)
+
+    errors = []
+    for round in range(N_ROUNDS):
+        key = content_hash("shared", round % 5)
+        value = np.full(2**10, round % 5)
+
+        try:
+            cache.put(key, value, files_from=files)
+            cached = cache.get(
+                key, files_to=directory.parent / f"out_{writer}"
+            )
+
+        except Exception as exc:
+            errors.append(f"{type(exc).__name__}: {exc}")
+            continue
+
+        # concurrently evicted entries miss
+        if cached is not None and not np.array_equal(cached, value):
+            errors.append(f"wrong value for round {round}")
+
+    return errors
+
+def test_hit_and_miss(tmp_path: Path) -> None:
+    """
+    A stored value, its summary and its files come back
+    under the same key only.
+    """
+    cache = ResultCache(tmp_path / "cache", max_bytes=2**20)
+    files = tmp_path / "files"
+    files.mkdir()
+    (files / "figure.png").write_bytes(b"png")
+
+    key = content_hash({"a": 1, "b": [1., 2.]})
+    assert key == content_hash({"b": np.array([1., 2.]), "a": 1})
+    assert cache.get(key) is None
+
+    cache.put(
+        key, {"x": np.arange(3)}, summary={"final": np.float64(0.5)},
+        files_from=files
+    )
+
+    value = cache.get(key, files_to=tmp_path / "out")
+    assert np.array_equal(value["x"], np.arange(3))
+    assert (tmp_path / "out" / "figure.png").read_bytes() == b"png"
+    assert json.loads(
+        (tmp_path / "cache" / key / "summary.json").read_text()
+    ) == {"final": 0.5}
+
+    assert cache.get(content_hash({"a": 2})) is None
+
+    # storing an existing key again is a no-op
+    cache.put(key, {"x": np.arange(3)})
+    assert np.array_equal(cache.get(key)["x"], np.arange(3))
+
+    # half-removed entries are replaced
+    broken = tmp_path / "cache" / content_hash("broken")
+    (broken / "files").mkdir(parents=True)
+
+    cache.put(content_hash("broken"), 1.)
+    assert cache.get(content_hash("broken")) == 1.
+
+def test_least_recently_used_eviction(tmp_path: Path) -> None:
+    """
+    Entries beyond the size bound are evicted oldest
+    access first.
+    """
+    cache = ResultCache(tmp_path, max_bytes=7 * 2**12)
+    keys = [content_hash(n) for n in range(3)]
+
+    for n, key in enumerate(keys):
+        cache.put(key, np.zeros(2**10))
+        os.utime(tmp_path / key / "value.pkl", (n, n))
+
+    # the oldest becomes the most recently used
+    assert cache.get(keys[0]) is not None
+
+    cache.put(content_hash(3), np.zeros(2**10))
+
+    assert cache.get(keys[1]) is None
+    assert all(
+        cache.get(key) is not None
+        for key in [keys[0], keys[2], content_hash(3)]
+    )
+
+def test_concurrent_writers(tmp_path: Path) -> None:
+    """
+    Processes writing, reading and evicting the same keys
+    at once neither fail nor read a wrong value.
+    """
+    directory = tmp_path / "cache"
+    ResultCache(directory, max_bytes=2**16)
+
+    with ProcessPoolExecutor(max_workers=N_WRITERS) as executor:
+        errors = list(
+            executor.map(
+                write_and_read, [directory] * N_WRITERS,
+                range(N_WRITERS)
+            )
+        )
+
+    assert errors == [[]] * N_WRITERS
+    assert not [
+        path for path in directory.iterdir()
+        if path.name.startswith('.')
+    ]
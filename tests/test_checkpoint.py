@@ -0,0 +1,128 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+
+from asr_inject.operations.integration import Checkpointed
+from asr_inject.operations.reservoir import Reservoir
+from asr_inject.utils.checkpoint import Checkpointer
+from asr_inject.utils.overrides import apply_overrides
+
+
+N_STEPS = 200
+STEP_SIZE = 5000. # s
+CHECKPOINT_EVERY = 30
+N_SAVED = 3 # checkpoints written before the interruption
+
+class Interrupted(Exception):
+    """
+    """
+
+@pytest.fixture
+def res(
+        parsed_config: dict[str, Any], fitting: dict[str, Any]
+) -> Reservoir:
+    """
+    Default reservoir, whose well shuts on its recovery
+    threshold halfway through the run.
+    """
+    return Reservoir(
+        config=apply_overrides(
+            parsed_config,
+            {"recovery.threshold_solute_mass_fraction": 0.001}
+        ),
+        fitting=fitting
+    )
+
+@pytest.mark.parametrize("recovery", [False, True])
+@pytest.mark.parametrize("jacobian", ["dense", "banded"])
+def test_resume_is_bit_identical(
+        res: Reservoir, tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        recovery: bool, jacobian: str
+) -> None:
+    """
+    A run interrupted after a few checkpoints and resumed
+    from the latest reproduces an uninterrupted one
+    exactly.
+    """
+    def predict(checkpoint_dir: Path) -> dict[str, Any]:
+        """
+        """
+        return res.predict(
+            n_steps=N_STEPS, step_size=STEP_SIZE,
+            jacobian=jacobian, recovery=recovery,
+            mode=Checkpointed(
+                checkpoint_dir=checkpoint_dir,
+                checkpoint_every=CHECKPOINT_EVERY
+            )
+        )
+
+    uninterrupted = predict(tmp_path / "uninterrupted")
+    assert not (tmp_path / "uninterrupted").exists()
+
+    save = Checkpointer.save
+    saved = []
+
+    def interrupting_save(self: Checkpointer, **kwargs: Any) -> None:
+        """
+        """
+        if len(saved) == N_SAVED:
+            raise Interrupted
+
+        save(self, **kwargs)
+        saved.append(kwargs["start"])
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Checkpointer, "save", interrupting_save)
+
+        with pytest.raises(Interrupted):
+            predict(tmp_path / "resumed")
+
+    assert (tmp_path / "resumed" / "checkpoint.npz").exists()
+
+    resumed = predict(tmp_path / "resumed")
+
+    assert np.array_equal(resumed["moles"], uninterrupted["moles"])
+    assert np.array_equal(
+        resumed["asr_efficiency"], uninterrupted["asr_efficiency"],
+        equal_nan=True
+    )
+
+    if recovery:
+        assert resumed["recovery_stop"] == "threshold"
+        assert (
+            resumed["time_to_recovery_stop"] ==
+            uninterrupted["time_to_recovery_stop"]
+        )
+
+def test_foreign_checkpoint_is_refused(
+        res: Reservoir, tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    A checkpoint left by a run with other numerics is
+    not resumed from.
+    """
+    def predict(hmax: float | None) -> dict[str, Any]:
+        """
+        """
+        return res.predict(
+            n_steps=N_STEPS, step_size=STEP_SIZE, hmax=hmax,
+            mode=Checkpointed(
+                checkpoint_dir=tmp_path,
+                checkpoint_every=CHECKPOINT_EVERY
+            )
+        )
+
+    # left behind with its checkpoints
+    with monkeypatch.context() as patch:
+        patch.setattr(Checkpointer, "clear", lambda self: None)
+        predict(hmax=STEP_SIZE)
+
+    with pytest.raises(ValueError, match="different configuration"):
+        predict(hmax=None)
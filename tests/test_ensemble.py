@@ -0,0 +1,78 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+from typing import Any
+
+import numpy as np
+import pytest
+
+from asr_inject.operations.ensemble import ReservoirEnsemble
+from asr_inject.operations.reservoir import Reservoir
+from asr_inject.utils.overrides import apply_overrides
+
+
+N_STEPS = 200
+STEP_SIZE = 5000. # s
+OVERRIDES = [
+    {"reservoir_conditions.temperature": 20.},
+    {
+        "reservoir_conditions.temperature": 60.,
+        "recovery.threshold_solute_mass_fraction": 0.001
+    },
+    {"recovery.flow_rate": 0.1},
+    {"reservoir_dimensions.interlayer_thickness": 0.2}
+] # members producing throughout or stopped by either event
+
+@pytest.mark.parametrize("recovery", [False, True])
+@pytest.mark.parametrize("jacobian", ["banded", "dense"])
+def test_members_match_single_runs(
+        parsed_config: dict[str, Any], fitting: dict[str, Any],
+        recovery: bool, jacobian: str
+) -> None:
+    """
+    Every member of a stacked ensemble integrates as its
+    configuration does on its own, including when its
+    well shuts.
+    """
+    ensemble = ReservoirEnsemble.from_overrides(
+        config=parsed_config, fitting=fitting, overrides=OVERRIDES
+    )
+
+    output = ensemble.predict(
+        n_steps=N_STEPS, step_size=STEP_SIZE, jacobian=jacobian,
+        recovery=recovery
+    )
+
+    for member, overrides in enumerate(OVERRIDES):
+        single = Reservoir(
+            config=apply_overrides(parsed_config, overrides),
+            fitting=fitting
+        ).predict(
+            n_steps=N_STEPS, step_size=STEP_SIZE, recovery=recovery
+        )
+
+        np.testing.assert_allclose(
+            output["moles"][:, member], single["moles"], rtol=1.e-6
+        )
+        np.testing.assert_allclose(
+            output["asr_efficiency"][:, member],
+            single["asr_efficiency"], rtol=1.e-6
+        )
+
+        if recovery:
+            assert output["recovery_stop"][member] == (
+                single["recovery_stop"]
+            )
+
+            if single["time_to_recovery_stop"] is None:
+                assert np.isnan(output["time_to_recovery_stop"][member])
+
+            else:
+                assert output["time_to_recovery_stop"][member] == (
+                    pytest.approx(single["time_to_recovery_stop"], rel=1.e-6)
+                )
+
+    if recovery:
+        assert list(output["recovery_stop"]) == [
+            None, "threshold", "depleted", None
+        ]
@@ -0,0 +1,294 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+from typing import Any
+
+import numpy as np
+import pytest
+
+from asr_inject.operations.integration import InMemory
+from asr_inject.operations.reservoir import (
+    DEPLETION_FRACTION, Reservoir
+)
+from asr_inject.utils.overrides import apply_overrides
+
+
+N_STEPS = 200
+STEP_SIZE = 5000. # s
+THRESHOLD = 0.001 # solute mass fraction, crossed by diffusion alone
+
+def reservoir(
+        config: dict[str, Any], fitting: dict[str, Any],
+        **overrides: Any
+) -> Reservoir:
+    """
+    Reservoir of `config` with dotted-path `overrides`
+    (dots written as double underscores).
+    """
+    return Reservoir(
+        config=apply_overrides(
+            config,
+            {
+                path.replace("__", "."): value
+                for path, value in overrides.items()
+            }
+        ),
+        fitting=fitting
+    )
+
+def finite_difference_jacobian(
+        rhs: Any, moles: np.ndarray
+) -> np.ndarray:
+    """
+    Central finite-difference Jacobian of `rhs` at
+    `moles`.
+    """
+    jacobian = np.empty((moles.size, moles.size))
+
+    for j in range(moles.size):
+        step = 1.e-6 * abs(moles[j])
+        up, down = moles.copy(), moles.copy()
+        up[j] += step
+        down[j] -= step
+
+        jacobian[:, j] = (
+            rhs(up, 0.).copy() - rhs(down, 0.).copy()
+        ) / (2. * step)
+
+    return jacobian
+
+def test_kernel_matches_reference(
+        parsed_config: dict[str, Any], fitting: dict[str, Any]
+) -> None:
+    """
+    The vectorised kernel reproduces the reference
+    right-hand side of the three-cell column.
+    """
+    res = reservoir(parsed_config, fitting)
+
+    reference = res.predict_reference(
+        n_steps=N_STEPS, step_size=STEP_SIZE
+    )
+    output = res.predict(
+        n_steps=N_STEPS, step_size=STEP_SIZE, jacobian=None
+    )
+
+    np.testing.assert_allclose(
+        output["moles"], reference["moles"], rtol=1.e-8
+    )
+
+def test_reference_needs_three_cells(
+        parsed_config: dict[str, Any], fitting: dict[str, Any]
+) -> None:
+    """
+    """
+    res = reservoir(
+        parsed_config, fitting, column__n_cells=7,
+        column__interlayer_cells=3
+    )
+
+    with pytest.raises(ValueError):
+        res.predict_reference(n_steps=2, step_size=STEP_SIZE)
+
+@pytest.mark.parametrize("n_cells, interlayer_cells", [(3, 1), (9, 3)])
+def test_jacobians_match_finite_differences(
+        parsed_config: dict[str, Any], fitting: dict[str, Any],
+        n_cells: int, interlayer_cells: int
+) -> None:
+    """
+    The dense and banded analytical Jacobians agree with
+    finite differences of the right-hand side, away from
+    the initial (piecewise uniform) state.
+    """
+    res = reservoir(
+        parsed_config, fitting, column__n_cells=n_cells,
+        column__interlayer_cells=interlayer_cells,
+        column__grading=1.2
+    )
+
+    species = res.kernel(layout="species")
+    cell = res.kernel(layout="cell")
+
+    # a state with gradients across every face
+    moles = species.to_layout(res.parameters.initial_moles)
+    moles = moles * (1. + 0.01 * np.sin(np.arange(moles.size)))
+
+    expected = finite_difference_jacobian(species.rhs, moles)
+
+    np.testing.assert_allclose(
+        species.jacobian(moles, 0.), expected,
+        rtol=1.e-5, atol=1.e-7 * np.abs(expected).max()
+    )
+
+    # the banded storage, unpacked in the species layout
+    moles = cell.to_layout(species.to_species(moles))
+    banded = cell.jacobian_banded(moles, 0.)
+    bandwidth = cell.bandwidth
+
+    dense = np.zeros((cell.size, cell.size))
+    for i in range(cell.size):
+        for j in range(
+            max(0, i - bandwidth), min(cell.size, i + bandwidth + 1)
+        ):
+            dense[i, j] = banded[i - j + bandwidth, j]
+
+    np.testing.assert_allclose(
+        dense, cell.jacobian(moles, 0.),
+        rtol=1.e-12, atol=1.e-12 * np.abs(dense).max()
+    )
+    np.testing.assert_allclose(
+        dense, finite_difference_jacobian(cell.rhs, moles),
+        rtol=1.e-5, atol=1.e-7 * np.abs(dense).max()
+    )
+
+@pytest.mark.parametrize("jacobian", ["dense", "banded", None])
+def test_mass_conservation(
+        parsed_config: dict[str, Any], fitting: dict[str, Any],
+        jacobian: str | None
+) -> None:
+    """
+    Without a well, the graded N-cell column only moves
+    moles between its cells.
+    """
+    res = reservoir(
+        parsed_config, fitting, column__n_cells=15,
+        column__interlayer_cells=5, column__grading=1.2
+    )
+
+    moles = res.predict(
+        n_steps=N_STEPS, step_size=STEP_SIZE, jacobian=jacobian
+    )["moles"]
+
+    np.testing.assert_allclose(
+        moles[:, :3].sum(axis=1), moles[0, :3].sum(), rtol=1.e-9
+    )
+    np.testing.assert_allclose(
+        moles[:, 3:].sum(axis=1), moles[0, 3:].sum(), rtol=1.e-9
+    )
+
+def test_event_matches_grid_crossing(
+        parsed_config: dict[str, Any], fitting: dict[str, Any]
+) -> None:
+    """
+    The root-found recovery limit lies within the grid
+    interval in which the full trajectory crosses it,
+    next to its interpolated crossing.
+    """
+    res = reservoir(
+        parsed_config, fitting,
+        recovery__threshold_solute_mass_fraction=THRESHOLD
+    )
+
+    full = res.predict(n_steps=N_STEPS, step_size=STEP_SIZE)
+    terminated = res.predict(
+        n_steps=N_STEPS, step_size=STEP_SIZE,
+        mode=InMemory(early_termination=True)
+    )
+
+    event = terminated["time_to_recovery_limit"]
+    crossing = full["time_to_recovery_limit"]
+    after = np.argmax(full["mass_fraction_solute_fresh"] >= THRESHOLD)
+
+    assert full["time"][after - 1] < event <= full["time"][after]
+    assert event == pytest.approx(crossing, rel=1.e-3)
+
+    # stored up to the last output point before the event
+    assert terminated["time"][-1] == full["time"][after - 1]
+
+@pytest.mark.parametrize(
+    "overrides, reason",
+    [
+        ({"recovery__threshold_solute_mass_fraction": THRESHOLD}, "threshold"),
+        ({"recovery__flow_rate": 0.1}, "depleted")
+    ]
+)
+def test_recovery_stops_on_event(
+        parsed_config: dict[str, Any], fitting: dict[str, Any],
+        overrides: dict[str, Any], reason: str
+) -> None:
+    """
+    The well shuts exactly when its stopping condition
+    is met, which it is not at any earlier output point,
+    and recovers nothing after.
+    """
+    res = reservoir(parsed_config, fitting, **overrides)
+    parameters = res.parameters
+
+    output = res.predict(
+        n_steps=N_STEPS, step_size=STEP_SIZE, recovery=True,
+        mode=InMemory(dense_output=True)
+    )
+    time = output["time"]
+    stop = output["time_to_recovery_stop"]
+
+    assert output["recovery_stop"] == reason
+    assert 0. < stop < time[-1]
+
+    if reason == "threshold":
+        def condition(moles: np.ndarray) -> np.ndarray:
+            """
+            """
+            return res.compute_mass_fraction_solute_fresh(moles)
+
+        limit = parameters.max_solute_fraction
+        assert output["time_to_recovery_limit"] == stop
+        assert output["time_to_full_recovery"] is None
+
+    else:
+        def condition(moles: np.ndarray) -> np.ndarray:
+            """
+            """
+            # the fresh segment's mass falling to the floor
+            return -(
+                moles[..., 0] * parameters.Mr_water +
+                moles[..., 3] * parameters.Mr_solute
+            )
+
+        limit = -DEPLETION_FRACTION * (
+            parameters.mass_water_fresh_initial +
+            parameters.mass_solute_fresh_initial
+        )
+        assert output["time_to_full_recovery"] == stop
+
+    assert condition(output["solution"](stop)) == pytest.approx(
+        limit, rel=1.e-6
+    )
+    assert np.all(condition(output["moles"][time < stop]) < limit)
+
+    recovered_mass = output["recovered_mass"]
+    assert recovered_mass[-1] == pytest.approx(
+        parameters.recovery_rate * stop, rel=1.e-12
+    )
+    assert np.all(recovered_mass[time >= stop] == recovered_mass[-1])
+
+def test_recovery_modes_agree(
+        parsed_config: dict[str, Any], fitting: dict[str, Any]
+) -> None:
+    """
+    Dense output does not change the recovery run, and
+    its continuous solution passes through the stored
+    trajectory.
+    """
+    res = reservoir(
+        parsed_config, fitting,
+        recovery__threshold_solute_mass_fraction=THRESHOLD
+    )
+
+    output = res.predict(
+        n_steps=N_STEPS, step_size=STEP_SIZE, recovery=True
+    )
+    dense = res.predict(
+        n_steps=N_STEPS, step_size=STEP_SIZE, recovery=True,
+        mode=InMemory(dense_output=True)
+    )
+
+    np.testing.assert_allclose(
+        dense["moles"], output["moles"], rtol=1.e-8
+    )
+    np.testing.assert_allclose(
+        dense["solution"](output["time"]), output["moles"],
+        rtol=1.e-8
+    )
+    assert dense["time_to_recovery_stop"] == pytest.approx(
+        output["time_to_recovery_stop"], rel=1.e-8
+    )
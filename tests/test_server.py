@@ -0,0 +1,108 @@
+""" Licensed under the same terms as described in the main
+licensing script of this repository. """
+
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from asr_inject.operations import pipeline, server
+
+
+CONFIG = Path(__file__).parents[1] / "config" / "default.yml"
+TIMEOUT = 120. # s
+
+@pytest.fixture
+def base_config() -> dict[str, Any]:
+    """
+    Default configuration with the caches disabled.
+    """
+    config_dict = pipeline.read_yaml(CONFIG)
+    config_dict["cache"]["enabled"] = False
+
+    return config_dict
+
+def wait_until_finished(
+        client: server.JobClient, job_id: str
+) -> dict[str, Any]:
+    """
+    Polls a job until it leaves the queue, whatever its
+    outcome.
+    """
+    deadline = time.monotonic() + TIMEOUT
+
+    while (status := client.status(job_id))["status"] in (
+        "queued", "running"
+    ):
+        assert time.monotonic() < deadline
+        time.sleep(server.POLL_INTERVAL)
+
+    return status
+
+def test_job_round_trip(
+        base_config: dict[str, Any], tmp_path: Path
+) -> None:
+    """
+    A short job runs to completion and summarises its
+    result.
+    """
+    with server.serve_in_thread(
+        outdir=tmp_path, base_config=base_config
+    ) as client:
+        assert client.health()["status"] == "ok"
+
+        job_id = client.submit(
+            overrides={"n_steps": 2000}, plots=False
+        )
+        result = client.wait(job_id, timeout=TIMEOUT)
+
+        assert client.status(job_id)["status"] == "done"
+        assert [job["id"] for job in client.jobs()] == [job_id]
+
+    assert result["solver_stats"]["success"]
+    # the well is still producing at the end
+    assert 0. < result["final_efficiency"] < 1.
+    assert result["time_to_full_recovery"] is None
+    assert Path(result["outdir"]).is_dir()
+
+def test_error_statuses(
+        base_config: dict[str, Any], tmp_path: Path
+) -> None:
+    """
+    Malformed requests are rejected (400), unknown jobs
+    and endpoints not found (404) and results of jobs
+    that did not finish refused (409).
+    """
+    with server.serve_in_thread(
+        outdir=tmp_path, base_config=base_config
+    ) as client:
+        status, _ = client.request("POST", "/jobs", ["not", "an", "object"])
+        assert status == 400
+
+        status, body = client.request(
+            "POST", "/jobs", {
+                "overrides": {
+                    "checkpoint_every": 1000,
+                    "early_termination": True
+                }
+            }
+        )
+        assert status == 400
+        assert "early_termination" in body["error"]
+
+        for path in ["/jobs/unknown", "/jobs/unknown/result", "/nope"]:
+            status, _ = client.request("GET", path)
+            assert status == 404
+
+        # fails in the worker, lacking every parameter
+        job_id = client.submit(config={"foo": 1}, plots=False)
+
+        assert wait_until_finished(client, job_id)["status"] == "failed"
+
+        status, body = client.request("GET", f"/jobs/{job_id}/result")
+        assert status == 409
+        assert body["error"]
+
+        with pytest.raises(RuntimeError):
+            client.result(job_id)